@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Frontmatter Write Engine
+Shared by the Obsidian taggers to prepend YAML frontmatter to notes safely
+
+- Atomic: each note is written to a temp file next to it and renamed over the
+  original, so a crash leaves either the old or the new note, never a truncated one
+- Preserves the note's modification time, permissions and (when allowed) owner
+- Batches fsyncs: temp files are synced together, renamed, then each directory
+  is synced once per batch; notes that fail in a batch are reported by path
+  from ``flush``, not as an error of whichever note filled the batch
+- Dry run: collect a unified diff and/or a JSON plan instead of writing; a plan
+  can be applied later without rescanning the vault (notes changed since the
+  plan was made are left alone)
+
+    python frontmatter_writer.py apply plan.json
+"""
+
+import os
+import sys
+import json
+import stat
+import difflib
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+
+FRONTMATTER_MARKER = b'---'
+PLAN_VERSION = 1
+
+# Leftover temp files from an interrupted run are hidden and end in .tmp,
+# so neither the taggers (*.md) nor Obsidian pick them up
+TEMP_PREFIX = '.frontmatter-'
+TEMP_SUFFIX = '.tmp'
+
+def has_frontmatter(file_path):
+    """True if the note starts with a frontmatter fence (reads only the first bytes)"""
+    with open(file_path, 'rb') as f:
+        return f.read(len(FRONTMATTER_MARKER)) == FRONTMATTER_MARKER
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+class FrontmatterWriter:
+    """Prepends frontmatter to notes: atomic writes, or a diff/plan in dry-run mode"""
+
+    def __init__(self, root, dry_run=False, collect_diff=False, collect_plan=False, fsync_batch=64):
+        """
+        root: Vault path; plan and diff paths are relative to it
+        dry_run: Never touch notes (implied by collect_diff / collect_plan)
+        fsync_batch: Notes staged before their data is synced and renamed into place
+        """
+        self.root = Path(root).resolve()
+        self.collect_diff = collect_diff
+        self.collect_plan = collect_plan
+        self.dry_run = dry_run or collect_diff or collect_plan
+        self.fsync_batch = max(1, fsync_batch)
+        self._pending = []
+        self._failures = []
+        self._diffs = []
+        self._plan = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        # A copy sent to a worker process has nobody to flush its batch or
+        # collect its dry-run output, so it writes every note durably on its own
+        if self.dry_run:
+            raise ValueError("dry-run output cannot be collected from worker processes")
+        return dict(self.__dict__, _pending=[], _failures=[], _lock=None, fsync_batch=1)
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        failures = self.flush()
+        if failures and exc_type is None:
+            raise OSError("Failed to write notes:\n" + "\n".join(f"{path}: {error}" for path, error in failures))
+
+    def _relative(self, path):
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return str(path)
+
+    def prepend(self, file_path, frontmatter, expected_sha256=None):
+        """
+        Prepend ``frontmatter`` to a note (or record the change in dry-run mode)
+
+        The rest of the note is kept byte for byte. With ``expected_sha256`` the
+        note is only changed if its current content still has that hash; returns
+        False when it does not. Writes are completed by ``flush``; if this call
+        fills the batch and writing this note fails, the OSError is raised here.
+        """
+        path = Path(os.path.realpath(file_path))
+        with open(path, 'rb') as f:
+            original = f.read()
+        # Notes must be UTF-8 text, as before
+        original_text = original.decode('utf-8')
+        if expected_sha256 is not None and _sha256(original) != expected_sha256:
+            return False
+
+        if self.dry_run:
+            relative = self._relative(path)
+            with self._lock:
+                if self.collect_diff:
+                    new_text = frontmatter + original_text
+                    self._diffs.append((relative, ''.join(difflib.unified_diff(
+                        original_text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+                        fromfile=f'a/{relative}', tofile=f'b/{relative}'
+                    ))))
+                if self.collect_plan:
+                    self._plan.append({
+                        'path': relative,
+                        'sha256': _sha256(original),
+                        'size': len(original),
+                        'prepend': frontmatter,
+                    })
+            return True
+
+        self._stage(path, frontmatter.encode('utf-8') + original)
+        return True
+
+    def _stage(self, path, data):
+        """Write ``data`` to a temp file beside ``path`` with the original's metadata"""
+        st = os.stat(path)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f'{TEMP_PREFIX}{path.name}.', suffix=TEMP_SUFFIX)
+        f = os.fdopen(fd, 'wb')
+        try:
+            f.write(data)
+            f.flush()
+            os.chmod(tmp_path, stat.S_IMODE(st.st_mode))
+            try:
+                os.chown(tmp_path, st.st_uid, st.st_gid)
+            except (PermissionError, AttributeError):
+                pass
+            os.utime(tmp_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._pending.append((f, tmp_path, path))
+            full = len(self._pending) >= self.fsync_batch
+        if full:
+            relative = self._relative(path)
+            own = None
+            others = []
+            for failed_path, error in self._write_pending():
+                if failed_path == relative:
+                    own = error
+                else:
+                    others.append((failed_path, error))
+            # Other notes' failures belong to those notes; flush reports them
+            with self._lock:
+                self._failures.extend(others)
+            if own is not None:
+                raise OSError(own)
+
+    def _write_pending(self):
+        """Sync the staged temp files, rename them over the notes, then sync their directories
+
+        Returns (relative path, error message) for each note that failed.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        directories = {}
+        failures = []
+        for f, tmp_path, path in pending:
+            try:
+                os.fsync(f.fileno())
+                f.close()
+                os.replace(tmp_path, path)
+                directories.setdefault(path.parent, []).append(path)
+            except OSError as e:
+                f.close()
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                failures.append((self._relative(path), str(e)))
+        # The renames themselves are durable once their directory is synced
+        for directory, paths in directories.items():
+            try:
+                dir_fd = os.open(directory, os.O_RDONLY)
+                try:
+                    os.fsync(dir_fd)
+                finally:
+                    os.close(dir_fd)
+            except OSError as e:
+                failures.extend((self._relative(path), f"written but not synced to disk: {e}") for path in paths)
+        return failures
+
+    def flush(self):
+        """
+        Write every staged note
+
+        Returns (relative path, error message) for each note that failed since
+        the last flush, including notes of batches written while staging.
+        """
+        failures = self._write_pending()
+        with self._lock:
+            failures, self._failures = self._failures + failures, []
+        return failures
+
+    def write_diff(self, out):
+        """Write the collected unified diffs (sorted by path) to a text stream"""
+        for _, diff in sorted(self._diffs):
+            out.write(diff)
+
+    def write_plan(self, plan_path):
+        """Write the collected changes as a JSON plan for apply_plan"""
+        plan = {
+            'version': PLAN_VERSION,
+            'root': str(self.root),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'changes': sorted(self._plan, key=lambda change: change['path']),
+        }
+        with open(plan_path, 'w', encoding='utf-8') as f:
+            json.dump(plan, f, indent=1, ensure_ascii=False)
+        return len(plan['changes'])
+
+def apply_plan(plan_path, fsync_batch=64):
+    """
+    Apply a JSON plan without rescanning the vault
+
+    Returns counts: applied, stale (note changed or already tagged since the
+    plan was made), missing and errors.
+    """
+    with open(plan_path, encoding='utf-8') as f:
+        plan = json.load(f)
+    if plan.get('version') != PLAN_VERSION:
+        raise ValueError(f"Unsupported plan version {plan.get('version')!r} in {plan_path}")
+
+    counts = {'applied': 0, 'stale': 0, 'missing': 0, 'errors': 0}
+    with FrontmatterWriter(plan['root'], fsync_batch=fsync_batch) as writer:
+        for change in plan['changes']:
+            path = Path(plan['root']) / change['path']
+            try:
+                if writer.prepend(path, change['prepend'], expected_sha256=change['sha256']):
+                    counts['applied'] += 1
+                else:
+                    counts['stale'] += 1
+                    print(f"⏭️  Skipped (changed since plan): {change['path']}")
+            except FileNotFoundError:
+                counts['missing'] += 1
+                print(f"⏭️  Skipped (no longer exists): {change['path']}")
+            except Exception as e:
+                counts['errors'] += 1
+                print(f"❌ Error: {change['path']} - {str(e)}")
+        # Notes that failed when their batch was written were counted as applied
+        for path, error in writer.flush():
+            counts['applied'] -= 1
+            counts['errors'] += 1
+            print(f"❌ Error: {path} - {error}")
+    return counts
+
+def print_plan_summary(counts):
+    print("")
+    print("📊 Plan Summary:")
+    print(f"   ✅ Notes updated: {counts['applied']}")
+    print(f"   ⏭️  Changed since plan: {counts['stale']}")
+    print(f"   ⏭️  Missing: {counts['missing']}")
+    print(f"   ❌ Errors encountered: {counts['errors']}")
+
+def add_arguments(parser):
+    """Dry-run and plan options shared by the tagger scripts"""
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--diff", metavar="FILE", help="Dry run; write a unified diff to FILE ('-' for stdout)")
+    parser.add_argument("--plan", metavar="FILE", help="Dry run; write a JSON plan to FILE for --apply-plan")
+    parser.add_argument("--apply-plan", metavar="FILE", help="Apply a saved plan without rescanning the vault")
+    parser.add_argument("--fsync-batch", type=int, default=64, help="Notes synced to disk together (default 64)")
+
+def writer_from_args(vault_path, args):
+    return FrontmatterWriter(vault_path, dry_run=args.dry_run, collect_diff=bool(args.diff),
+                             collect_plan=bool(args.plan), fsync_batch=args.fsync_batch)
+
+def finish(writer, args):
+    """Flush pending writes and emit the requested diff and plan"""
+    for path, error in writer.flush():
+        print(f"❌ Error: {path} - {error}")
+    if args.diff:
+        if args.diff == '-':
+            writer.write_diff(sys.stdout)
+        else:
+            with open(args.diff, 'w', encoding='utf-8') as f:
+                writer.write_diff(f)
+            print(f"📝 Diff written to {args.diff}")
+    if args.plan:
+        count = writer.write_plan(args.plan)
+        print(f"📝 Plan with {count} changes written to {args.plan} (apply with --apply-plan {args.plan})")
+
+def main():
+    if len(sys.argv) != 3 or sys.argv[1] != 'apply':
+        print(f"Usage: {sys.argv[0]} apply PLAN.json")
+        sys.exit(2)
+    counts = apply_plan(sys.argv[2])
+    print_plan_summary(counts)
+    sys.exit(1 if counts['errors'] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -7,14 +7,20 @@ Automatically adds YAML frontmatter to files in the organized directory structur
 import os
 import re
 import sys
+import argparse
 from datetime import datetime
 from pathlib import Path
 
+import frontmatter_writer
+from frontmatter_writer import FrontmatterWriter, has_frontmatter
+
 class ObsidianAutoTaggerOrganized:
-    def __init__(self, vault_path):
+    def __init__(self, vault_path, writer=None):
         self.vault_path = Path(vault_path)
+        self.writer = writer or FrontmatterWriter(vault_path)
         self.processed_count = 0
         self.skipped_count = 0
+        self.error_count = 0
 
     def extract_file_info_from_path(self, file_path):
         """Extract information from file path and organized filename"""
@@ -184,11 +190,8 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 self.skipped_count += 1
                 return f"⏭️  Skipped (index file): {file_path.name}"
 
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
             # Skip if already has frontmatter
-            if content.startswith('---'):
+            if has_frontmatter(file_path):
                 self.skipped_count += 1
                 return f"⏭️  Skipped (already has frontmatter): {file_path.name}"
 
@@ -198,18 +201,16 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 self.skipped_count += 1
                 return f"⏭️  Skipped (doesn't match pattern): {file_path.name}"
 
-            # Create and add frontmatter
+            # Create and add frontmatter (atomic write, or diff/plan entry in dry-run mode)
             frontmatter = self.create_frontmatter(file_info)
-            new_content = frontmatter + content
-
-            # Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+            self.writer.prepend(file_path, frontmatter)
 
             self.processed_count += 1
-            return f"✅ Tagged: {file_path.name} ({file_info['category']})"
+            verb = "Would tag" if self.writer.dry_run else "Tagged"
+            return f"✅ {verb}: {file_path.name} ({file_info['category']})"
 
         except Exception as e:
+            self.error_count += 1
             return f"❌ Error processing {file_path.name}: {str(e)}"
 
     def process_directory(self, directory_path):
@@ -222,6 +223,13 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 results.append(result)
                 print(result)
 
+        # Notes that failed when their batch was written were counted as processed
+        for path, error in self.writer.flush():
+            self.processed_count -= 1
+            self.error_count += 1
+            result = f"❌ Error processing {path}: {error}"
+            results.append(result)
+            print(result)
         return results
 
     def run(self):
@@ -242,26 +250,37 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
         print("📊 Summary:")
         print(f"   - Files processed: {self.processed_count}")
         print(f"   - Files skipped: {self.skipped_count}")
-        print(f"   - Total files checked: {self.processed_count + self.skipped_count}")
+        print(f"   - Errors encountered: {self.error_count}")
+        print(f"   - Total files checked: {self.processed_count + self.skipped_count + self.error_count}")
         print("")
 
-        if self.processed_count > 0:
+        if self.writer.dry_run:
+            print("ℹ️  Dry run: no notes were changed.")
+        elif self.processed_count > 0:
             print("✨ Auto-tagging complete! Your organized files now have structured metadata.")
         else:
             print("ℹ️  No files were processed. They may already have frontmatter or don't match patterns.")
 
 def main():
-    if len(sys.argv) > 1:
-        vault_path = sys.argv[1]
-    else:
-        vault_path = "/home/rduffy/Documents/Leveling-Life/ConvoCanvas-Vault"
+    parser = argparse.ArgumentParser(description="Add YAML frontmatter to AI conversation notes")
+    parser.add_argument("vault_path", nargs="?", default="/home/rduffy/Documents/Leveling-Life/ConvoCanvas-Vault")
+    frontmatter_writer.add_arguments(parser)
+    args = parser.parse_args()
+    vault_path = args.vault_path
+
+    if args.apply_plan:
+        counts = frontmatter_writer.apply_plan(args.apply_plan, fsync_batch=args.fsync_batch)
+        frontmatter_writer.print_plan_summary(counts)
+        sys.exit(1 if counts['errors'] else 0)
 
     if not os.path.exists(vault_path):
         print(f"❌ Error: Vault path does not exist: {vault_path}")
         sys.exit(1)
 
-    tagger = ObsidianAutoTaggerOrganized(vault_path)
+    writer = frontmatter_writer.writer_from_args(vault_path, args)
+    tagger = ObsidianAutoTaggerOrganized(vault_path, writer=writer)
     tagger.run()
+    frontmatter_writer.finish(writer, args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
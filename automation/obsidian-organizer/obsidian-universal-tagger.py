@@ -2,17 +2,34 @@
 """
 Universal Obsidian Auto-Tagger
 Automatically adds YAML frontmatter to ALL markdown files across the entire vault
+
+    python obsidian-universal-tagger.py /path/to/vault --workers 8
+    python obsidian-universal-tagger.py /path/to/vault --workers 8 --executor process
+    python obsidian-universal-tagger.py /path/to/vault --plan plan.json --diff changes.diff
+    python obsidian-universal-tagger.py --apply-plan plan.json
 """
 
 import os
 import re
 import sys
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+import frontmatter_writer
+from frontmatter_writer import FrontmatterWriter, has_frontmatter
+
+# Directories never descended into (Obsidian config, Smart Connections index)
+SKIP_DIRS = {'.obsidian', '.smart-env'}
+
 class UniversalObsidianTagger:
-    def __init__(self, vault_path):
+    def __init__(self, vault_path, workers=1, executor='thread', writer=None):
         self.vault_path = Path(vault_path)
+        self.workers = max(1, workers)
+        self.executor = executor
+        self.writer = writer or FrontmatterWriter(vault_path)
         self.processed_count = 0
         self.skipped_count = 0
         self.error_count = 0
@@ -294,8 +311,11 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 """
         return frontmatter
 
-    def process_file(self, file_path):
-        """Process a single file"""
+    def tag_file(self, file_path):
+        """Tag a single file; returns (status, message) with status processed, skipped or error
+
+        Does not touch the counters, so it can run in worker threads or processes.
+        """
         try:
             # Skip system files and directories
             if (file_path.name.startswith('.') or
@@ -303,74 +323,131 @@ created: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
                 'Index' in file_path.name or
                 '.obsidian' in str(file_path) or
                 '.smart-env' in str(file_path)):
-                self.skipped_count += 1
-                return f"⏭️  Skipped (system file): {file_path.name}"
-
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+                return 'skipped', f"⏭️  Skipped (system file): {file_path.name}"
 
             # Skip if already has frontmatter
-            if content.startswith('---'):
-                self.skipped_count += 1
-                return f"⏭️  Skipped (has frontmatter): {file_path.name}"
+            if has_frontmatter(file_path):
+                return 'skipped', f"⏭️  Skipped (has frontmatter): {file_path.name}"
 
             # Extract file information
             file_info = self.extract_file_info(file_path)
 
             # Create frontmatter
             frontmatter = self.create_frontmatter(file_info)
-            new_content = frontmatter + content
 
-            # Write back to file
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(new_content)
+            # Atomic write (or diff/plan entry in dry-run mode)
+            self.writer.prepend(file_path, frontmatter)
 
-            self.processed_count += 1
-            return f"✅ Tagged: {file_path.name} [{file_info['source']}]"
+            verb = "Would tag" if self.writer.dry_run else "Tagged"
+            return 'processed', f"✅ {verb}: {file_path.name} [{file_info['source']}]"
 
         except Exception as e:
+            return 'error', f"❌ Error: {file_path.name} - {str(e)}"
+
+    def process_file(self, file_path):
+        """Process a single file"""
+        status, message = self.tag_file(file_path)
+        self._count(status)
+        return message
+
+    def _count(self, status):
+        if status == 'processed':
+            self.processed_count += 1
+        elif status == 'skipped':
+            self.skipped_count += 1
+        else:
             self.error_count += 1
-            return f"❌ Error: {file_path.name} - {str(e)}"
+
+    def iter_markdown_files(self):
+        """Markdown files in the vault, pruning SKIP_DIRS while walking"""
+        for root, dirs, files in os.walk(self.vault_path):
+            dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+            for name in sorted(files):
+                if name.endswith('.md'):
+                    yield Path(root) / name
+
+    def _results(self):
+        """(status, message) per file, in walk order"""
+        files = self.iter_markdown_files()
+        if self.workers == 1:
+            return map(self.tag_file, files)
+        if self.executor == 'process':
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            # Files are handed to worker processes in chunks to keep IPC overhead low
+            return self._drain(pool, pool.map(self.tag_file, files, chunksize=64))
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._drain(pool, pool.map(self.tag_file, files))
+
+    @staticmethod
+    def _drain(pool, results):
+        with pool:
+            yield from results
 
     def run(self):
         """Run the universal tagging process"""
         print("🏷️  Universal Obsidian Auto-Tagger Starting...")
         print(f"📂 Vault Path: {self.vault_path}")
-        print("🔍 Processing ALL markdown files in vault...")
+        mode = f"{self.workers} {self.executor} workers" if self.workers > 1 else "serial"
+        print(f"🔍 Processing ALL markdown files in vault ({mode})...")
         print("")
 
-        # Process all markdown files recursively
-        for md_file in self.vault_path.glob('**/*.md'):
-            if md_file.is_file():
-                result = self.process_file(md_file)
-                print(result)
+        # Counters are only updated here, so totals stay exact with any worker count
+        counts = Counter()
+        for status, message in self._results():
+            counts[status] += 1
+            print(message)
+        # Notes that failed when their batch was written were counted as processed
+        for path, error in self.writer.flush():
+            counts['processed'] -= 1
+            counts['error'] += 1
+            print(f"❌ Error: {path} - {error}")
+        self.processed_count += counts['processed']
+        self.skipped_count += counts['skipped']
+        self.error_count += counts['error']
 
         print("")
-        print("📊 Universal Tagging Summary:")
+        print("📊 Universal Tagging Summary" + (" (dry run, nothing written):" if self.writer.dry_run else ":"))
         print(f"   ✅ Files processed: {self.processed_count}")
         print(f"   ⏭️  Files skipped: {self.skipped_count}")
         print(f"   ❌ Errors encountered: {self.error_count}")
         print(f"   📁 Total files checked: {self.processed_count + self.skipped_count + self.error_count}")
         print("")
 
-        if self.processed_count > 0:
+        if self.writer.dry_run:
+            print("ℹ️  Dry run: no notes were changed.")
+        elif self.processed_count > 0:
             print("✨ Universal auto-tagging complete!")
             print("🎯 Your entire Obsidian vault now has structured metadata!")
         else:
             print("ℹ️  No files were processed. They may already have frontmatter.")
 
 def main():
-    vault_path = "/home/rduffy/Documents/Leveling-Life"
-
-    if len(sys.argv) > 1:
-        vault_path = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Add YAML frontmatter to every markdown file in a vault")
+    parser.add_argument("vault_path", nargs="?", default="/home/rduffy/Documents/Leveling-Life")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Files tagged in parallel (default 1; e.g. %d on this machine)" % (os.cpu_count() or 1))
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread",
+                        help="Worker pool type (threads suit disk-bound vaults, processes CPU-bound ones)")
+    frontmatter_writer.add_arguments(parser)
+    args = parser.parse_args()
+    vault_path = args.vault_path
+
+    if args.apply_plan:
+        counts = frontmatter_writer.apply_plan(args.apply_plan, fsync_batch=args.fsync_batch)
+        frontmatter_writer.print_plan_summary(counts)
+        sys.exit(1 if counts['errors'] else 0)
 
     if not os.path.exists(vault_path):
         print(f"❌ Error: Vault path does not exist: {vault_path}")
         sys.exit(1)
 
-    tagger = UniversalObsidianTagger(vault_path)
+    writer = frontmatter_writer.writer_from_args(vault_path, args)
+    if writer.dry_run and args.executor == 'process' and args.workers > 1:
+        parser.error("dry runs (--dry-run, --diff, --plan) need --executor thread")
+
+    tagger = UniversalObsidianTagger(vault_path, workers=args.workers, executor=args.executor, writer=writer)
     tagger.run()
+    frontmatter_writer.finish(writer, args)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
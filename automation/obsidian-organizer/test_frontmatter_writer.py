@@ -0,0 +1,155 @@
+"""Frontmatter write engine: atomic writes, batch failure attribution, plans and worker copies"""
+
+import os
+import sys
+import json
+import pickle
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+import frontmatter_writer
+from frontmatter_writer import FrontmatterWriter, TEMP_PREFIX, apply_plan
+
+FRONTMATTER = "---\ntags: [test]\n---\n"
+
+
+def _note(vault, name, body="# Note\nbody\n"):
+    path = vault / name
+    path.write_bytes(body.encode("utf-8"))
+    return path
+
+
+def _leftovers(vault):
+    return [name for name in os.listdir(vault) if name.startswith(TEMP_PREFIX)]
+
+
+@pytest.fixture
+def fail_replace(monkeypatch):
+    """Makes renaming onto the given note names fail like a full disk"""
+    failing = set()
+    replace = os.replace
+
+    def flaky_replace(src, dst):
+        if os.path.basename(dst) in failing:
+            raise OSError(28, "No space left on device")
+        return replace(src, dst)
+
+    monkeypatch.setattr(frontmatter_writer.os, "replace", flaky_replace)
+    return failing
+
+
+def test_prepend_is_atomic_and_keeps_metadata(tmp_path):
+    note = _note(tmp_path, "a.md", "café\r\nline two\n")
+    os.chmod(note, 0o640)
+    os.utime(note, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+
+    with FrontmatterWriter(tmp_path, fsync_batch=8) as writer:
+        assert writer.prepend(note, FRONTMATTER)
+        # Staged, not yet renamed into place
+        assert note.read_bytes() == "café\r\nline two\n".encode("utf-8")
+
+    assert note.read_bytes() == (FRONTMATTER + "café\r\nline two\n").encode("utf-8")
+    stat = note.stat()
+    assert stat.st_mode & 0o777 == 0o640
+    assert stat.st_mtime_ns == 1_600_000_000_000_000_000
+    assert _leftovers(tmp_path) == []
+
+
+def test_dry_run_writes_nothing(tmp_path):
+    note = _note(tmp_path, "a.md")
+    writer = FrontmatterWriter(tmp_path, collect_diff=True, collect_plan=True)
+    writer.prepend(note, FRONTMATTER)
+    assert writer.flush() == []
+    assert note.read_text(encoding="utf-8") == "# Note\nbody\n"
+    assert writer.write_plan(str(tmp_path / "plan.json")) == 1
+
+
+def test_batch_failures_are_reported_per_note(tmp_path, fail_replace):
+    notes = [_note(tmp_path, f"{name}.md") for name in "abcde"]
+    fail_replace.update({"a.md", "d.md"})
+    writer = FrontmatterWriter(tmp_path, fsync_batch=2)
+
+    writer.prepend(notes[0], FRONTMATTER)
+    # b fills the first batch: a's failure is not b's
+    writer.prepend(notes[1], FRONTMATTER)
+    writer.prepend(notes[2], FRONTMATTER)
+    # d fills the second batch and fails itself
+    with pytest.raises(OSError):
+        writer.prepend(notes[3], FRONTMATTER)
+    writer.prepend(notes[4], FRONTMATTER)
+
+    failures = writer.flush()
+    assert [path for path, _ in failures] == ["a.md"]
+    assert "No space left" in failures[0][1]
+    assert writer.flush() == []
+
+    tagged = {note.name for note in notes if note.read_text(encoding="utf-8").startswith("---")}
+    assert tagged == {"b.md", "c.md", "e.md"}
+    assert notes[0].read_text(encoding="utf-8") == "# Note\nbody\n"
+    assert _leftovers(tmp_path) == []
+
+
+def test_context_manager_raises_unreported_failures(tmp_path, fail_replace):
+    note = _note(tmp_path, "a.md")
+    fail_replace.add("a.md")
+    with pytest.raises(OSError, match="a.md"):
+        with FrontmatterWriter(tmp_path) as writer:
+            writer.prepend(note, FRONTMATTER)
+
+
+def test_apply_plan_counts(tmp_path, fail_replace):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    notes = {name: _note(vault, f"{name}.md") for name in ("applied", "stale", "missing", "error", "late")}
+    planner = FrontmatterWriter(vault, collect_plan=True)
+    for note in notes.values():
+        planner.prepend(note, FRONTMATTER)
+    plan_path = tmp_path / "plan.json"
+    planner.write_plan(str(plan_path))
+
+    notes["stale"].write_text("# Edited since the plan\n", encoding="utf-8")
+    notes["missing"].unlink()
+    notes["error"].write_bytes(b"\xff\xfe not utf-8")
+    # Fails only when its batch is written, after being counted as applied
+    fail_replace.add("late.md")
+
+    counts = apply_plan(str(plan_path), fsync_batch=64)
+    assert counts == {"applied": 1, "stale": 1, "missing": 1, "errors": 2}
+    assert notes["applied"].read_text(encoding="utf-8").startswith(FRONTMATTER)
+    assert notes["stale"].read_text(encoding="utf-8") == "# Edited since the plan\n"
+    assert notes["late"].read_text(encoding="utf-8") == "# Note\nbody\n"
+
+
+def test_apply_plan_rejects_unknown_versions(tmp_path):
+    plan_path = tmp_path / "plan.json"
+    plan_path.write_text(json.dumps({"version": 99, "root": str(tmp_path), "changes": []}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        apply_plan(str(plan_path))
+
+
+def test_worker_copy_writes_each_note_durably(tmp_path):
+    note = _note(tmp_path, "a.md")
+    writer = FrontmatterWriter(tmp_path, fsync_batch=64)
+    copy = pickle.loads(pickle.dumps(writer))
+
+    assert copy.fsync_batch == 1
+    assert copy.prepend(note, FRONTMATTER)
+    # Written without a flush: nobody flushes a worker's copy
+    assert note.read_text(encoding="utf-8").startswith(FRONTMATTER)
+    assert copy.flush() == [] and writer.flush() == []
+
+
+def test_worker_copy_raises_its_own_failure(tmp_path, fail_replace):
+    note = _note(tmp_path, "a.md")
+    fail_replace.add("a.md")
+    copy = pickle.loads(pickle.dumps(FrontmatterWriter(tmp_path)))
+    with pytest.raises(OSError):
+        copy.prepend(note, FRONTMATTER)
+    assert note.read_text(encoding="utf-8") == "# Note\nbody\n"
+
+
+@pytest.mark.parametrize("options", [{"dry_run": True}, {"collect_diff": True}, {"collect_plan": True}])
+def test_dry_run_writer_cannot_be_sent_to_workers(tmp_path, options):
+    with pytest.raises(ValueError):
+        pickle.dumps(FrontmatterWriter(tmp_path, **options))
@@ -1,11 +1,14 @@
 """Enhanced conversation analysis API with decision tracking and visualization"""
-from fastapi import APIRouter, UploadFile, File, HTTPException, Response
-from typing import Dict, Any
+from fastapi import APIRouter, UploadFile, File, HTTPException, Query, Request, Response
+from typing import Dict, Any, Optional
+import io
 import json
+import zipfile
 
-from app.core.enhanced_content_analyzer import EnhancedContentAnalyzer
+from app.core.analysis_pipeline import get_analysis_pipeline
 from app.core.conversation_parser import ConversationParser
 from app.core.canvas_generator import CanvasDecisionVisualizer, ExcalidrawDecisionVisualizer
+from app.core.canvas_sync import CanvasSynchronizer
 
 router = APIRouter(tags=["Enhanced Conversations"])
 
@@ -27,23 +30,18 @@ async def analyze_conversation_enhanced(file: UploadFile = File(...)) -> Dict[st
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        # Initialize enhanced analyzer
-        analyzer = EnhancedContentAnalyzer()
-
-        # Extract structured dialogue
-        messages = analyzer.extract_user_claude_dialogue(text_content)
+        # Run the full stage graph once; every output shares the same context
+        pipeline = get_analysis_pipeline()
+        context = pipeline.run(text_content, ["parse"])
+        messages = context.messages
 
         if not messages:
             raise HTTPException(status_code=400, detail="No valid conversation content found")
 
-        # Extract decisions with AI
-        decisions = analyzer.extract_decisions(messages)
-
-        # Create decision mindmap
-        mindmap_data = analyzer.create_decision_mindmap(decisions)
-
-        # Generate enhanced content ideas
-        content_ideas = analyzer.generate_enhanced_content_ideas(messages, decisions)
+        pipeline.run(text_content, ["sentiment", "entities", "decision_details", "mindmap", "topics"], context)
+        decisions = context.decisions
+        mindmap_data = context["mindmap"]
+        content_ideas = context["topics"]
 
         # Compile comprehensive response
         response = {
@@ -58,7 +56,8 @@ async def analyze_conversation_enhanced(file: UploadFile = File(...)) -> Dict[st
             "decisions": {
                 "extracted_decisions": decisions,
                 "decision_mindmap": mindmap_data,
-                "summary": mindmap_data.get("summary", {})
+                "summary": mindmap_data.get("summary", {}),
+                "extraction": context.extraction
             },
             "content_analysis": content_ideas,
             "technical_insights": {
@@ -86,13 +85,13 @@ async def extract_decisions_only(file: UploadFile = File(...)) -> Dict[str, Any]
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        analyzer = EnhancedContentAnalyzer()
-        messages = analyzer.extract_user_claude_dialogue(text_content)
-        decisions = analyzer.extract_decisions(messages)
-        mindmap_data = analyzer.create_decision_mindmap(decisions)
+        context = get_analysis_pipeline().run(text_content, ["decision_details", "mindmap"])
+        decisions = context.decisions
+        mindmap_data = context["mindmap"]
 
         return {
             "decisions": decisions,
+            "extraction": context.extraction,
             "mindmap": mindmap_data,
             "decision_summary": {
                 "total_decisions": len(decisions),
@@ -117,10 +116,8 @@ async def generate_decision_mindmap(file: UploadFile = File(...)) -> Dict[str, A
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        analyzer = EnhancedContentAnalyzer()
-        messages = analyzer.extract_user_claude_dialogue(text_content)
-        decisions = analyzer.extract_decisions(messages)
-        mindmap_data = analyzer.create_decision_mindmap(decisions)
+        context = get_analysis_pipeline().run(text_content, ["mindmap"])
+        mindmap_data = context["mindmap"]
 
         return {
             "mindmap_html": mindmap_data["html"],
@@ -133,37 +130,78 @@ async def generate_decision_mindmap(file: UploadFile = File(...)) -> Dict[str, A
         raise HTTPException(status_code=500, detail=f"Mindmap generation failed: {str(e)}")
 
 @router.post("/canvas/generate")
-async def generate_decision_canvas(file: UploadFile = File(...)) -> Response:
+async def generate_decision_canvas(
+    request: Request,
+    file: UploadFile = File(...),
+    group_by: str = Query("none", pattern="^(none|domain|message)$", description="Group decisions by technical domain or source message"),
+    max_nodes: Optional[int] = Query(None, ge=0, description="Decision nodes per canvas before paginating (0 = unlimited)"),
+    collapse_threshold: Optional[int] = Query(None, ge=1, description="Collapse groups larger than this into one node"),
+    page: int = Query(1, ge=1, description="Page of a paginated canvas to return as JSON"),
+    output: str = Query("json", pattern="^(json|zip)$", description="zip: index canvas plus every linked sub-canvas"),
+    folder: str = Query("", description="Vault folder the canvases will be saved in (for sub-canvas links)")
+) -> Response:
     """
     Generate Obsidian Canvas file for decision visualization
 
     Returns:
-    Canvas JSON file for import into Obsidian
+    Canvas JSON file for import into Obsidian. When the decisions exceed
+    max_nodes this is one page (X-Canvas-Page / X-Canvas-Pages headers, and
+    X-Canvas-Next with the URL of the next page); output=zip returns an index
+    canvas and all linked sub-canvases instead
     """
     try:
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        analyzer = EnhancedContentAnalyzer()
-        messages = analyzer.extract_user_claude_dialogue(text_content)
-        decisions = analyzer.extract_decisions(messages)
+        # Visualizations only need decisions - skip sentiment/NER entirely
+        context = get_analysis_pipeline().run(text_content, ["decisions"])
+        decisions = context.decisions
 
         # Generate Canvas
         canvas_generator = CanvasDecisionVisualizer()
         conversation_title = file.filename.replace('.md', '').replace('-', ' ').title() if file.filename else "Decision Flow"
-        canvas_json = canvas_generator.create_decision_canvas(decisions, conversation_title)
-
-        return Response(
-            content=canvas_json,
-            media_type="application/json",
-            headers={"Content-Disposition": f"attachment; filename={conversation_title.replace(' ', '-')}-decision-flow.canvas"}
-        )
-
+        base_name = f"{conversation_title.replace(' ', '-')}-decision-flow"
+        headers = {"X-Decisions-Truncated": str(context.extraction["truncated"]).lower()}
+
+        if output == "zip":
+            canvases = canvas_generator.create_decision_canvases(
+                decisions, conversation_title, group_by=group_by, max_nodes=max_nodes,
+                collapse_threshold=collapse_threshold, base_name=base_name, folder=folder
+            )
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+                for filename, canvas_json in canvases.items():
+                    archive.writestr(filename, canvas_json)
+            headers["Content-Disposition"] = f"attachment; filename={base_name}.zip"
+            headers["X-Canvas-Pages"] = str(max(1, len(canvases) - 1))
+            return Response(content=buffer.getvalue(), media_type="application/zip", headers=headers)
+
+        try:
+            canvas_json, pages = canvas_generator.create_decision_canvas_page(
+                decisions, conversation_title, page=page, group_by=group_by, max_nodes=max_nodes,
+                collapse_threshold=collapse_threshold
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+        filename = f"{base_name}.canvas" if pages == 1 else f"{base_name}-part-{page}.canvas"
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+        headers["X-Canvas-Page"] = str(page)
+        headers["X-Canvas-Pages"] = str(pages)
+        if page < pages:
+            headers["X-Canvas-Next"] = str(request.url.include_query_params(page=page + 1))
+        return Response(content=canvas_json, media_type="application/json", headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Canvas generation failed: {str(e)}")
 
 @router.post("/excalidraw/generate")
-async def generate_decision_excalidraw(file: UploadFile = File(...)) -> Response:
+async def generate_decision_excalidraw(
+    file: UploadFile = File(...),
+    compressed: Optional[bool] = Query(None, description="Write the drawing as an LZ-string compressed-json block")
+) -> Response:
     """
     Generate Excalidraw file for decision visualization
 
@@ -174,24 +212,74 @@ async def generate_decision_excalidraw(file: UploadFile = File(...)) -> Response
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        analyzer = EnhancedContentAnalyzer()
-        messages = analyzer.extract_user_claude_dialogue(text_content)
-        decisions = analyzer.extract_decisions(messages)
+        # Visualizations only need decisions - skip sentiment/NER entirely
+        context = get_analysis_pipeline().run(text_content, ["decisions"])
+        decisions = context.decisions
 
         # Generate Excalidraw
         excalidraw_generator = ExcalidrawDecisionVisualizer()
         conversation_title = file.filename.replace('.md', '').replace('-', ' ').title() if file.filename else "Decision Flow"
-        excalidraw_content = excalidraw_generator.create_decision_excalidraw(decisions, conversation_title)
+        excalidraw_content = excalidraw_generator.create_decision_excalidraw(decisions, conversation_title, compressed)
 
         return Response(
             content=excalidraw_content,
             media_type="text/markdown",
-            headers={"Content-Disposition": f"attachment; filename={conversation_title.replace(' ', '-')}-decision-flow.excalidraw.md"}
+            headers={
+                "Content-Disposition": f"attachment; filename={conversation_title.replace(' ', '-')}-decision-flow.excalidraw.md",
+                "X-Decisions-Truncated": str(context.extraction["truncated"]).lower()
+            }
         )
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Excalidraw generation failed: {str(e)}")
 
+@router.post("/canvas/update")
+async def update_decision_visualization(
+    file: UploadFile = File(..., description="Conversation export"),
+    existing: UploadFile = File(..., description="Existing .canvas or .excalidraw.md to patch"),
+    group_by: str = Query("none", pattern="^(none|domain|message)$"),
+    collapse_threshold: Optional[int] = Query(None, ge=1)
+) -> Response:
+    """
+    Re-sync an existing Canvas or Excalidraw file with a conversation
+
+    Decisions are matched by content-derived ids: only added, removed or
+    changed nodes are touched, and positions edited in Obsidian are kept.
+
+    Returns:
+    The patched file (unchanged bytes when nothing changed, see X-Sync-Changed)
+    """
+    try:
+        text_content = (await file.read()).decode('utf-8')
+        existing_content = (await existing.read()).decode('utf-8')
+        filename = existing.filename or ""
+
+        context = get_analysis_pipeline().run(text_content, ["decisions"])
+        conversation_title = file.filename.replace('.md', '').replace('-', ' ').title() if file.filename else "Decision Flow"
+
+        options = {"group_by": group_by, "collapse_threshold": collapse_threshold} if filename.endswith(".canvas") else {}
+        content, stats = CanvasSynchronizer().update_content(
+            filename, existing_content, context.decisions, conversation_title, **options
+        )
+
+        return Response(
+            content=content,
+            media_type="application/json" if filename.endswith(".canvas") else "text/markdown",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}",
+                "X-Sync-Changed": str(stats["changed"]).lower(),
+                "X-Sync-Added": str(stats["added"]),
+                "X-Sync-Removed": str(stats["removed"]),
+                "X-Sync-Updated": str(stats["updated"]),
+                "X-Decisions-Truncated": str(context.extraction["truncated"]).lower()
+            }
+        )
+
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Cannot update visualization: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Visualization update failed: {str(e)}")
+
 @router.post("/obsidian/visualize")
 async def generate_obsidian_visualizations(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
@@ -204,9 +292,9 @@ async def generate_obsidian_visualizations(file: UploadFile = File(...)) -> Dict
         content = await file.read()
         text_content = content.decode('utf-8')
 
-        analyzer = EnhancedContentAnalyzer()
-        messages = analyzer.extract_user_claude_dialogue(text_content)
-        decisions = analyzer.extract_decisions(messages)
+        # Visualizations only need decisions - skip sentiment/NER entirely
+        context = get_analysis_pipeline().run(text_content, ["decisions"])
+        decisions = context.decisions
 
         conversation_title = file.filename.replace('.md', '').replace('-', ' ').title() if file.filename else "Decision Flow"
 
@@ -220,6 +308,7 @@ async def generate_obsidian_visualizations(file: UploadFile = File(...)) -> Dict
         return {
             "conversation_title": conversation_title,
             "decisions_found": len(decisions),
+            "extraction": context.extraction,
             "visualizations": {
                 "canvas": {
                     "filename": f"{conversation_title.replace(' ', '-')}-decision-flow.canvas",
@@ -247,10 +336,11 @@ async def generate_obsidian_visualizations(file: UploadFile = File(...)) -> Dict
 async def health_check():
     """Health check for enhanced analyzer"""
     try:
-        analyzer = EnhancedContentAnalyzer()
+        analyzer = get_analysis_pipeline().analyzer
         return {
             "status": "healthy",
             "nlp_model_loaded": analyzer.nlp is not None,
+            "inference_server": analyzer.inference_client.address if analyzer.inference_client else None,
             "features": [
                 "decision_extraction",
                 "sentiment_analysis",
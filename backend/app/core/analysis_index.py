@@ -0,0 +1,240 @@
+"""
+Persisted analysis index for ConvoCanvas
+Stores the decisions extracted from every conversation note in a vault in a
+small SQLite database, so vault-wide views can be rebuilt without
+re-analyzing conversations that have not changed.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_DATE_RE = re.compile(r"(\d{4}-\d{2}-\d{2})")
+_FRONTMATTER_DATE_RE = re.compile(r"^date:\s*['\"]?(\d{4}-\d{2}-\d{2})", re.MULTILINE)
+_MAX_QUERY_PARAMS = 500
+SKIP_DIRS = {".obsidian", ".smart-env", ".trash", ".git", ".convocanvas"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    path TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    conversation_date TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    analyzed_at REAL NOT NULL,
+    decision_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS decisions (
+    conversation_path TEXT NOT NULL REFERENCES conversations(path) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    role TEXT,
+    confidence REAL,
+    message_index INTEGER,
+    technical_domains TEXT NOT NULL,
+    PRIMARY KEY (conversation_path, position)
+);
+CREATE TABLE IF NOT EXISTS canvas_groups (
+    canvas TEXT NOT NULL,
+    group_key TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    nodes TEXT NOT NULL,
+    edges TEXT NOT NULL,
+    PRIMARY KEY (canvas, group_key)
+);
+"""
+
+
+class AnalysisIndex:
+    """SQLite-backed store of per-conversation decisions"""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    # Indexing -------------------------------------------------------------------
+
+    def index_vault(self, vault_path: str, pipeline=None, pattern: str = "*.md",
+                    folders: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """
+        Analyze new or changed conversation notes and drop deleted ones
+
+        Args:
+            vault_path: Root of the Obsidian vault
+            pipeline: AnalysisPipeline to use (the global one if omitted)
+            pattern: File name pattern of notes to index
+            folders: Vault-relative folders to scan (the whole vault if omitted)
+
+        Returns:
+            {"updated": [...], "removed": [...], "unchanged": [...]} vault-relative paths
+        """
+        if pipeline is None:
+            from app.core.analysis_pipeline import get_analysis_pipeline
+            pipeline = get_analysis_pipeline()
+
+        vault = Path(vault_path)
+        prefixes = tuple(f"{folder.strip('/')}/" for folder in folders or [])
+        known = {
+            row["path"]: row
+            for row in self.conn.execute("SELECT path, mtime, size, content_hash FROM conversations")
+            if not prefixes or row["path"].startswith(prefixes)
+        }
+        seen = set()
+        report = {"updated": [], "removed": [], "unchanged": []}
+
+        roots = [vault / prefix for prefix in prefixes] if prefixes else [vault]
+        walk = (entry for root in roots for entry in os.walk(root))
+        for root, dirs, files in walk:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+            for name in files:
+                full = Path(root) / name
+                if not full.match(pattern):
+                    continue
+                relative = full.relative_to(vault).as_posix()
+                seen.add(relative)
+                stat = full.stat()
+                row = known.get(relative)
+                if row and row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+                    report["unchanged"].append(relative)
+                    continue
+
+                content = full.read_text(encoding="utf-8", errors="replace")
+                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                if row and row["content_hash"] == content_hash:
+                    # Touched but not edited - just refresh the stat fingerprint
+                    self.conn.execute("UPDATE conversations SET mtime = ?, size = ? WHERE path = ?",
+                                      (stat.st_mtime, stat.st_size, relative))
+                    report["unchanged"].append(relative)
+                    continue
+
+                decisions = pipeline.run(content, ["decisions"]).decisions
+                self.store(relative, self._title(content, full), self._date(content, Path(relative), stat.st_mtime),
+                           content_hash, stat.st_mtime, stat.st_size, decisions)
+                report["updated"].append(relative)
+
+        for path in set(known) - seen:
+            self.conn.execute("DELETE FROM conversations WHERE path = ?", (path,))
+            report["removed"].append(path)
+
+        self.conn.commit()
+        logger.info("Indexed vault %s: %d updated, %d removed, %d unchanged", vault_path,
+                    len(report["updated"]), len(report["removed"]), len(report["unchanged"]))
+        return report
+
+    def store(self, path: str, title: str, conversation_date: str, content_hash: str,
+              mtime: float, size: int, decisions: List[Dict]):
+        """Replace the indexed decisions of one conversation"""
+        with self.conn:
+            self.conn.execute("DELETE FROM conversations WHERE path = ?", (path,))
+            self.conn.execute(
+                "INSERT INTO conversations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, title, conversation_date, content_hash, mtime, size, time.time(), len(decisions))
+            )
+            self.conn.executemany(
+                "INSERT INTO decisions VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (path, i, d.get("text", ""), d.get("role"), d.get("confidence"), d.get("message_index"),
+                     json.dumps(d.get("technical_domains") or []))
+                    for i, d in enumerate(decisions)
+                ]
+            )
+
+    def _title(self, content: str, path: Path) -> str:
+        match = re.search(r"^# (.+)$", content, re.MULTILINE)
+        return match.group(1).strip() if match else path.stem
+
+    def _date(self, content: str, path: Path, mtime: float) -> str:
+        """Conversation date from frontmatter, then the path, then the file mtime (first valid one)"""
+        frontmatter = _FRONTMATTER_DATE_RE.search(content[:2048])
+        candidates = ([frontmatter.group(1)] if frontmatter else []) + _DATE_RE.findall(path.as_posix())
+        for candidate in candidates:
+            try:
+                return date.fromisoformat(candidate).isoformat()
+            except ValueError:
+                # e.g. 2025-13-40 in a file name
+                continue
+        return datetime.fromtimestamp(mtime).strftime("%Y-%m-%d")
+
+    # Queries ----------------------------------------------------------------------
+
+    def conversations(self, paths: Optional[Iterable[str]] = None) -> List[sqlite3.Row]:
+        """Indexed conversations (all, or only ``paths``) ordered by date then path"""
+        if paths is None:
+            return self.conn.execute("SELECT * FROM conversations ORDER BY conversation_date, path").fetchall()
+
+        wanted = list(paths)
+        rows = []
+        # Stay below SQLite's limit on bound parameters per statement
+        for start in range(0, len(wanted), _MAX_QUERY_PARAMS):
+            chunk = wanted[start:start + _MAX_QUERY_PARAMS]
+            rows.extend(self.conn.execute(
+                f"SELECT * FROM conversations WHERE path IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return sorted(rows, key=lambda row: (row["conversation_date"], row["path"]))
+
+    def decision_domains(self) -> List[sqlite3.Row]:
+        """(path, date, content hash, domains) per decision - enough to plan canvas groups"""
+        return self.conn.execute(
+            "SELECT c.path, c.conversation_date, c.content_hash, d.technical_domains "
+            "FROM decisions d JOIN conversations c ON c.path = d.conversation_path "
+            "ORDER BY c.conversation_date, c.path, d.position"
+        ).fetchall()
+
+    def decisions(self, path: str) -> List[Dict]:
+        """Indexed decisions of one conversation, in extraction order"""
+        rows = self.conn.execute(
+            "SELECT * FROM decisions WHERE conversation_path = ? ORDER BY position", (path,)
+        )
+        return [
+            {"position": row["position"], "text": row["text"], "role": row["role"], "confidence": row["confidence"],
+             "message_index": row["message_index"], "technical_domains": json.loads(row["technical_domains"])}
+            for row in rows
+        ]
+
+    # Rendered canvas fragments ------------------------------------------------------
+
+    def cached_groups(self, canvas: str) -> Dict[str, sqlite3.Row]:
+        return {row["group_key"]: row for row in self.conn.execute(
+            "SELECT group_key, signature, width, height FROM canvas_groups WHERE canvas = ?", (canvas,)
+        )}
+
+    def load_group(self, canvas: str, group_key: str) -> sqlite3.Row:
+        return self.conn.execute(
+            "SELECT * FROM canvas_groups WHERE canvas = ? AND group_key = ?", (canvas, group_key)
+        ).fetchone()
+
+    def save_group(self, canvas: str, group_key: str, signature: str, width: int, height: int,
+                   nodes: List[Dict], edges: List[Dict]):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO canvas_groups VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (canvas, group_key, signature, width, height, json.dumps(nodes), json.dumps(edges))
+        )
+
+    def prune_groups(self, canvas: str, keep: Iterable[str]):
+        keep = set(keep)
+        stale = [key for key in self.cached_groups(canvas) if key not in keep]
+        self.conn.executemany("DELETE FROM canvas_groups WHERE canvas = ? AND group_key = ?",
+                              [(canvas, key) for key in stale])
+
+    def commit(self):
+        self.conn.commit()
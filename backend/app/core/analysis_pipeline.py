@@ -0,0 +1,141 @@
+"""
+Declarative analysis pipeline for ConvoCanvas
+Each analysis step is a stage with explicit dependencies; endpoints ask for the
+outputs they need and only that part of the graph runs, memoized per request
+"""
+import logging
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.enhanced_content_analyzer import EnhancedContentAnalyzer
+from app.core.metrics import record_cache, time_stage
+
+logger = logging.getLogger(__name__)
+
+
+class PipelineStage:
+    """A named analysis step and the stages it depends on"""
+
+    def __init__(self, name: str, requires: Iterable[str], func: Callable[["AnalysisContext"], Any]):
+        self.name = name
+        self.requires = list(requires)
+        self.func = func
+
+
+class AnalysisContext:
+    """Per-request state: the raw content plus memoized stage results"""
+
+    def __init__(self, content: str):
+        self.content = content
+        self.results: Dict[str, Any] = {}
+
+    def __getitem__(self, stage: str) -> Any:
+        return self.results[stage]
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self.results
+
+    @property
+    def messages(self) -> List[Dict]:
+        """Parsed messages (enriched in place by the message stages that ran)"""
+        return self.results.get("parse", [])
+
+    @property
+    def decisions(self) -> List[Dict]:
+        """Extracted decisions (enriched in place if decision_details ran)"""
+        return self.results.get("decisions", {}).get("decisions", [])
+
+    @property
+    def extraction(self) -> Dict[str, Any]:
+        """Guardrail status of the decision extraction stage"""
+        return self.results.get("decisions", {}).get("extraction", {})
+
+
+class AnalysisPipeline:
+    """
+    Stage graph over EnhancedContentAnalyzer
+
+    parse -> segment -> domains -> decisions -> decision_details
+                     -> sentiment / entities
+    topics and mindmap sit at the end of the graph.
+    """
+
+    def __init__(self, analyzer: Optional[EnhancedContentAnalyzer] = None):
+        self.analyzer = analyzer or EnhancedContentAnalyzer()
+        self.stages: Dict[str, PipelineStage] = {}
+        self._register_default_stages()
+
+    def register(self, name: str, requires: Iterable[str], func: Callable[[AnalysisContext], Any]):
+        """Add or replace a stage"""
+        self.stages[name] = PipelineStage(name, requires, func)
+
+    def _register_default_stages(self):
+        """Wire the analyzer methods into the stage graph"""
+        analyzer = self.analyzer
+
+        self.register("parse", [], lambda ctx: analyzer.split_dialogue(ctx.content))
+        self.register("segment", ["parse"], lambda ctx: analyzer.segment_messages(ctx.messages))
+        self.register("domains", ["parse"], lambda ctx: analyzer.classify_message_domains(ctx.messages))
+        self.register("sentiment", ["segment"], lambda ctx: analyzer.analyze_message_sentiment(ctx.messages))
+        self.register("entities", ["segment"], lambda ctx: analyzer.extract_message_entities(ctx.messages))
+        self.register(
+            "decisions", ["segment", "domains"],
+            lambda ctx: analyzer.extract_decisions_guarded(ctx.messages, enrich=False)
+        )
+        self.register("decision_details", ["decisions"], lambda ctx: analyzer.enrich_decisions(ctx.decisions))
+        self.register(
+            "topics", ["sentiment", "domains", "decisions"],
+            lambda ctx: analyzer.generate_enhanced_content_ideas(ctx.messages, ctx.decisions)
+        )
+        self.register("mindmap", ["decisions"], lambda ctx: analyzer.create_decision_mindmap(ctx.decisions))
+
+    def plan(self, outputs: Iterable[str]) -> List[str]:
+        """Topologically ordered list of stages needed for the requested outputs"""
+        order: List[str] = []
+        visiting = set()
+
+        def visit(name: str):
+            if name in order:
+                return
+            if name not in self.stages:
+                raise ValueError(f"Unknown pipeline stage: {name}")
+            if name in visiting:
+                raise ValueError(f"Pipeline stage cycle detected at: {name}")
+            visiting.add(name)
+            for dependency in self.stages[name].requires:
+                visit(dependency)
+            visiting.discard(name)
+            order.append(name)
+
+        for output in outputs:
+            visit(output)
+        return order
+
+    def run(self, content: str, outputs: Iterable[str], context: Optional[AnalysisContext] = None) -> AnalysisContext:
+        """
+        Run only the stages required for ``outputs``
+
+        Passing an existing context reuses every stage result already computed
+        for this request.
+        """
+        context = context or AnalysisContext(content)
+        for name in self.plan(outputs):
+            if name in context:
+                record_cache("pipeline_stage", hit=True)
+                continue
+            record_cache("pipeline_stage", hit=False)
+            with time_stage(name):
+                context.results[name] = self.stages[name].func(context)
+        return context
+
+
+# Global pipeline instance (shares one set of loaded NLP models across requests)
+_analysis_pipeline = None
+
+
+def get_analysis_pipeline() -> AnalysisPipeline:
+    """Get or create the global analysis pipeline"""
+    global _analysis_pipeline
+    if _analysis_pipeline is None:
+        logger.info("Initializing analysis pipeline...")
+        _analysis_pipeline = AnalysisPipeline()
+    return _analysis_pipeline
@@ -0,0 +1,191 @@
+"""
+Batched transformer inference for ConvoCanvas
+Splits whole conversations into token-aware chunks and runs them through
+transformers pipelines in length-sorted batches, so each batch is padded only
+to its own longest chunk. Results are mapped back to the message they came
+from and aggregated per message.
+"""
+import os
+import re
+import logging
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    TORCH_AVAILABLE = False
+
+from app.core.metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+# Rough tokens per whitespace word for subword tokenizers, used without a tokenizer
+TOKENS_PER_WORD = 1.3
+
+
+def _inference_mode():
+    return torch.inference_mode() if TORCH_AVAILABLE else nullcontext()
+
+
+class TokenChunker:
+    """Packs sentences into chunks of at most ``max_tokens`` tokens"""
+
+    def __init__(self, tokenizer=None, max_tokens: int = 510):
+        self.tokenizer = tokenizer
+        self.max_tokens = max_tokens
+
+    @classmethod
+    def for_pipeline(cls, pipe, max_tokens: Optional[int] = None) -> "TokenChunker":
+        """Chunker sized to a pipeline's model (minus room for special tokens)"""
+        tokenizer = getattr(pipe, "tokenizer", None)
+        if max_tokens is None:
+            model_max = getattr(tokenizer, "model_max_length", 512) or 512
+            # Tokenizers without a limit report a huge sentinel value
+            max_tokens = min(model_max, 1024) - 2
+        return cls(tokenizer, max_tokens)
+
+    def count(self, texts: Sequence[str]) -> List[int]:
+        """Token count of each text (one batched tokenizer call)"""
+        if not texts:
+            return []
+        if self.tokenizer is None:
+            return [int(len(text.split()) * TOKENS_PER_WORD) + 1 for text in texts]
+        encoded = self.tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def _split_long(self, sentence: str) -> List[str]:
+        """Split a single sentence that does not fit in one chunk"""
+        if self.tokenizer is not None and getattr(self.tokenizer, "is_fast", False):
+            offsets = self.tokenizer(sentence, add_special_tokens=False,
+                                     return_offsets_mapping=True)["offset_mapping"]
+            return [
+                sentence[offsets[i][0]:offsets[min(i + self.max_tokens, len(offsets)) - 1][1]]
+                for i in range(0, len(offsets), self.max_tokens)
+            ]
+        words = sentence.split()
+        step = max(1, int(self.max_tokens / TOKENS_PER_WORD))
+        return [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+
+    def chunk(self, text: str) -> List[Tuple[str, int]]:
+        """(chunk text, token count) pairs covering the whole text"""
+        sentences = [s.strip() for s in _SENTENCE_BREAK.split(text) if s and s.strip()]
+        chunks: List[Tuple[str, int]] = []
+        current: List[str] = []
+        used = 0
+        for sentence, tokens in zip(sentences, self.count(sentences)):
+            if tokens > self.max_tokens:
+                pieces = self._split_long(sentence)
+                pairs = list(zip(pieces, self.count(pieces)))
+            else:
+                pairs = [(sentence, tokens)]
+            for piece, piece_tokens in pairs:
+                if current and used + piece_tokens > self.max_tokens:
+                    chunks.append((" ".join(current), used))
+                    current, used = [], 0
+                current.append(piece)
+                used += piece_tokens
+        if current:
+            chunks.append((" ".join(current), used))
+        return chunks
+
+
+class BatchedInference:
+    """Runs pipelines over many chunks in length-sorted batches"""
+
+    def __init__(self, batch_size: Optional[int] = None, summary_batch_size: Optional[int] = None):
+        self.batch_size = int(batch_size or os.getenv("INFERENCE_BATCH_SIZE", "16"))
+        self.summary_batch_size = int(summary_batch_size or os.getenv("INFERENCE_SUMMARY_BATCH_SIZE", "4"))
+
+    def run(self, pipe, texts: Sequence[str], lengths: Optional[Sequence[int]] = None,
+            batch_size: Optional[int] = None, **kwargs) -> List[Any]:
+        """
+        Run ``pipe`` over ``texts`` and return outputs in input order
+
+        Texts are sorted by length and fed ``batch_size`` at a time; the
+        pipeline pads every batch to its longest member (dynamic padding), so
+        similar lengths per batch means little wasted compute.
+        """
+        if not texts:
+            return []
+        batch_size = batch_size or self.batch_size
+        lengths = lengths or [len(text) for text in texts]
+        order = sorted(range(len(texts)), key=lambda i: lengths[i], reverse=True)
+        results: List[Any] = [None] * len(texts)
+        with _inference_mode():
+            for start in range(0, len(order), batch_size):
+                indices = order[start:start + batch_size]
+                outputs = pipe([texts[i] for i in indices], batch_size=len(indices), truncation=True, **kwargs)
+                for i, output in zip(indices, outputs):
+                    # Some pipelines wrap each result in a single-item list
+                    results[i] = output[0] if isinstance(output, list) else output
+        return results
+
+    def sentiment_by_message(self, pipe, messages: List[Dict]) -> Dict[str, Any]:
+        """
+        Sentiment of every message, covering the full text of each
+
+        Chunk scores are signed (+ positive / - negative) and averaged per
+        message, weighted by chunk token count.
+        """
+        chunker = TokenChunker.for_pipeline(pipe)
+        texts, lengths, owners = [], [], []
+        for index, message in enumerate(messages):
+            for text, tokens in chunker.chunk(message.get("content", "")):
+                texts.append(text)
+                lengths.append(tokens)
+                owners.append(index)
+
+        with time_stage("batched_sentiment"):
+            outputs = self.run(pipe, texts, lengths)
+
+        totals: Dict[int, List[float]] = {}
+        for owner, tokens, output in zip(owners, lengths, outputs):
+            sign = -1.0 if output["label"].upper().startswith("NEG") else 1.0
+            weighted = totals.setdefault(owner, [0.0, 0.0, 0])
+            weighted[0] += sign * output["score"] * tokens
+            weighted[1] += tokens
+            weighted[2] += 1
+
+        per_message = []
+        overall_sum = overall_tokens = 0.0
+        for index, message in enumerate(messages):
+            if index not in totals:
+                continue
+            signed, tokens, count = totals[index]
+            polarity = signed / tokens if tokens else 0.0
+            overall_sum += signed
+            overall_tokens += tokens
+            per_message.append({
+                "message_index": index,
+                "role": message.get("role"),
+                "label": "POSITIVE" if polarity >= 0 else "NEGATIVE",
+                "polarity": polarity,
+                "confidence": abs(polarity),
+                "chunks": count,
+            })
+
+        overall = overall_sum / overall_tokens if overall_tokens else 0.0
+        return {
+            "overall": "POSITIVE" if overall >= 0 else "NEGATIVE",
+            "polarity": overall,
+            "confidence": abs(overall),
+            "chunks": len(texts),
+            "messages": per_message,
+            "details": [dict(output) for output in outputs[:5]],
+        }
+
+
+# Global batched inference runner
+_batched_inference = None
+
+
+def get_batched_inference() -> BatchedInference:
+    """Get or create the global batched inference runner"""
+    global _batched_inference
+    if _batched_inference is None:
+        _batched_inference = BatchedInference()
+    return _batched_inference
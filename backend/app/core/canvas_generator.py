@@ -2,17 +2,48 @@
 Obsidian Canvas Generator for Decision Visualization
 Creates native .canvas files for decision flow diagrams
 """
+import os
 import json
-import uuid
-import base64
-import zlib
-from typing import List, Dict, Any, Tuple
+import hashlib
+from typing import List, Dict, Any, Optional, Tuple
 import math
 
+from app.core import lz_string
+from app.core.canvas_layout import CanvasLayoutEngine, LayoutGroup
+from app.core.metrics import time_stage
+
+def decision_key(decision: Dict) -> str:
+    """Stable key for a decision, derived from its normalized text"""
+    normalized = " ".join(decision.get("text", "").lower().split())
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def decision_node_ids(decisions: List[Dict], prefix: str = "decision") -> List[str]:
+    """
+    Content-derived node ids, unique within ``decisions``
+
+    Ids survive re-extraction and reordering, so regenerated files can be
+    matched against earlier ones.
+    """
+    ids = []
+    seen: Dict[str, int] = {}
+    for decision in decisions:
+        node_id = f"{prefix}-{decision_key(decision)}"
+        seen[node_id] = seen.get(node_id, 0) + 1
+        ids.append(node_id if seen[node_id] == 1 else f"{node_id}-{seen[node_id]}")
+    return ids
+
+
 class CanvasDecisionVisualizer:
     """Generates Obsidian Canvas files for decision visualization"""
 
-    def __init__(self):
+    def __init__(self, number_decisions: bool = True):
+        """
+        Args:
+            number_decisions: Label decision nodes "Decision #N" (positional, so
+                off for files that are patched incrementally)
+        """
+        self.number_decisions = number_decisions
         self.canvas_width = 2000
         self.canvas_height = 1500
         self.node_width = 300
@@ -28,61 +59,234 @@ class CanvasDecisionVisualizer:
             "recommendation": "5",     # Purple - recommendations
             "summary": "6"             # Gray - summary nodes
         }
+        self.group_colors = ["3", "4", "5", "2", "1", "6"]
+
+        # Decision nodes per canvas before splitting into linked sub-canvases
+        self.max_nodes = int(os.getenv("CANVAS_MAX_NODES", "150"))
+        self.layout_engine = CanvasLayoutEngine(
+            node_width=self.node_width, node_height=self.node_height, gap=self.padding
+        )
 
-    def create_decision_canvas(self, decisions: List[Dict], conversation_title: str = "Decision Flow") -> str:
+    def create_decision_canvas(self, decisions: List[Dict], conversation_title: str = "Decision Flow",
+                               group_by: str = "none", collapse_threshold: Optional[int] = None) -> str:
         """
         Create a Canvas file showing decision flow and relationships
 
         Args:
             decisions: List of decision objects with text, confidence, role, etc.
             conversation_title: Title for the canvas
+            group_by: "none", "domain" or "message"
+            collapse_threshold: Groups with more decisions than this become a single node
 
         Returns:
             JSON string for .canvas file
         """
+        canvases = self.create_decision_canvases(
+            decisions, conversation_title, group_by=group_by, max_nodes=0, collapse_threshold=collapse_threshold
+        )
+        return next(iter(canvases.values()))
+
+    def create_decision_canvases(self, decisions: List[Dict], conversation_title: str = "Decision Flow",
+                                 group_by: str = "none", max_nodes: Optional[int] = None,
+                                 collapse_threshold: Optional[int] = None, base_name: Optional[str] = None,
+                                 folder: str = "") -> Dict[str, str]:
+        """
+        Create one canvas, or an index canvas plus linked sub-canvases when the
+        decisions exceed ``max_nodes``
+
+        Args:
+            max_nodes: Decision nodes per canvas (CANVAS_MAX_NODES if None, 0 for unlimited)
+            base_name: File name stem (derived from the title if omitted)
+            folder: Vault folder the files will live in (used for file links)
+
+        Returns:
+            {filename: canvas JSON}, index canvas first
+        """
+        base_name = base_name or f"{conversation_title.replace(' ', '-')}-decision-flow"
         if not decisions:
-            return self._create_empty_canvas(conversation_title)
+            return {f"{base_name}.canvas": self._create_empty_canvas(conversation_title)}
+
+        ids, pages = self._paginate(decisions, group_by, max_nodes, collapse_threshold)
+        if len(pages) == 1:
+            return {f"{base_name}.canvas": self._render_page(decisions, ids, pages[0], conversation_title, group_by)}
+
+        prefix = f"{folder.rstrip('/')}/" if folder else ""
+        index_name = f"{base_name}.canvas"
+        page_names = [f"{base_name}-part-{n}.canvas" for n in range(1, len(pages) + 1)]
+
+        canvases = {index_name: self._render_index(decisions, pages, conversation_title, [prefix + name for name in page_names])}
+        for n, (page, name) in enumerate(zip(pages, page_names)):
+            links = {"index": prefix + index_name}
+            if n > 0:
+                links["previous"] = prefix + page_names[n - 1]
+            if n + 1 < len(pages):
+                links["next"] = prefix + page_names[n + 1]
+            title = f"{conversation_title} (part {n + 1}/{len(pages)})"
+            canvases[name] = self._render_page(decisions, ids, page, title, group_by, links=links, summary=False)
+        return canvases
+
+    def create_decision_canvas_page(self, decisions: List[Dict], conversation_title: str = "Decision Flow",
+                                    page: int = 1, group_by: str = "none", max_nodes: Optional[int] = None,
+                                    collapse_threshold: Optional[int] = None) -> Tuple[str, int]:
+        """
+        One page of the paginated canvas as a standalone canvas (no file links)
 
-        nodes = []
-        edges = []
+        Args:
+            page: 1-based page number
+            max_nodes: Decision nodes per page (CANVAS_MAX_NODES if None, 0 for unlimited)
 
-        # Create title node
-        title_node = self._create_title_node(conversation_title, len(decisions))
-        nodes.append(title_node)
+        Returns:
+            (canvas JSON, number of pages)
 
-        # Create decision nodes in a flow layout
-        positions = self._calculate_flow_positions(len(decisions))
+        Raises:
+            ValueError: If ``page`` is out of range
+        """
+        if not decisions:
+            if page != 1:
+                raise ValueError(f"Page {page} out of range (1 page)")
+            return self._create_empty_canvas(conversation_title), 1
+
+        ids, pages = self._paginate(decisions, group_by, max_nodes, collapse_threshold)
+        if not 1 <= page <= len(pages):
+            raise ValueError(f"Page {page} out of range ({len(pages)} pages)")
+        if len(pages) == 1:
+            return self._render_page(decisions, ids, pages[0], conversation_title, group_by), 1
+        title = f"{conversation_title} (part {page}/{len(pages)})"
+        return self._render_page(decisions, ids, pages[page - 1], title, group_by, summary=False), len(pages)
+
+    def _paginate(self, decisions: List[Dict], group_by: str, max_nodes: Optional[int],
+                  collapse_threshold: Optional[int]) -> Tuple[List[str], List[List[LayoutGroup]]]:
+        """Node ids and the grouped, collapsed and paginated layout groups"""
+        max_nodes = self.max_nodes if max_nodes is None else max_nodes
+        ids = decision_node_ids(decisions)
+        with time_stage("canvas_layout"):
+            groups = self.layout_engine.group_decisions(decisions, group_by)
+            self.layout_engine.collapse(groups, collapse_threshold)
+            pages = self.layout_engine.paginate(groups, max_nodes)
+        return ids, pages
+
+    def _render_page(self, decisions: List[Dict], ids: List[str], groups: List[LayoutGroup], title: str, group_by: str,
+                     links: Optional[Dict[str, str]] = None, summary: bool = True) -> str:
+        """Lay out and serialize one canvas"""
+        nodes = []
+        edges = []
+        framed = group_by != "none"
+        page_decisions = [decisions[i] for group in groups for i in group.indices]
 
-        for i, decision in enumerate(decisions):
-            node = self._create_decision_node(decision, positions[i], i)
-            nodes.append(node)
+        with time_stage("canvas_layout"):
+            width, height = self.layout_engine.layout(groups, origin=(200, 300), framed=framed)
 
-            # Connect to previous decision (create flow)
-            if i > 0:
-                edge = self._create_edge(f"decision-{i-1}", f"decision-{i}")
-                edges.append(edge)
+        title_node = self._create_title_node(title, len(page_decisions))
+        title_node["x"] = 200 + max(0, width - title_node["width"]) // 2
+        nodes.append(title_node)
 
-            # Connect first decision to title
-            if i == 0:
-                edge = self._create_edge("title", f"decision-{i}")
-                edges.append(edge)
+        # Navigation to the index and neighbouring sub-canvases, right of the title
+        link_x = title_node["x"] + title_node["width"] + self.padding
+        for n, (role, path) in enumerate((links or {}).items()):
+            nodes.append(self._create_link_node(f"link-{role}", path, link_x + n * (self.node_width // 2 + self.padding), 50))
+
+        last_node = None
+        for g, group in enumerate(groups):
+            if framed:
+                nodes.append(self._create_group_node(group, g))
+            if group.collapsed:
+                node = self._create_collapsed_node(decisions, group, group.positions[0])
+                nodes.append(node)
+                edges.append(self._create_edge("title", node["id"]))
+                continue
+            for n, (i, position) in enumerate(zip(group.indices, group.positions)):
+                nodes.append(self._create_decision_node(decisions[i], position, i, ids[i]))
+                if n > 0:
+                    # Flow edges stay within a group, so edges grow linearly
+                    edges.append(self._create_edge(ids[group.indices[n - 1]], ids[i]))
+                elif framed:
+                    edges.append(self._create_edge("title", f"group-{group.slug}"))
+                elif g == 0:
+                    edges.append(self._create_edge("title", ids[i]))
+            last_node = ids[group.indices[-1]]
 
         # Add summary/insights node if multiple decisions
-        if len(decisions) > 2:
-            summary_node = self._create_summary_node(decisions)
+        if summary and len(page_decisions) > 2:
+            summary_node = self._create_summary_node(page_decisions)
+            summary_node["x"] = 200 + max(0, width - summary_node["width"]) // 2
+            summary_node["y"] = 300 + height + 2 * self.padding
             nodes.append(summary_node)
-
-            # Connect last decision to summary
-            if decisions:
-                edge = self._create_edge(f"decision-{len(decisions)-1}", "summary")
-                edges.append(edge)
+            if last_node:
+                edges.append(self._create_edge(last_node, "summary"))
 
         canvas = {
             "nodes": nodes,
             "edges": edges
         }
 
-        return json.dumps(canvas, indent=2)
+        with time_stage("canvas_render"):
+            return json.dumps(canvas, indent=2)
+
+    def _render_index(self, decisions: List[Dict], pages: List[List[LayoutGroup]], title: str,
+                      page_paths: List[str]) -> str:
+        """Index canvas linking every sub-canvas, with the overall summary"""
+        nodes = [self._create_title_node(title, len(decisions))]
+        edges = []
+        columns, _ = self.layout_engine.grid_size(len(pages))
+        step_x = self.node_width + self.padding
+        for n, (page, path) in enumerate(zip(pages, page_paths)):
+            row, col = divmod(n, columns)
+            node = self._create_link_node(f"page-{n + 1}", path, 200 + col * step_x, 300 + row * (self.node_height + self.padding))
+            nodes.append(node)
+            edges.append(self._create_edge("title", node["id"]))
+
+        rows = math.ceil(len(pages) / columns)
+        summary_node = self._create_summary_node(decisions)
+        summary_node["y"] = 300 + rows * (self.node_height + self.padding) + self.padding
+        nodes.append(summary_node)
+
+        with time_stage("canvas_render"):
+            return json.dumps({"nodes": nodes, "edges": edges}, indent=2)
+
+    def _create_group_node(self, group: LayoutGroup, index: int) -> Dict:
+        """Canvas group frame around a set of decisions"""
+        return {
+            "id": f"group-{group.slug}",
+            "type": "group",
+            "x": group.x,
+            "y": group.y,
+            "width": group.width,
+            "height": group.height,
+            "color": self.group_colors[index % len(self.group_colors)],
+            "label": f"{group.label} ({len(group.indices)})"
+        }
+
+    def _create_collapsed_node(self, decisions: List[Dict], group: LayoutGroup, position: Tuple[int, int]) -> Dict:
+        """Single node standing in for a collapsed group"""
+        preview = []
+        for i in group.indices[:5]:
+            text = decisions[i].get('text', '')
+            preview.append(f"- {text[:77] + '...' if len(text) > 80 else text}")
+        more = len(group.indices) - len(preview)
+        return {
+            "id": f"collapsed-{group.slug}",
+            "x": position[0],
+            "y": position[1],
+            "width": self.node_width,
+            "height": self.node_height,
+            "color": self.colors["summary"],
+            "type": "text",
+            "text": f"## {group.label}\n\n**{len(group.indices)} decisions (collapsed)**\n\n" + "\n".join(preview)
+                    + (f"\n- *...and {more} more*" if more > 0 else "")
+        }
+
+    def _create_link_node(self, node_id: str, path: str, x: int, y: int) -> Dict:
+        """File node linking to another canvas in the vault"""
+        return {
+            "id": node_id,
+            "type": "file",
+            "file": path,
+            "x": x,
+            "y": y,
+            "width": self.node_width // 2 if node_id.startswith("link-") else self.node_width,
+            "height": 60 if node_id.startswith("link-") else self.node_height,
+            "color": self.colors["summary"]
+        }
 
     def _create_title_node(self, title: str, decision_count: int) -> Dict:
         """Create the main title node for the canvas"""
@@ -97,7 +301,8 @@ class CanvasDecisionVisualizer:
             "text": f"# {title}\n\n**Decisions Identified:** {decision_count}\n**Analysis Date:** $(date)\n\n*AI-Generated Decision Flow Visualization*"
         }
 
-    def _create_decision_node(self, decision: Dict, position: Tuple[int, int], index: int) -> Dict:
+    def _create_decision_node(self, decision: Dict, position: Tuple[int, int], index: int,
+                              node_id: Optional[str] = None) -> Dict:
         """Create a node for a specific decision"""
         x, y = position
 
@@ -105,10 +310,10 @@ class CanvasDecisionVisualizer:
         color = self._get_decision_color(decision)
 
         # Format decision text for canvas display
-        decision_text = self._format_decision_text(decision, index + 1)
+        decision_text = self._format_decision_text(decision, index + 1 if self.number_decisions else None)
 
         return {
-            "id": f"decision-{index}",
+            "id": node_id or f"decision-{decision_key(decision)}",
             "x": x,
             "y": y,
             "width": self.node_width,
@@ -159,38 +364,6 @@ Sequential decision-making process with {total_decisions} key decision points id
             "text": summary_text
         }
 
-    def _calculate_flow_positions(self, count: int) -> List[Tuple[int, int]]:
-        """Calculate positions for decision nodes in a flowing layout"""
-        positions = []
-
-        if count <= 3:
-            # Simple horizontal layout for few decisions
-            start_x = (self.canvas_width - (count * (self.node_width + self.padding))) // 2
-            y = 300
-
-            for i in range(count):
-                x = start_x + i * (self.node_width + self.padding)
-                positions.append((x, y))
-        else:
-            # Multi-row zigzag layout for many decisions
-            nodes_per_row = 3
-            rows = math.ceil(count / nodes_per_row)
-
-            for i in range(count):
-                row = i // nodes_per_row
-                col = i % nodes_per_row
-
-                # Zigzag: reverse every other row
-                if row % 2 == 1:
-                    col = nodes_per_row - 1 - col
-
-                x = 200 + col * (self.node_width + self.padding)
-                y = 300 + row * (self.node_height + self.padding)
-
-                positions.append((x, y))
-
-        return positions
-
     def _get_decision_color(self, decision: Dict) -> str:
         """Determine canvas color based on decision properties"""
         role = decision.get('role', 'unknown')
@@ -207,7 +380,7 @@ Sequential decision-making process with {total_decisions} key decision points id
         else:
             return self.colors["recommendation"]
 
-    def _format_decision_text(self, decision: Dict, number: int) -> str:
+    def _format_decision_text(self, decision: Dict, number: Optional[int]) -> str:
         """Format decision for display in canvas node"""
         text = decision.get('text', 'No decision text available')
         confidence = decision.get('confidence', 0)
@@ -221,7 +394,9 @@ Sequential decision-making process with {total_decisions} key decision points id
         role_emoji = "👤" if role == 'user' else "🤖"
         confidence_bar = "█" * int(confidence * 5) + "░" * (5 - int(confidence * 5))
 
-        return f"""## {role_emoji} Decision #{number}
+        label = f"Decision #{number}" if number else "Decision"
+
+        return f"""## {role_emoji} {label}
 
 **{text}**
 
@@ -265,37 +440,96 @@ Sequential decision-making process with {total_decisions} key decision points id
 class ExcalidrawDecisionVisualizer:
     """Generates Excalidraw files for decision visualization"""
 
-    def __init__(self):
+    # Fields shared by every element of a kind; elements are shallow copies
+    # of these with only the per-element fields filled in
+    _BASE_TEMPLATE = {
+        "version": 1,
+        "isDeleted": False,
+        "fillStyle": "hachure",
+        "strokeStyle": "solid",
+        "roughness": 1,
+        "opacity": 100,
+        "angle": 0,
+        "updated": 1,
+        "link": None,
+        "locked": False,
+    }
+    _TEXT_TEMPLATE = {
+        **_BASE_TEMPLATE,
+        "type": "text",
+        "strokeWidth": 1,
+        "strokeColor": "#000000",
+        "backgroundColor": "transparent",
+        "roundness": None,
+        "fontFamily": 1,
+        "textAlign": "left",
+        "verticalAlign": "top",
+        "containerId": None,
+    }
+    _RECT_TEMPLATE = {
+        **_BASE_TEMPLATE,
+        "type": "rectangle",
+        "strokeWidth": 2,
+        "width": 600,
+        "height": 100,
+    }
+
+    def __init__(self, compressed: Optional[bool] = None, number_decisions: bool = True):
+        """
+        Args:
+            compressed: Write the drawing as an LZ-string ``compressed-json`` block
+                (EXCALIDRAW_COMPRESSED, default false)
+            number_decisions: Label decisions "Decision #N" (positional, so off
+                for files that are patched incrementally)
+        """
+        self.number_decisions = number_decisions
         self.width = 1200
         self.height = 800
+        self.compressed = compressed if compressed is not None else (
+            os.getenv("EXCALIDRAW_COMPRESSED", "false").lower() == "true"
+        )
 
-    def create_decision_excalidraw(self, decisions: List[Dict], conversation_title: str = "Decision Flow") -> str:
+    def create_decision_excalidraw(self, decisions: List[Dict], conversation_title: str = "Decision Flow",
+                                   compressed: Optional[bool] = None) -> str:
         """
         Create an Excalidraw file for decision visualization
 
+        Output is deterministic: element ids, seeds and nonces are derived from
+        the content, so unchanged decisions produce byte-identical files.
+
         Returns:
         Complete .excalidraw.md file content with frontmatter
         """
         if not decisions:
-            return self._create_empty_excalidraw(conversation_title)
+            return self._create_empty_excalidraw(conversation_title, compressed)
 
+        elements = self.build_elements(decisions, conversation_title)
+        return self._render_file(elements, f"{conversation_title} - Decision Flow Visualization", compressed)
+
+    def build_elements(self, decisions: List[Dict], conversation_title: str = "Decision Flow") -> List[Dict]:
+        """Scene elements: the title plus a rectangle and text per decision"""
         # Generate Excalidraw elements
         elements = []
 
         # Add title
         title_element = self._create_text_element(
             text=f"{conversation_title}\n{len(decisions)} Decisions Found",
-            x=50, y=50, font_size=24, width=400
+            x=50, y=50, font_size=24, width=400, key="title"
         )
         elements.append(title_element)
 
         # Add decision boxes
         y_offset = 150
-        for i, decision in enumerate(decisions):
-            decision_element = self._create_decision_box(decision, 50, y_offset + i * 120, i + 1)
+        for i, (decision, key) in enumerate(zip(decisions, decision_node_ids(decisions))):
+            number = i + 1 if self.number_decisions else None
+            decision_element = self._create_decision_box(decision, 50, y_offset + i * 120, number, key)
             elements.extend(decision_element)
 
-        # Create Excalidraw JSON
+        return elements
+
+    def _render_file(self, elements: List[Dict], text_elements: str, compressed: Optional[bool] = None) -> str:
+        """Wrap elements in the .excalidraw.md format (plain or compressed-json drawing)"""
+        compressed = self.compressed if compressed is None else compressed
         excalidraw_data = {
             "type": "excalidraw",
             "version": 2,
@@ -308,11 +542,17 @@ class ExcalidrawDecisionVisualizer:
             "files": {}
         }
 
-        # Create uncompressed JSON format (easier for plugin to parse)
-        json_string = json.dumps(excalidraw_data, indent=2)
+        with time_stage("excalidraw_render"):
+            if compressed:
+                # Same encoding the plugin uses: compact JSON -> LZ-string base64, chunked
+                drawing = "```compressed-json\n" + lz_string.chunk(
+                    lz_string.compress_to_base64(json.dumps(excalidraw_data, separators=(",", ":")))
+                ) + "\n```"
+            else:
+                # Uncompressed JSON (human-readable and easy to diff)
+                drawing = "```json\n" + json.dumps(excalidraw_data, indent=2) + "\n```"
 
-        # Create full .excalidraw.md content with frontmatter (uncompressed format)
-        content = f"""---
+        return f"""---
 
 excalidraw-plugin: parsed
 tags: [excalidraw]
@@ -322,94 +562,65 @@ tags: [excalidraw]
 
 
 # Text Elements
-{conversation_title} - Decision Flow Visualization
+{text_elements}
 
 # Drawing
-```json
-{json_string}
-```
+{drawing}
 %%
 """
 
-        return content
-
-    def _create_text_element(self, text: str, x: int, y: int, font_size: int = 16, width: int = 200) -> Dict:
+    def _create_text_element(self, text: str, x: int, y: int, font_size: int = 16, width: int = 200,
+                             key: str = "") -> Dict:
         """Create a text element for Excalidraw"""
+        element_id = self._element_id("text", key or text)
         return {
-            "type": "text",
-            "version": 1,
-            "versionNonce": self._generate_nonce(),
-            "isDeleted": False,
-            "id": str(uuid.uuid4()),
-            "fillStyle": "hachure",
-            "strokeWidth": 1,
-            "strokeStyle": "solid",
-            "roughness": 1,
-            "opacity": 100,
-            "angle": 0,
+            **self._TEXT_TEMPLATE,
+            "id": element_id,
+            "versionNonce": self._generate_nonce(element_id, text),
+            "seed": self._generate_nonce(element_id, "seed"),
             "x": x,
             "y": y,
-            "strokeColor": "#000000",
-            "backgroundColor": "transparent",
             "width": width,
             "height": font_size * 1.2,
-            "seed": 1234567890,
             "groupIds": [],
-            "roundness": None,
             "boundElements": [],
-            "updated": 1,
-            "link": None,
-            "locked": False,
             "fontSize": font_size,
-            "fontFamily": 1,
             "text": text,
             "rawText": text,
             "baseline": font_size,
-            "textAlign": "left",
-            "verticalAlign": "top",
-            "containerId": None,
             "originalText": text
         }
 
-    def _create_decision_box(self, decision: Dict, x: int, y: int, number: int) -> List[Dict]:
+    def _create_decision_box(self, decision: Dict, x: int, y: int, number: Optional[int],
+                             key: Optional[str] = None) -> List[Dict]:
         """Create a decision box with rectangle and text"""
-        elements = []
+        key = key or f"decision-{decision_key(decision)}"
+        decision_text = self._format_decision_for_excalidraw(decision, number)
+        stroke_color = self._get_decision_stroke_color(decision)
+        background_color = self._get_decision_bg_color(decision)
 
         # Rectangle background
+        rect_id = self._element_id("rect", key)
         rect = {
-            "type": "rectangle",
-            "version": 1,
-            "versionNonce": self._generate_nonce(),
-            "isDeleted": False,
-            "id": str(uuid.uuid4()),
-            "fillStyle": "hachure",
-            "strokeWidth": 2,
-            "strokeStyle": "solid",
-            "roughness": 1,
-            "opacity": 100,
-            "angle": 0,
+            **self._RECT_TEMPLATE,
+            "id": rect_id,
+            "versionNonce": self._generate_nonce(rect_id, stroke_color, background_color),
+            "seed": self._generate_nonce(rect_id, "seed"),
             "x": x,
             "y": y,
-            "strokeColor": self._get_decision_stroke_color(decision),
-            "backgroundColor": self._get_decision_bg_color(decision),
-            "width": 600,
-            "height": 100,
-            "seed": 1234567890,
+            "strokeColor": stroke_color,
+            "backgroundColor": background_color,
             "groupIds": [],
             "roundness": {"type": 3},
             "boundElements": [],
-            "updated": 1,
-            "link": None,
-            "locked": False
+            "customData": {"convocanvas": key}
         }
-        elements.append(rect)
 
         # Decision text
-        decision_text = self._format_decision_for_excalidraw(decision, number)
-        text = self._create_text_element(decision_text, x + 10, y + 10, 14, 580)
-        elements.append(text)
+        text = self._create_text_element(decision_text, x + 10, y + 10, 14, 580, key=key)
+        text["customData"] = {"convocanvas": key}
 
-        return elements
+        return [rect, text]
 
     def _get_decision_stroke_color(self, decision: Dict) -> str:
         """Get stroke color based on decision role"""
@@ -431,7 +642,7 @@ tags: [excalidraw]
         else:
             return "#f8d7da"  # Light red for low confidence
 
-    def _format_decision_for_excalidraw(self, decision: Dict, number: int) -> str:
+    def _format_decision_for_excalidraw(self, decision: Dict, number: Optional[int]) -> str:
         """Format decision text for Excalidraw display"""
         text = decision.get('text', 'No decision text')
         confidence = decision.get('confidence', 0)
@@ -443,53 +654,25 @@ tags: [excalidraw]
 
         role_symbol = "👤" if role == 'user' else "🤖"
 
-        return f"{role_symbol} Decision #{number}: {text}\nConfidence: {confidence:.1%} | Role: {role.title()}"
+        label = f"Decision #{number}" if number else "Decision"
+
+        return f"{role_symbol} {label}: {text}\nConfidence: {confidence:.1%} | Role: {role.title()}"
 
-    def _generate_nonce(self) -> int:
-        """Generate a version nonce for Excalidraw elements"""
-        return hash(str(uuid.uuid4())) % (10 ** 8)
+    def _element_id(self, *parts: str) -> str:
+        """Stable element id derived from the element's kind, position key and content"""
+        return hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=10).hexdigest()
 
-    def _create_empty_excalidraw(self, title: str) -> str:
+    def _generate_nonce(self, *parts: str) -> int:
+        """Deterministic version nonce / seed derived from an element's id and content"""
+        digest = hashlib.blake2b("\x1f".join(parts).encode("utf-8"), digest_size=4).digest()
+        return int.from_bytes(digest, "big") % (2 ** 31 - 1) + 1
+
+    def _create_empty_excalidraw(self, title: str, compressed: Optional[bool] = None) -> str:
         """Create empty Excalidraw when no decisions found"""
         elements = [
             self._create_text_element(
                 text=f"{title}\n\nNo decisions found in this conversation.\nTry analyzing content with explicit decision points.",
-                x=100, y=200, font_size=18, width=600
+                x=100, y=200, font_size=18, width=600, key="empty"
             )
         ]
-
-        excalidraw_data = {
-            "type": "excalidraw",
-            "version": 2,
-            "source": "https://github.com/zsviczian/obsidian-excalidraw-plugin",
-            "elements": elements,
-            "appState": {
-                "gridSize": None,
-                "viewBackgroundColor": "#ffffff"
-            },
-            "files": {}
-        }
-
-        # Create uncompressed JSON format (easier for plugin to parse)
-        json_string = json.dumps(excalidraw_data, indent=2)
-
-        content = f"""---
-
-excalidraw-plugin: parsed
-tags: [excalidraw]
-
----
-==⚠  Switch to EXCALIDRAW VIEW in the MORE OPTIONS menu of this document. ⚠==
-
-
-# Text Elements
-{title} - No Decisions Found
-
-# Drawing
-```json
-{json_string}
-```
-%%
-"""
-
-        return content
\ No newline at end of file
+        return self._render_file(elements, f"{title} - No Decisions Found", compressed)
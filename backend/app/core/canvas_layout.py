@@ -0,0 +1,164 @@
+"""
+Layout engine for decision canvases
+Groups decisions (by technical domain or source message), packs each group as
+a snake-ordered grid and places groups on shelves. Every step is a single pass
+over the decisions, so layout stays linear as conversations grow.
+"""
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+GROUP_BY_OPTIONS = ("none", "domain", "message")
+
+
+class LayoutGroup:
+    """A set of decisions laid out together (one canvas group node)"""
+
+    def __init__(self, key: str, label: str, indices: Optional[List[int]] = None):
+        self.key = key
+        self.label = label
+        self.indices: List[int] = indices if indices is not None else []
+        self.collapsed = False
+        self.x = self.y = self.width = self.height = 0
+        self.positions: List[Tuple[int, int]] = []
+
+    @property
+    def node_count(self) -> int:
+        """Nodes this group contributes to a canvas (a collapsed group is one node)"""
+        return 1 if self.collapsed else len(self.indices)
+
+    @property
+    def slug(self) -> str:
+        return re.sub(r"[^a-z0-9]+", "-", self.key.lower()).strip("-") or "group"
+
+
+class CanvasLayoutEngine:
+    """Grid/shelf packing with grouping, collapsing and pagination"""
+
+    def __init__(self, node_width: int = 300, node_height: int = 150, gap: int = 50,
+                 group_padding: int = 40, group_header: int = 40, max_columns: int = 6,
+                 max_row_width: int = 4000):
+        """
+        Args:
+            node_width, node_height: Size of a decision node
+            gap: Space between nodes inside a group and between groups
+            group_padding: Space between a group's border and its nodes
+            group_header: Extra space at the top of a group for its label
+            max_columns: Widest grid used for a single group
+            max_row_width: Groups wrap to a new shelf past this width
+        """
+        self.node_width = node_width
+        self.node_height = node_height
+        self.gap = gap
+        self.group_padding = group_padding
+        self.group_header = group_header
+        self.max_columns = max_columns
+        self.max_row_width = max_row_width
+
+    def group_decisions(self, decisions: List[Dict], group_by: str = "none") -> List[LayoutGroup]:
+        """Bucket decision indices, keeping groups in order of first appearance"""
+        if group_by not in GROUP_BY_OPTIONS:
+            raise ValueError(f"group_by must be one of {GROUP_BY_OPTIONS}, got {group_by!r}")
+        if group_by == "none":
+            return [LayoutGroup("decisions", "Decisions", list(range(len(decisions))))]
+
+        groups: Dict[str, LayoutGroup] = {}
+        for i, decision in enumerate(decisions):
+            if group_by == "domain":
+                domains = decision.get("technical_domains") or ["general"]
+                key = domains[0]
+                label = key.replace("_", " ").title()
+            else:
+                message_index = decision.get("message_index", 0)
+                key = f"message-{message_index}"
+                label = f"Message {message_index + 1} ({decision.get('role', 'unknown')})"
+            if key not in groups:
+                groups[key] = LayoutGroup(key, label)
+            groups[key].indices.append(i)
+        return list(groups.values())
+
+    def collapse(self, groups: List[LayoutGroup], threshold: Optional[int] = None,
+                 keys: Tuple[str, ...] = ()) -> List[LayoutGroup]:
+        """Mark groups larger than ``threshold`` (or listed in ``keys``) as collapsed"""
+        for group in groups:
+            group.collapsed = bool((threshold and len(group.indices) > threshold) or group.key in keys)
+        return groups
+
+    def paginate(self, groups: List[LayoutGroup], max_nodes: Optional[int]) -> List[List[LayoutGroup]]:
+        """
+        Split groups into pages of at most ``max_nodes`` nodes
+
+        Groups are kept whole when they fit; a group larger than a page is
+        split into labelled parts.
+        """
+        if not max_nodes or sum(group.node_count for group in groups) <= max_nodes:
+            return [groups]
+
+        pages: List[List[LayoutGroup]] = [[]]
+        used = 0
+        for group in groups:
+            if group.node_count <= max_nodes:
+                parts = [group]
+            else:
+                chunks = [group.indices[i:i + max_nodes] for i in range(0, len(group.indices), max_nodes)]
+                parts = [
+                    LayoutGroup(f"{group.key}-part-{n}", f"{group.label} ({n}/{len(chunks)})", chunk)
+                    for n, chunk in enumerate(chunks, 1)
+                ]
+            for part in parts:
+                if used + part.node_count > max_nodes and pages[-1]:
+                    pages.append([])
+                    used = 0
+                pages[-1].append(part)
+                used += part.node_count
+        return pages
+
+    def grid_size(self, count: int) -> Tuple[int, int]:
+        """Near-square grid (columns, rows) for ``count`` nodes"""
+        columns = max(1, min(self.max_columns, math.ceil(math.sqrt(count))))
+        return columns, max(1, math.ceil(count / columns))
+
+    def layout(self, groups: List[LayoutGroup], origin: Tuple[int, int] = (0, 0),
+               framed: bool = True) -> Tuple[int, int]:
+        """
+        Position every group and its nodes
+
+        Args:
+            groups: Groups to place (positions are written onto them)
+            origin: Top-left corner of the packed area
+            framed: Reserve space for a group border and label
+
+        Returns:
+            (width, height) of the packed area
+        """
+        ox, oy = origin
+        padding = self.group_padding if framed else 0
+        header = self.group_header if framed else 0
+        step_x = self.node_width + self.gap
+        step_y = self.node_height + self.gap
+
+        cursor_x = cursor_y = shelf_height = total_width = 0
+        for group in groups:
+            columns, rows = self.grid_size(group.node_count)
+            group.width = columns * step_x - self.gap + 2 * padding
+            group.height = rows * step_y - self.gap + 2 * padding + header
+
+            if cursor_x and cursor_x + group.width > self.max_row_width:
+                cursor_x = 0
+                cursor_y += shelf_height + self.gap
+                shelf_height = 0
+
+            group.x, group.y = ox + cursor_x, oy + cursor_y
+            group.positions = []
+            for n in range(group.node_count):
+                row, col = divmod(n, columns)
+                if row % 2 == 1:
+                    # Snake order keeps consecutive decisions adjacent
+                    col = columns - 1 - col
+                group.positions.append((group.x + padding + col * step_x, group.y + padding + header + row * step_y))
+
+            cursor_x += group.width + self.gap
+            shelf_height = max(shelf_height, group.height)
+            total_width = max(total_width, cursor_x - self.gap)
+
+        return total_width, cursor_y + shelf_height
@@ -0,0 +1,229 @@
+"""
+Incremental canvas / Excalidraw updates for ConvoCanvas
+Re-syncs an existing .canvas or .excalidraw.md with freshly extracted
+decisions. Nodes are matched by their content-derived ids: new decisions are
+added, stale ones removed and changed ones patched in place, while positions
+the user changed and nodes the user added by hand are kept. Files are only
+rewritten when something actually changed.
+"""
+import os
+import re
+import json
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from app.core import lz_string
+from app.core.canvas_generator import CanvasDecisionVisualizer, ExcalidrawDecisionVisualizer
+
+# Generated canvas nodes; anything else in the file was added by the user
+MANAGED_NODE_IDS = {"title", "summary", "no-decisions"}
+MANAGED_NODE_PREFIXES = ("decision-", "group-", "collapsed-", "link-")
+# Geometry is owned by the user once a node exists
+LAYOUT_KEYS = ("x", "y", "width", "height")
+
+_DRAWING_RE = re.compile(r"```(compressed-json|json)\n(.*?)\n```", re.DOTALL)
+# Positional "Decision #N" labels of freshly generated files; renumbering alone is not a change
+_ORDINAL_RE = re.compile(r"\bDecision #\d+")
+TEXT_KEYS = ("text", "rawText", "originalText")
+
+
+def _new_stats() -> Dict[str, int]:
+    return {"added": 0, "removed": 0, "updated": 0, "unchanged": 0, "changed": False}
+
+
+def _patch(old: Dict, new: Dict, skip: Tuple[str, ...] = ()) -> Dict:
+    """
+    ``old`` with the generated properties of ``new``, keeping the user's
+    geometry and any text that differs only by its "Decision #N" ordinal
+    """
+    merged = dict(old)
+    for key, value in new.items():
+        if key in LAYOUT_KEYS or key in skip:
+            continue
+        if key in TEXT_KEYS and isinstance(value, str) and isinstance(old.get(key), str) \
+                and _ORDINAL_RE.sub("Decision", old[key]) == value:
+            continue
+        merged[key] = value
+    return merged
+
+
+def _overlaps(a: Dict, b: Dict) -> bool:
+    return (a["x"] < b["x"] + b["width"] and b["x"] < a["x"] + a["width"]
+            and a["y"] < b["y"] + b["height"] and b["y"] < a["y"] + a["height"])
+
+
+class CanvasSynchronizer:
+    """Patches existing visualization files with a new set of decisions"""
+
+    def __init__(self, canvas: Optional[CanvasDecisionVisualizer] = None,
+                 excalidraw: Optional[ExcalidrawDecisionVisualizer] = None):
+        # Unnumbered labels: inserting a decision must not rewrite every node after it
+        self.canvas = canvas or CanvasDecisionVisualizer(number_decisions=False)
+        self.excalidraw = excalidraw or ExcalidrawDecisionVisualizer(number_decisions=False)
+
+    # Obsidian Canvas ------------------------------------------------------------
+
+    def _managed_node(self, node_id: str) -> bool:
+        return node_id in MANAGED_NODE_IDS or node_id.startswith(MANAGED_NODE_PREFIXES)
+
+    def _managed_edge(self, edge: Dict) -> bool:
+        return (self._managed_node(edge.get("fromNode", "")) and self._managed_node(edge.get("toNode", ""))
+                and edge.get("id") == f"{edge.get('fromNode')}-to-{edge.get('toNode')}")
+
+    def update_canvas(self, existing: str, decisions: List[Dict], title: str = "Decision Flow",
+                      group_by: str = "none", collapse_threshold: Optional[int] = None) -> Tuple[str, Dict]:
+        """
+        Patch an existing .canvas with the current decisions
+
+        Returns:
+            (canvas JSON, stats) - the JSON is ``existing`` itself when nothing changed
+        """
+        current = json.loads(existing) if existing.strip() else {"nodes": [], "edges": []}
+        fresh = json.loads(self.canvas.create_decision_canvas(decisions, title, group_by, collapse_threshold))
+        stats = _new_stats()
+
+        pending = {node["id"]: node for node in fresh["nodes"]}
+        nodes: List[Dict] = []
+        for node in current.get("nodes", []):
+            if not self._managed_node(node.get("id", "")):
+                nodes.append(node)
+                continue
+            new = pending.pop(node["id"], None)
+            if new is None:
+                stats["removed"] += 1
+                continue
+            merged = _patch(node, new)
+            stats["updated" if merged != node else "unchanged"] += 1
+            nodes.append(merged)
+
+        self._place_new_nodes(nodes, [node for node in fresh["nodes"] if node["id"] in pending])
+        stats["added"] = len(pending)
+
+        node_ids = {node["id"] for node in nodes}
+        pending_edges = {edge["id"]: edge for edge in fresh["edges"]}
+        edges: List[Dict] = []
+        for edge in current.get("edges", []):
+            if self._managed_edge(edge):
+                new = pending_edges.pop(edge["id"], None)
+                if new is not None:
+                    edges.append({**edge, **new})
+            elif edge.get("fromNode") in node_ids and edge.get("toNode") in node_ids:
+                # User edges survive unless one of their ends was removed
+                edges.append(edge)
+        edges.extend(pending_edges.values())
+
+        updated = {**current, "nodes": nodes, "edges": edges}
+        if updated == current:
+            return existing, stats
+        stats["changed"] = True
+        return json.dumps(updated, indent=2), stats
+
+    def _place_new_nodes(self, nodes: List[Dict], new_nodes: List[Dict]):
+        """Keep the generated position of a new node unless it collides; then park it below everything"""
+        occupied = [node for node in nodes if node.get("type") != "group" and "x" in node]
+        bottom = max((node["y"] + node["height"] for node in occupied), default=0)
+        left = min((node["x"] for node in occupied), default=0)
+        step_x = self.canvas.node_width + self.canvas.padding
+        step_y = self.canvas.node_height + self.canvas.padding
+        parked = 0
+        for node in new_nodes:
+            if node.get("type") != "group" and any(_overlaps(node, other) for other in occupied):
+                row, col = divmod(parked, self.canvas.layout_engine.max_columns)
+                node = {**node, "x": left + col * step_x, "y": bottom + self.canvas.padding + row * step_y}
+                parked += 1
+            nodes.append(node)
+            if node.get("type") != "group":
+                occupied.append(node)
+
+    # Excalidraw ---------------------------------------------------------------------
+
+    def parse_excalidraw(self, content: str) -> Tuple[Dict, bool]:
+        """Scene data of an .excalidraw.md file and whether it was compressed"""
+        match = _DRAWING_RE.search(content)
+        if not match:
+            raise ValueError("No Excalidraw drawing block found")
+        compressed = match.group(1) == "compressed-json"
+        payload = lz_string.decompress_from_base64(match.group(2)) if compressed else match.group(2)
+        if payload is None:
+            raise ValueError("Corrupt compressed-json drawing block")
+        return json.loads(payload), compressed
+
+    def update_excalidraw(self, existing: str, decisions: List[Dict],
+                          title: str = "Decision Flow") -> Tuple[str, Dict]:
+        """
+        Patch an existing .excalidraw.md with the current decisions
+
+        Returns:
+            (file content, stats) - the content is ``existing`` itself when nothing changed
+        """
+        scene, compressed = self.parse_excalidraw(existing)
+        fresh = self.excalidraw.build_elements(decisions, title)
+        title_id = fresh[0]["id"]
+        stats = _new_stats()
+
+        pending = {element["id"]: element for element in fresh}
+        elements: List[Dict] = []
+        for element in scene.get("elements", []):
+            new = pending.pop(element.get("id"), None)
+            if new is None:
+                managed = element.get("id") == title_id or "convocanvas" in (element.get("customData") or {})
+                if managed:
+                    stats["removed"] += 1
+                else:
+                    elements.append(element)
+                continue
+            # isDeleted is the user's: a decision box they deleted stays deleted
+            merged = _patch(element, new, skip=("version", "versionNonce", "isDeleted"))
+            if merged != element:
+                # Excalidraw reconciles concurrent edits by version
+                merged["version"] = element.get("version", 1) + 1
+                merged["versionNonce"] = new["versionNonce"]
+                stats["updated"] += 1
+            else:
+                stats["unchanged"] += 1
+            elements.append(merged)
+
+        added = [element for element in fresh if element["id"] in pending]
+        if added:
+            # New boxes keep their relative layout, moved as a block below the scene if they collide
+            existing_boxes = [e for e in elements if not e.get("isDeleted") and "width" in e]
+            if any(_overlaps(new, other) for new in added for other in existing_boxes):
+                bottom = max(e["y"] + e["height"] for e in existing_boxes)
+                shift = bottom + 20 - min(e["y"] for e in added)
+                added = [{**element, "y": element["y"] + shift} for element in added]
+            elements.extend(added)
+        stats["added"] = len(added)
+
+        if elements == scene.get("elements", []):
+            return existing, stats
+        stats["changed"] = True
+        return self.excalidraw._render_file(elements, f"{title} - Decision Flow Visualization", compressed), stats
+
+    # Files ----------------------------------------------------------------------------
+
+    def update_content(self, filename: str, existing: str, decisions: List[Dict], title: str,
+                       **options) -> Tuple[str, Dict]:
+        """Dispatch on the file type (.canvas or .excalidraw.md)"""
+        if filename.endswith(".canvas"):
+            return self.update_canvas(existing, decisions, title, **options)
+        if filename.endswith((".excalidraw.md", ".excalidraw")):
+            return self.update_excalidraw(existing, decisions, title)
+        raise ValueError(f"Unsupported visualization file: {filename}")
+
+    def update_file(self, path: str, decisions: List[Dict], title: str, **options) -> Dict:
+        """Patch a file on disk, writing (atomically) only if its content changed"""
+        with open(path, encoding="utf-8") as f:
+            existing = f.read()
+        content, stats = self.update_content(path, existing, decisions, title, **options)
+        if stats["changed"]:
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".convocanvas-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(content)
+                os.replace(tmp_path, path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return stats
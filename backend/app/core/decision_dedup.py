@@ -0,0 +1,221 @@
+"""
+Near-duplicate decision detection for ConvoCanvas
+Uses word-shingle MinHash signatures with LSH banding to find candidate pairs
+without comparing every pair; candidates are only merged after their exact
+Jaccard similarity against the cluster representative is checked
+"""
+import re
+import random
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Universal hashing constants (same construction as classic MinHash)
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHashLSHDeduplicator:
+    """Merges near-duplicate decisions and keeps provenance of every occurrence"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 2, seed: int = 1):
+        """
+        Args:
+            threshold: Jaccard similarity (of word shingles) at or above which a decision
+                is merged into an earlier one
+            num_perm: Number of MinHash permutations per signature
+            shingle_size: Words per shingle (word n-grams keep word order significant)
+            seed: Seed for the permutation coefficients (keeps results reproducible)
+        """
+        if not 0.0 < threshold <= 1.0:
+            raise ValueError("threshold must be in (0, 1]")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Candidates are verified exactly, so the LSH curve sits below the threshold:
+        # a missed candidate costs a duplicate, an extra one only a set comparison
+        self.bands, self.rows = self._optimal_bands(threshold * 0.75, num_perm)
+
+        rng = random.Random(seed)
+        self._permutations = [
+            (rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+            for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        """Pick the band/row split whose LSH S-curve threshold is closest to the target"""
+        best = (num_perm, 1)
+        best_error = float("inf")
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            curve_threshold = (1.0 / bands) ** (1.0 / rows)
+            error = abs(curve_threshold - threshold)
+            if error < best_error:
+                best, best_error = (bands, rows), error
+        return best
+
+    def _normalize(self, text: str) -> str:
+        """Lowercase, drop punctuation and collapse whitespace ("let's" stays one word)"""
+        text = re.sub(r"['\u2019]", "", text.lower())
+        text = re.sub(r"[^\w\s]", " ", text)
+        return re.sub(r"\s+", " ", text).strip()
+
+    def _shingles(self, text: str) -> Set[str]:
+        """Word n-gram shingles of the normalized text"""
+        words = self._normalize(text).split()
+        if len(words) <= self.shingle_size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> List[int]:
+        """Compute the MinHash signature of a piece of text"""
+        return self._signature(self._shingles(text))
+
+    def _signature(self, shingles: Set[str]) -> List[int]:
+        hashes = [
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+            for shingle in shingles
+        ]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._permutations
+        ]
+
+    @staticmethod
+    def estimate_similarity(sig1: List[int], sig2: List[int]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        if not sig1 or len(sig1) != len(sig2):
+            return 0.0
+        return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+    @staticmethod
+    def jaccard(shingles1: Set[str], shingles2: Set[str]) -> float:
+        """Exact Jaccard similarity of two shingle sets"""
+        if not shingles1 and not shingles2:
+            return 1.0
+        return len(shingles1 & shingles2) / len(shingles1 | shingles2)
+
+    def similarity(self, text1: str, text2: str) -> float:
+        """Exact Jaccard similarity of the word shingles of two texts"""
+        return self.jaccard(self._shingles(text1), self._shingles(text2))
+
+    def find_clusters(self, texts: List[str], stop: Optional[Callable[[], bool]] = None,
+                      limit: Optional[int] = None) -> List[List[int]]:
+        """
+        Group indexes of near-duplicate texts
+
+        Args:
+            texts: Texts to group
+            stop: Checked before each text; once it returns True the remaining texts are left unmerged
+            limit: Only the first ``limit`` texts are compared; later ones are left unmerged
+
+        Texts are visited in order; the first text of each cluster is its
+        representative and is the only member indexed in the LSH buckets. A text
+        joins the most similar representative that shares a bucket with it and
+        whose exact Jaccard similarity reaches the threshold, otherwise it starts
+        a new cluster. Comparing against representatives (rather than chaining
+        through any member) keeps A~B, B~C from pulling A and C together.
+        """
+        shingles: List[Set[str]] = []
+        buckets: Dict[Tuple, List[int]] = {}
+        clusters: Dict[int, List[int]] = {}
+
+        for idx, text in enumerate(texts):
+            if (limit is not None and idx >= limit) or (stop is not None and stop()):
+                clusters.update((rest, [rest]) for rest in range(idx, len(texts)))
+                break
+            text_shingles = self._shingles(text)
+            shingles.append(text_shingles)
+            sig = self._signature(text_shingles)
+            keys = [(band, tuple(sig[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+            candidates = sorted({rep for key in keys for rep in buckets.get(key, ())})
+            best, best_similarity = None, self.threshold
+            for rep in candidates:
+                similarity = self.jaccard(shingles[rep], text_shingles)
+                if similarity >= best_similarity and (best is None or similarity > best_similarity):
+                    best, best_similarity = rep, similarity
+
+            if best is not None:
+                clusters[best].append(idx)
+                continue
+            clusters[idx] = [idx]
+            for key in keys:
+                buckets.setdefault(key, []).append(idx)
+
+        return sorted(clusters.values(), key=lambda members: members[0])
+
+    def deduplicate(self, decisions: List[Dict], id_prefix: str = "decision",
+                    stop: Optional[Callable[[], bool]] = None, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Merge near-duplicate decisions
+
+        The earliest occurrence is kept as the representative; its confidence is
+        raised to the best confidence in the cluster and every merged occurrence
+        is recorded under ``occurrences``. ``stop`` and ``limit`` bound the work
+        as in ``find_clusters``.
+        """
+        if not decisions:
+            return []
+
+        clusters = self.find_clusters([d.get("text", "") for d in decisions], stop=stop, limit=limit)
+        merged = []
+        for members in clusters:
+            representative = dict(decisions[members[0]])
+            occurrences = []
+            for idx in members:
+                occurrences.extend(self._occurrences_of(decisions[idx]))
+
+            representative["id"] = f"{id_prefix}_{len(merged)}"
+            representative["confidence"] = max(d.get("confidence", 0) for d in (decisions[i] for i in members))
+            representative["occurrences"] = occurrences
+            representative["occurrence_count"] = len(occurrences)
+            merged.append(representative)
+
+        return merged
+
+    def deduplicate_across(self, conversations: Dict[str, List[Dict]]) -> List[Dict]:
+        """
+        Merge near-duplicate decisions across several conversations (e.g. a vault)
+
+        Args:
+            conversations: Mapping of conversation id (note path, title...) to its decisions
+
+        Returns:
+            Merged decisions whose occurrences carry the source conversation id
+        """
+        flattened = []
+        for conversation_id, decisions in conversations.items():
+            for decision in decisions:
+                tagged = dict(decision)
+                tagged["conversation"] = conversation_id
+                tagged["occurrences"] = [
+                    dict(occurrence, conversation=occurrence.get("conversation", conversation_id))
+                    for occurrence in self._occurrences_of(decision)
+                ]
+                flattened.append(tagged)
+        return self.deduplicate(flattened)
+
+    @staticmethod
+    def _occurrences_of(decision: Dict) -> Iterable[Dict]:
+        """Provenance entries for a decision (reuses existing ones if already merged)"""
+        if decision.get("occurrences"):
+            return list(decision["occurrences"])
+
+        occurrence = {
+            "text": decision.get("text", ""),
+            "message_index": decision.get("message_index"),
+            "role": decision.get("role"),
+            "confidence": decision.get("confidence", 0),
+        }
+        if decision.get("conversation") is not None:
+            occurrence["conversation"] = decision["conversation"]
+        return [occurrence]
+
+
+def deduplicate_decisions(decisions: List[Dict], threshold: float = 0.8) -> List[Dict]:
+    """Convenience wrapper for one-off deduplication"""
+    return MinHashLSHDeduplicator(threshold=threshold).deduplicate(decisions)
@@ -1,48 +1,77 @@
 """Enhanced AI-powered content analyzer with decision tracking and visualization"""
+import os
 import re
 import json
-from typing import List, Dict, Tuple, Any
+import logging
+import threading
+from typing import List, Dict, Tuple, Any, Optional
 from collections import Counter, defaultdict
-import spacy
-import nltk
-from textblob import TextBlob
-import networkx as nx
-import plotly.graph_objects as go
-import plotly.express as px
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-import numpy as np
-
-# Download required NLTK data
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-
-try:
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('stopwords')
+
+from app.core.decision_dedup import MinHashLSHDeduplicator
+from app.core.extraction_safety import ExtractionGuard, compile_pattern, extraction_status
+from app.core.lazy_imports import lazy_import
+from app.core.metrics import time_model_load, time_stage
+from app.core.inference_server import InferenceServerError, get_inference_client
+from app.core.nlp_resources import NLTK_RESOURCES, NLPResourceError, get_nlp_resources
+
+# Heavy analysis libraries are imported on first use, not when the API loads
+spacy = lazy_import("spacy")
+nltk = lazy_import("nltk")
+textblob = lazy_import("textblob")
+nx = lazy_import("networkx")
+go = lazy_import("plotly.graph_objects")
+sklearn_text = lazy_import("sklearn.feature_extraction.text")
+np = lazy_import("numpy")
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_nltk_data(download: Optional[bool] = None) -> List[str]:
+    """
+    Check the NLTK data the analyzer relies on; returns what is still missing
+
+    Never called at import time. A baked bundle (NLP_RESOURCE_DIR) is used as
+    is; otherwise downloads (network) only happen when ``download`` is true or
+    NLTK_DOWNLOAD=true.
+    """
+    resources = get_nlp_resources()
+    if download is None:
+        download = os.getenv("NLTK_DOWNLOAD", "false").lower() == "true"
+    missing = resources.nltk_missing()
+    if missing and download and not resources.bundle_dir:
+        packages = {resource: package for package, resource in NLTK_RESOURCES.items()}
+        missing = [resource for resource in missing if not nltk.download(packages[resource], quiet=True)]
+    return missing
 
 class EnhancedContentAnalyzer:
     """AI-powered content analyzer with decision tracking and visual insights"""
 
     def __init__(self):
         """Initialize NLP models and components"""
-        # Load spaCy model (install with: python -m spacy download en_core_web_sm)
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            print("spaCy model not found. Run: python -m spacy download en_core_web_sm")
-            self.nlp = None
+        # With an inference server (INFERENCE_SERVER) entities and sentiment come from
+        # its shared models and spaCy is not loaded in this process
+        self.inference_client = get_inference_client()
+        self.nlp = None
+        self._nlp_lock = threading.Lock()
+        self._nlp_failed = False
+        if self.inference_client is None:
+            self._load_nlp()
 
         # Decision patterns for extraction
+        # (captures are bounded so a punctuation-free blob can't be swallowed whole)
         self.decision_patterns = [
-            r'(?:decided|decision|choose|chose|selected|pick|go with|opt for|settle on)\s+(?:to\s+)?([^.!?]+)',
-            r'(?:let\'s|we should|i think we should|recommend|suggest)\s+([^.!?]+)',
-            r'(?:final|conclusion|outcome|result):\s*([^.!?]+)',
-            r'(?:approach|strategy|plan|solution):\s*([^.!?]+)'
+            r'(?:decided|decision|choose|chose|selected|pick|go with|opt for|settle on)\s+(?:to\s+)?([^.!?]{1,500})',
+            r'(?:let\'s|we should|i think we should|recommend|suggest)\s+([^.!?]{1,500})',
+            r'(?:final|conclusion|outcome|result):\s*([^.!?]{1,500})',
+            r'(?:approach|strategy|plan|solution):\s*([^.!?]{1,500})'
         ]
+        self._decision_regexes = [compile_pattern(p) for p in self.decision_patterns]
+
+        # Size caps, code/log skipping and time budget for decision extraction
+        self.extraction_guard = ExtractionGuard()
+
+        # Prose/code/table/quote segmentation (NLP stages only see prose)
+        self.segmenter = self.extraction_guard.segmenter
 
         # Technical domain keywords for context
         self.tech_domains = {
@@ -53,8 +82,21 @@ class EnhancedContentAnalyzer:
             'monitoring': ['grafana', 'prometheus', 'elk', 'logging', 'metrics', 'alerting']
         }
 
+        # Near-duplicate decision merging (e.g. user proposal echoed by Claude)
+        self.dedup_threshold = float(os.getenv("DECISION_DEDUP_THRESHOLD", "0.8"))
+        self.deduplicator = MinHashLSHDeduplicator(threshold=self.dedup_threshold)
+
     def extract_user_claude_dialogue(self, content: str) -> List[Dict]:
         """Extract structured user/Claude dialogue with enhanced metadata"""
+        messages = self.split_dialogue(content)
+        self.segment_messages(messages)
+        self.analyze_message_sentiment(messages)
+        self.extract_message_entities(messages)
+        self.classify_message_domains(messages)
+        return messages
+
+    def split_dialogue(self, content: str) -> List[Dict]:
+        """Split a Save My Chatbot export into bare user/Claude messages"""
         messages = []
         sections = re.split(r'(?=## (?:User|Claude))', content)
 
@@ -70,23 +112,82 @@ class EnhancedContentAnalyzer:
                     continue
 
                 if text:
-                    # Enhanced message metadata
-                    message = {
+                    messages.append({
                         "role": role,
                         "content": text,
                         "sequence": i,
-                        "word_count": len(text.split()),
-                        "sentiment": self._analyze_sentiment(text),
-                        "entities": self._extract_entities(text),
-                        "technical_domain": self._classify_technical_domain(text)
-                    }
-                    messages.append(message)
+                        "word_count": len(text.split())
+                    })
+
+        return messages
+
+    def segment_messages(self, messages: List[Dict]) -> List[Dict]:
+        """Add prose/code/table/quote segments and code block details to each message"""
+        for message in messages:
+            text = message['content']
+            segments = self.segmenter.segment(text)
+            message["segments"] = segments
+            message["code_blocks"] = [
+                self.segmenter.describe_code(text, span)
+                for span in segments if span["type"] == "code"
+            ]
+        return messages
 
+    def analyze_message_sentiment(self, messages: List[Dict]) -> List[Dict]:
+        """Add sentiment (computed on prose only) to each message"""
+        remote = self._remote("sentiment", [self._prose_of(message) for message in messages])
+        for index, message in enumerate(messages):
+            message["sentiment"] = remote[index] if remote else self._analyze_sentiment(self._prose_of(message))
         return messages
 
+    def extract_message_entities(self, messages: List[Dict]) -> List[Dict]:
+        """Add named entities (computed on prose only) to each message"""
+        remote = self._remote("entities", [self._prose_of(message) for message in messages])
+        for index, message in enumerate(messages):
+            message["entities"] = remote[index] if remote else self._extract_entities(self._prose_of(message))
+        return messages
+
+    def _remote(self, op: str, texts: List[str]) -> Optional[List[Any]]:
+        """Results of ``op`` from the inference server (one request per conversation), or None"""
+        if self.inference_client is None or not texts:
+            return None
+        try:
+            return getattr(self.inference_client, op)(texts)
+        except InferenceServerError as e:
+            logger.warning("Inference server %s failed, analyzing in-process: %s", op, e)
+            return None
+
+    def classify_message_domains(self, messages: List[Dict]) -> List[Dict]:
+        """Add technical domains (keyword match on full content) to each message"""
+        for message in messages:
+            message["technical_domain"] = self._classify_technical_domain(message['content'])
+        return messages
+
+    def _prose_of(self, message: Dict) -> str:
+        """Prose portion of a message (whole content if it was never segmented)"""
+        if 'segments' not in message:
+            return message['content']
+        return self.segmenter.prose_text(message['content'], message['segments'])
+
+    def _load_nlp(self):
+        """spaCy model from the resource bundle or the installed package, loaded once
+
+        Also used when the inference server fails, so entities still come from a
+        local model. Returns None if spaCy cannot be loaded here either.
+        """
+        with self._nlp_lock:
+            if self.nlp is None and not self._nlp_failed:
+                try:
+                    with time_model_load("spacy:en_core_web_sm"):
+                        self.nlp = get_nlp_resources().load_spacy()
+                except NLPResourceError as e:
+                    self._nlp_failed = True
+                    logger.warning("Named entities unavailable: %s", e)
+        return self.nlp
+
     def _analyze_sentiment(self, text: str) -> Dict[str, float]:
         """Analyze sentiment of text using TextBlob"""
-        blob = TextBlob(text)
+        blob = textblob.TextBlob(text)
         return {
             "polarity": blob.sentiment.polarity,  # -1 (negative) to 1 (positive)
             "subjectivity": blob.sentiment.subjectivity  # 0 (objective) to 1 (subjective)
@@ -94,10 +195,11 @@ class EnhancedContentAnalyzer:
 
     def _extract_entities(self, text: str) -> List[Dict[str, str]]:
         """Extract named entities using spaCy"""
-        if not self.nlp:
+        nlp = self.nlp or self._load_nlp()
+        if not nlp:
             return []
 
-        doc = self.nlp(text)
+        doc = nlp(text)
         entities = []
         for ent in doc.ents:
             entities.append({
@@ -118,17 +220,48 @@ class EnhancedContentAnalyzer:
 
         return domains
 
-    def extract_decisions(self, messages: List[Dict]) -> List[Dict]:
-        """Extract technical decisions from conversation using NLP"""
+    def extract_decisions(self, messages: List[Dict], deduplicate: bool = True) -> List[Dict]:
+        """Extract technical decisions from conversation using NLP
+
+        Near-duplicate decisions are merged unless ``deduplicate`` is False; merged
+        decisions list every original hit under ``occurrences``.
+        """
+        return self.extract_decisions_guarded(messages, deduplicate)["decisions"]
+
+    def extract_decisions_guarded(self, messages: List[Dict], deduplicate: bool = True,
+                                  deadline_seconds: float = None, enrich: bool = True) -> Dict[str, Any]:
+        """Extract decisions within the extraction time budget
+
+        Code blocks and log dumps are skipped and oversized messages truncated.
+        If the deadline passes, the decisions found so far are returned with
+        ``extraction["truncated"]`` set. With ``enrich=False`` the per-decision
+        sentiment and entities are left out (see ``enrich_decisions``).
+        """
         decisions = []
+        budget = self.extraction_guard.start(deadline_seconds)
+        skipped = Counter()
+        truncated = False
+        scanned = 0
 
         for msg_idx, message in enumerate(messages):
+            if budget.expired():
+                truncated = True
+                break
+
             content = message['content']
+            scan_text, stats = self.extraction_guard.prepare(content, message.get('segments'))
+            skipped.update(stats)
+            scanned += 1
 
             # Extract decisions using patterns
-            for pattern in self.decision_patterns:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                for match in matches:
+            for pattern in self._decision_regexes:
+                if truncated:
+                    break
+                for match in pattern.finditer(scan_text):
+                    if budget.expired():
+                        truncated = True
+                        break
+
                     decision_text = match.group(1).strip()
 
                     # Skip very short decisions
@@ -142,12 +275,35 @@ class EnhancedContentAnalyzer:
                         "message_index": msg_idx,
                         "role": message['role'],
                         "technical_domains": message['technical_domain'],
-                        "sentiment": self._analyze_sentiment(decision_text),
-                        "entities": self._extract_entities(decision_text),
                         "confidence": self._calculate_decision_confidence(decision_text, content)
                     }
                     decisions.append(decision)
 
+        # Merging runs on the same budget: once it is spent (or past the cap) the
+        # remaining decisions are returned unmerged and the result is marked truncated
+        dedup_complete = None
+        if deduplicate:
+            limit = self.extraction_guard.max_dedup_decisions
+            dedup_complete = len(decisions) <= limit
+            decisions = self.deduplicator.deduplicate(decisions, stop=budget.expired, limit=limit)
+            dedup_complete = dedup_complete and not budget.expired()
+            truncated = truncated or not dedup_complete
+
+        if enrich:
+            self.enrich_decisions(decisions)
+
+        extraction = extraction_status(truncated, scanned, len(messages), budget, dict(skipped))
+        extraction["deduplicated"] = dedup_complete
+        return {"decisions": decisions, "extraction": extraction}
+
+    def enrich_decisions(self, decisions: List[Dict]) -> List[Dict]:
+        """Add sentiment and named entities to each decision"""
+        texts = [decision['text'] for decision in decisions]
+        sentiments = self._remote("sentiment", texts)
+        entities = self._remote("entities", texts)
+        for index, decision in enumerate(decisions):
+            decision["sentiment"] = sentiments[index] if sentiments else self._analyze_sentiment(texts[index])
+            decision["entities"] = entities[index] if entities else self._extract_entities(texts[index])
         return decisions
 
     def _calculate_decision_confidence(self, decision_text: str, context: str) -> float:
@@ -191,7 +347,8 @@ class EnhancedContentAnalyzer:
                     G.add_edge(dec1['id'], dec2['id'], weight=len(shared_domains))
 
         # Convert to visualization format
-        pos = nx.spring_layout(G, k=1, iterations=50)
+        with time_stage("mindmap_layout"):
+            pos = nx.spring_layout(G, k=1, iterations=50)
 
         # Create nodes for visualization
         nodes = []
@@ -219,7 +376,8 @@ class EnhancedContentAnalyzer:
             })
 
         # Generate Plotly visualization
-        html_viz = self._create_plotly_mindmap(nodes, edges)
+        with time_stage("mindmap_render"):
+            html_viz = self._create_plotly_mindmap(nodes, edges)
 
         return {
             "nodes": nodes,
@@ -318,11 +476,11 @@ class EnhancedContentAnalyzer:
         if not messages:
             return {}
 
-        # Extract topics using TF-IDF
-        texts = [msg['content'] for msg in messages]
+        # Extract topics using TF-IDF (prose only, so code identifiers don't dominate)
+        texts = [self._prose_of(msg) for msg in messages]
 
         try:
-            vectorizer = TfidfVectorizer(max_features=100, stop_words='english', ngram_range=(1, 2))
+            vectorizer = sklearn_text.TfidfVectorizer(max_features=100, stop_words='english', ngram_range=(1, 2))
             tfidf_matrix = vectorizer.fit_transform(texts)
             feature_names = vectorizer.get_feature_names_out()
 
@@ -0,0 +1,129 @@
+"""
+Guardrails for regex-based decision extraction
+Caps message size, skips code blocks and log dumps, prefers a linear-time
+regex engine and enforces a per-request time budget
+"""
+import os
+import re
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.core.message_segmenter import MessageSegmenter
+
+# Optional linear-time regex engine (pip install google-re2)
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    re2 = None
+    RE2_AVAILABLE = False
+
+_SENTENCE_END_RE = re.compile(r'[.!?]\s|\n')
+
+
+def compile_pattern(pattern: str):
+    """Compile a case-insensitive pattern with RE2 when available, else ``re``"""
+    if RE2_AVAILABLE:
+        try:
+            return re2.compile("(?i)" + pattern)
+        except Exception:
+            # Pattern uses syntax RE2 does not support - fall back to re
+            pass
+    return re.compile(pattern, re.IGNORECASE)
+
+
+class ExtractionBudget:
+    """Deadline for a single extraction request"""
+
+    def __init__(self, deadline_seconds: float = None):
+        self.started = time.monotonic()
+        self.deadline = self.started + deadline_seconds if deadline_seconds else None
+
+    def expired(self) -> bool:
+        """True once the deadline has passed"""
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def elapsed(self) -> float:
+        """Seconds since the budget started"""
+        return time.monotonic() - self.started
+
+
+class ExtractionGuard:
+    """Prepares message text so pattern matching stays fast on hostile input"""
+
+    def __init__(self, max_message_chars: int = None, deadline_seconds: float = None,
+                 max_line_chars: int = 400, max_dedup_decisions: int = None):
+        """
+        Args:
+            max_message_chars: Prose characters scanned per message (DECISION_MAX_MESSAGE_CHARS)
+            deadline_seconds: Time budget per extraction request (DECISION_EXTRACTION_DEADLINE)
+            max_line_chars: Lines longer than this with almost no whitespace are treated as dumps
+            max_dedup_decisions: Decisions compared for near-duplicates per request (DECISION_DEDUP_MAX)
+        """
+        self.max_message_chars = max_message_chars or int(os.getenv("DECISION_MAX_MESSAGE_CHARS", "20000"))
+        self.max_dedup_decisions = max_dedup_decisions or int(os.getenv("DECISION_DEDUP_MAX", "2000"))
+        self.deadline_seconds = deadline_seconds if deadline_seconds is not None else float(
+            os.getenv("DECISION_EXTRACTION_DEADLINE", "5.0")
+        )
+        self.segmenter = MessageSegmenter(max_line_chars=max_line_chars)
+
+    def start(self, deadline_seconds: float = None) -> ExtractionBudget:
+        """Start a new time budget (0 disables the deadline)"""
+        seconds = self.deadline_seconds if deadline_seconds is None else deadline_seconds
+        return ExtractionBudget(seconds if seconds > 0 else None)
+
+    def prepare(self, text: str, spans: List[Dict] = None) -> Tuple[str, Dict[str, int]]:
+        """
+        Strip non-prose content and cap the size of a message
+
+        Args:
+            text: Message content
+            spans: Segments already computed for this message (segmented here if omitted)
+
+        Returns:
+            The text to scan and counters describing what was skipped
+        """
+        stats = {"code_blocks_skipped": 0, "log_lines_skipped": 0, "truncated_chars": 0}
+        if spans is None:
+            spans = self.segmenter.segment(text)
+        for span in spans:
+            if span["type"] != "code":
+                continue
+            if span.get("language") in ("log", "data"):
+                stats["log_lines_skipped"] += span["lines"]
+            else:
+                stats["code_blocks_skipped"] += 1
+
+        prose = self.segmenter.prose_text(text, spans, include=("prose", "quote", "table"))
+        if len(prose) > self.max_message_chars:
+            truncated = self.smart_truncate(prose, self.max_message_chars)
+            stats["truncated_chars"] = len(prose) - len(truncated)
+            prose = truncated
+
+        return prose, stats
+
+    def smart_truncate(self, text: str, limit: int) -> str:
+        """Cut at the last sentence boundary before ``limit`` (hard cut if none is close)"""
+        if len(text) <= limit:
+            return text
+
+        head = text[:limit]
+        boundary = -1
+        for match in _SENTENCE_END_RE.finditer(head):
+            boundary = match.end()
+        if boundary >= limit * 0.8:
+            return head[:boundary].rstrip()
+        return head
+
+
+def extraction_status(truncated: bool, scanned: int, total: int, budget: ExtractionBudget,
+                      skipped: Dict[str, int]) -> Dict[str, Any]:
+    """Summary attached to guarded extraction results"""
+    return {
+        "truncated": truncated,
+        "messages_scanned": scanned,
+        "messages_total": total,
+        "elapsed_seconds": round(budget.elapsed(), 4),
+        "regex_engine": "re2" if RE2_AVAILABLE else "re",
+        **skipped
+    }
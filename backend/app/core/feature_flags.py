@@ -4,6 +4,8 @@ Allows toggling experimental features without code changes
 """
 
 import os
+import sys
+import importlib.util
 from typing import Dict, Any
 from enum import Enum
 
@@ -14,6 +16,12 @@ class Features(Enum):
     CANVAS_GENERATION = "canvas_generation"
     LOCAL_AI_INTEGRATION = "local_ai_integration"
     NLP_PROCESSING = "nlp_processing"
+    REQUEST_PROFILING = "request_profiling"
+    ONNX_INFERENCE = "onnx_inference"
+
+# Present when an NVIDIA driver is usable: native Linux, then WSL2 (GPU paravirtualization)
+NVIDIA_DRIVER_PATHS = ("/proc/driver/nvidia/version", "/dev/dxg", "/usr/lib/wsl/lib/libcuda.so")
+
 
 class FeatureFlags:
     """
@@ -29,6 +37,8 @@ class FeatureFlags:
             Features.CANVAS_GENERATION: os.getenv("ENABLE_CANVAS_GENERATION", "true").lower() == "true",
             Features.LOCAL_AI_INTEGRATION: os.getenv("ENABLE_LOCAL_AI", "false").lower() == "true",
             Features.NLP_PROCESSING: os.getenv("ENABLE_NLP", "true").lower() == "true",
+            Features.REQUEST_PROFILING: os.getenv("ENABLE_REQUEST_PROFILING", "false").lower() == "true",
+            Features.ONNX_INFERENCE: os.getenv("ENABLE_ONNX_INFERENCE", "false").lower() == "true",
         }
 
     def _check_gpu_available(self) -> bool:
@@ -39,6 +49,12 @@ class FeatureFlags:
         if os.getenv("DISABLE_GPU", "false").lower() == "true":
             return False
 
+        # Importing torch costs seconds; skip it when it cannot find a GPU anyway
+        if importlib.util.find_spec("torch") is None:
+            return False
+        if sys.platform.startswith("linux") and not any(os.path.exists(path) for path in NVIDIA_DRIVER_PATHS):
+            return False
+
         try:
             import torch
             if torch.cuda.is_available():
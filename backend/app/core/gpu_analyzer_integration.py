@@ -39,7 +39,7 @@ class GPUEnhancedContentAnalyzer(EnhancedContentAnalyzer):
             if self.gpu_available:
                 logger.info("🔥 Using GPU-accelerated dialogue analysis")
 
-                # Get GPU analysis first
+                # One GPU pass (and one spaCy parse) per conversation, shared with extract_decisions
                 gpu_result = analyze_conversation_simple_gpu(content, '')
 
                 # Get original CPU analysis
@@ -53,6 +53,8 @@ class GPUEnhancedContentAnalyzer(EnhancedContentAnalyzer):
                     'gpu_features': gpu_result.get('gpu_features', {}),
                     'gpu_entities': gpu_result.get('entities', []),
                     'gpu_key_phrases': gpu_result.get('key_phrases', []),
+                    'gpu_decisions': gpu_result.get('decisions', []),
+                    'gpu_action_items': gpu_result.get('action_items', []),
                     'processing_method': 'hybrid_gpu_cpu'
                 }
 
@@ -88,15 +90,21 @@ class GPUEnhancedContentAnalyzer(EnhancedContentAnalyzer):
         cpu_decisions = super().extract_decisions(message_list)
 
         if gpu_enhanced and self.gpu_available:
-            # Extract text for GPU analysis
-            full_text = ' '.join([msg.get('content', '') for msg in message_list])
-            gpu_result = analyze_conversation_simple_gpu(full_text, '')
+            if 'gpu_decisions' in messages:
+                # Reuse the pass made during dialogue extraction
+                gpu_decisions = messages['gpu_decisions']
+                gpu_action_items = messages.get('gpu_action_items', [])
+            else:
+                full_text = ' '.join([msg.get('content', '') for msg in message_list])
+                gpu_result = analyze_conversation_simple_gpu(full_text, '')
+                gpu_decisions = gpu_result.get('decisions', [])
+                gpu_action_items = gpu_result.get('action_items', [])
 
             # Enhance decisions with GPU insights
             enhanced_decisions = {
                 'decisions': cpu_decisions,
-                'gpu_decisions': gpu_result.get('decisions', []),
-                'gpu_action_items': gpu_result.get('action_items', []),
+                'gpu_decisions': gpu_decisions,
+                'gpu_action_items': gpu_action_items,
                 'gpu_enhanced': True
             }
             return enhanced_decisions
@@ -4,17 +4,30 @@ Optimized for RTX 4080 with memory-efficient processing
 """
 
 import torch
+import os
+import re
 import logging
 from typing import Dict, List, Any, Optional
-from transformers import pipeline, AutoTokenizer, AutoModel
-import spacy
 from datetime import datetime
 import gc
 
+from app.core.inference_server import RemotePipeline, get_inference_client
+from app.core.metrics import STAGE_DURATION, time_model_load
+from app.core.nlp_resources import get_nlp_resources
+from app.core.model_manager import ModelLoadError, get_model_manager
+from app.core.batched_inference import get_batched_inference
+from app.core.map_reduce_summarizer import get_map_reduce_summarizer
+from app.core.simple_gpu_analyzer import ENTITY_WINDOW_CHARS, SharedAnalysisContext
+from app.core.onnx_backend import ONNX_AVAILABLE, get_onnx_store
+from app.core.feature_flags import Features, is_feature_enabled
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
 class GPUResourceManager:
     """Manages GPU memory usage and prevents conflicts with LM Studio"""
 
@@ -63,61 +76,69 @@ class GPUEnhancedAnalyzer:
 
     def __init__(self):
         self.gpu_manager = GPUResourceManager()
-        self.models = {}
+        self.model_manager = get_model_manager()
+        self.inference = get_batched_inference()
+        self.summarizer = get_map_reduce_summarizer()
         self.nlp = None
         self._initialize_models()
 
     def _initialize_models(self):
-        """Initialize models with GPU optimization"""
+        """Load spaCy and register the transformers pipelines (loaded on first use)"""
         try:
             # Initialize spaCy (CPU - CuPy not available, but transformers will use GPU)
             logger.info("💻 Initializing spaCy with CPU (transformers will use GPU)...")
-            self.nlp = spacy.load("en_core_web_sm")
-
-            # Initialize sentiment analysis with GPU (using safer model)
-            if self.gpu_manager.is_gpu_available and self.gpu_manager.check_memory_safety(300):
-                logger.info("🎭 Loading GPU sentiment analysis...")
-                self.models['sentiment'] = pipeline(
-                    "sentiment-analysis",
-                    model="distilbert-base-uncased-finetuned-sst-2-english",
-                    device=0,
-                    max_length=512,
-                    truncation=True
-                )
-            else:
-                logger.info("💻 Loading CPU sentiment analysis...")
-                self.models['sentiment'] = pipeline(
-                    "sentiment-analysis",
-                    model="distilbert-base-uncased-finetuned-sst-2-english",
-                    device=-1
-                )
-
-            # Initialize summarization model (lighter model)
-            if self.gpu_manager.is_gpu_available and self.gpu_manager.check_memory_safety(400):
-                logger.info("📝 Loading GPU summarization...")
-                self.models['summarizer'] = pipeline(
-                    "summarization",
-                    model="sshleifer/distilbart-cnn-12-6",
-                    device=0,
-                    max_length=150,
-                    min_length=30,
-                    truncation=True
-                )
-            else:
-                logger.info("💻 Loading CPU summarization...")
-                self.models['summarizer'] = pipeline(
-                    "summarization",
-                    model="sshleifer/distilbart-cnn-12-6",
-                    device=-1
-                )
-
-            logger.info("✅ All models initialized successfully")
-
+            with time_model_load("spacy:en_core_web_sm"):
+                self.nlp = get_nlp_resources().load_spacy()
         except Exception as e:
-            logger.error(f"❌ Model initialization failed: {e}")
-            # Fallback to basic CPU processing
-            self.nlp = spacy.load("en_core_web_sm")
-            self.models = {}
+            logger.error(f"❌ spaCy initialization failed: {e}")
+
+        # ONNX Runtime (int8, CPU) replaces the PyTorch pipelines when enabled
+        use_onnx = is_feature_enabled(Features.ONNX_INFERENCE) and ONNX_AVAILABLE
+        if is_feature_enabled(Features.ONNX_INFERENCE) and not ONNX_AVAILABLE:
+            logger.warning("⚠️ ONNX inference enabled but optimum[onnxruntime] is not installed; using PyTorch")
+
+        def load_sentiment(device: int):
+            if use_onnx:
+                return get_onnx_store().pipeline("sentiment-analysis", SENTIMENT_MODEL)
+            from transformers import pipeline
+            options = {"max_length": 512, "truncation": True} if device >= 0 else {}
+            return pipeline(
+                "sentiment-analysis",
+                model=SENTIMENT_MODEL,
+                device=device,
+                **options
+            )
+
+        def load_summarizer(device: int):
+            # A smaller distilbart keeps CPU summarization affordable
+            model = os.getenv("SUMMARY_MODEL", "sshleifer/distilbart-cnn-12-6") if device >= 0 else \
+                os.getenv("SUMMARY_MODEL_CPU", "sshleifer/distilbart-cnn-6-6")
+            if use_onnx:
+                return get_onnx_store().pipeline("summarization", model)
+            from transformers import pipeline
+            return pipeline("summarization", model=model, device=device)
+
+        # Quantized weights are roughly a quarter of the fp32 size
+        inference_client = get_inference_client()
+        if inference_client is not None:
+            # Classified by the inference server, batched together with the other workers' requests
+            self.model_manager.register("sentiment", lambda device: RemotePipeline(inference_client),
+                                        estimated_mb=0, gpu=False)
+        else:
+            self.model_manager.register("sentiment", load_sentiment, estimated_mb=100 if use_onnx else 300,
+                                        gpu=not use_onnx)
+        self.model_manager.register("summarizer", load_summarizer, estimated_mb=400 if use_onnx else 1300, gpu=not use_onnx)
+        logger.info("✅ Models registered (transformers pipelines load on first use)")
+
+    def _model(self, name: str):
+        """A registered pipeline, or None if it cannot be loaded"""
+        if not self.model_manager.available(name):
+            return None
+        try:
+            return self.model_manager.get(name)
+        except ModelLoadError as e:
+            logger.warning(f"⚠️ {name} unavailable: {e}")
+            return None
 
     def analyze_conversation_enhanced(self, text: str, conversation_title: str = "") -> Dict[str, Any]:
         """Enhanced conversation analysis with GPU acceleration"""
@@ -139,64 +160,53 @@ class GPUEnhancedAnalyzer:
 
             # 1. Basic NLP processing with spaCy
             logger.info("🔍 Processing with spaCy...")
-            doc = self.nlp(text[:10000])  # Limit to 10k chars for memory safety
+            # Parsed once; entities, decisions and action items all reuse it
+            context = SharedAnalysisContext(text, self.nlp)
+            doc = context.doc
 
             # Extract entities
-            entities = [(ent.text, ent.label_) for ent in doc.ents]
+            entities = [(ent.text, ent.label_) for ent in doc.ents if ent.start_char < ENTITY_WINDOW_CHARS]
             results["entities"] = entities[:20]  # Top 20 entities
 
             # Extract key phrases (noun phrases)
-            noun_phrases = [chunk.text for chunk in doc.noun_chunks]
+            noun_phrases = [chunk.text for chunk in doc.noun_chunks if chunk.start_char < ENTITY_WINDOW_CHARS]
             results["key_phrases"] = noun_phrases[:15]  # Top 15 phrases
 
-            # 2. Sentiment analysis
-            if 'sentiment' in self.models:
+            messages = self._split_messages(text)
+
+            # 2. Sentiment analysis (whole conversation, batched, per message)
+            sentiment_model = self._model('sentiment')
+            if sentiment_model is not None:
                 logger.info("🎭 Analyzing sentiment...")
-                # Process in chunks to manage memory
-                chunks = [text[i:i+500] for i in range(0, min(len(text), 2000), 500)]
-                sentiments = []
-
-                for chunk in chunks:
-                    if chunk.strip():
-                        sentiment = self.models['sentiment'](chunk)
-                        sentiments.extend(sentiment)
-
-                if sentiments:
-                    # Aggregate sentiment scores
-                    avg_confidence = sum(s['score'] for s in sentiments) / len(sentiments)
-                    dominant_sentiment = max(set(s['label'] for s in sentiments),
-                                           key=lambda x: sum(1 for s in sentiments if s['label'] == x))
-
-                    results["sentiment"] = {
-                        "overall": dominant_sentiment,
-                        "confidence": avg_confidence,
-                        "details": sentiments[:5]  # Top 5 sentiment scores
-                    }
-
-            # 3. Text summarization
-            if 'summarizer' in self.models and len(text) > 200:
+                sentiment = self.inference.sentiment_by_message(sentiment_model, messages)
+                if sentiment["chunks"]:
+                    results["sentiment"] = sentiment
+
+            # 3. Text summarization (map-reduce over message-aligned chunks)
+            summarizer = self._model('summarizer') if len(text) > 200 else None
+            if summarizer is not None:
                 logger.info("📝 Generating summary...")
                 try:
-                    # Summarize in chunks and combine
-                    summary_text = text[:1000]  # Limit input for memory safety
-                    summary = self.models['summarizer'](summary_text)
-                    results["summary"] = summary[0]['summary_text'] if summary else "Summary generation failed"
+                    summary = self.summarizer.summarize(summarizer, messages)
+                    results["summary"] = summary.pop("summary") or "Summary generation failed"
+                    results["summary_stats"] = summary
                 except Exception as e:
                     logger.warning(f"⚠️ Summarization failed: {e}")
                     results["summary"] = "Summary not available"
 
             # 4. Decision extraction (enhanced)
-            decisions = self._extract_decisions_gpu(text)
+            decisions = self._extract_decisions_gpu(context.sentences)
             results["decisions"] = decisions
 
             # 5. Action items extraction
-            action_items = self._extract_action_items_gpu(text)
+            action_items = self._extract_action_items_gpu(context.sentences)
             results["action_items"] = action_items
 
             # Performance metrics
             end_time = datetime.now()
             processing_time = (end_time - start_time).total_seconds()
             results["processing_time_seconds"] = processing_time
+            STAGE_DURATION.observe(processing_time, stage="gpu_enhanced_analysis")
 
             if self.gpu_manager.is_gpu_available:
                 final_memory = torch.cuda.memory_allocated(0) / 1024**2
@@ -219,7 +229,17 @@ class GPUEnhancedAnalyzer:
                 "gpu_accelerated": False
             }
 
-    def _extract_decisions_gpu(self, text: str) -> List[Dict[str, Any]]:
+    def _split_messages(self, text: str) -> List[Dict[str, Any]]:
+        """User/Claude messages of an export (the whole text if it has no message headings)"""
+        messages = []
+        for section in re.split(r'(?=^## (?:User|Claude))', text, flags=re.MULTILINE):
+            match = re.match(r'## (User|Claude)\s*', section)
+            content = section[match.end():].strip() if match else section.strip()
+            if content:
+                messages.append({"role": match.group(1).lower() if match else "unknown", "content": content})
+        return messages
+
+    def _extract_decisions_gpu(self, sentences: List[str]) -> List[Dict[str, Any]]:
         """GPU-accelerated decision extraction"""
         decisions = []
 
@@ -229,9 +249,6 @@ class GPUEnhancedAnalyzer:
             "selected", "determined", "concluded", "opted for"
         ]
 
-        doc = self.nlp(text)
-        sentences = [sent.text for sent in doc.sents]
-
         for i, sentence in enumerate(sentences):
             for pattern in decision_patterns:
                 if pattern.lower() in sentence.lower():
@@ -250,7 +267,7 @@ class GPUEnhancedAnalyzer:
 
         return decisions[:10]  # Limit to top 10 decisions
 
-    def _extract_action_items_gpu(self, text: str) -> List[Dict[str, Any]]:
+    def _extract_action_items_gpu(self, sentences: List[str]) -> List[Dict[str, Any]]:
         """GPU-accelerated action item extraction"""
         action_items = []
 
@@ -260,9 +277,6 @@ class GPUEnhancedAnalyzer:
             "implement", "create", "build", "setup", "configure"
         ]
 
-        doc = self.nlp(text)
-        sentences = [sent.text for sent in doc.sents]
-
         for i, sentence in enumerate(sentences):
             for pattern in action_patterns:
                 if pattern.lower() in sentence.lower():
@@ -282,7 +296,8 @@ class GPUEnhancedAnalyzer:
         """Get current system and GPU status"""
         status = {
             "gpu_available": self.gpu_manager.is_gpu_available,
-            "models_loaded": list(self.models.keys()),
+            "models_loaded": self.model_manager.loaded_models(),
+            "model_manager": self.model_manager.status(),
             "timestamp": datetime.now().isoformat()
         }
 
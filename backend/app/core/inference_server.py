@@ -0,0 +1,415 @@
+"""
+Out-of-process NLP inference for ConvoCanvas
+An optional sidecar that owns the spaCy model and the transformers pipelines
+so API workers do not each load their own copy. Requests from all workers are
+coalesced per operation into micro-batches: a batch is sent to the model when
+it reaches INFERENCE_MAX_BATCH texts or INFERENCE_MAX_WAIT_MS after its first
+request arrived, whichever comes first.
+
+    python -m app.core.inference_server --address unix:/tmp/convocanvas-inference.sock
+
+Workers use it when INFERENCE_SERVER is set to the same address (``unix:<path>``
+or ``<host>:<port>``). The protocol is one JSON object per line in each
+direction: ``{"id": 1, "op": "entities", "texts": [...]}`` is answered with
+``{"id": 1, "results": [...]}`` or ``{"id": 1, "error": "..."}``.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.lazy_imports import lazy_import
+from app.core.metrics import metrics, time_model_load
+
+spacy = lazy_import("spacy")
+textblob = lazy_import("textblob")
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = metrics.histogram(
+    "convocanvas_inference_batch_texts", "Texts per micro-batch run by the inference server", ["op"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256)
+)
+BATCH_REQUESTS = metrics.histogram(
+    "convocanvas_inference_batch_requests", "Client requests coalesced into one micro-batch", ["op"],
+    buckets=(1, 2, 4, 8, 16, 32, 64)
+)
+QUEUE_WAIT = metrics.histogram(
+    "convocanvas_inference_queue_seconds", "Time a request waited before its micro-batch started", ["op"]
+)
+
+# Longest line (one request or response) accepted on the socket
+MAX_LINE_BYTES = 64 * 1024 * 1024
+
+
+class InferenceServerError(RuntimeError):
+    """Raised by the client when the inference server is unreachable or reports an error"""
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """``unix:/path`` -> ("unix", path); ``host:port`` -> ("tcp", (host, port))"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid inference server address {address!r} (use unix:<path> or <host>:<port>)")
+    return "tcp", (host, int(port))
+
+
+class InferenceModels:
+    """The models owned by the server; each operation maps a list of texts to one result per text"""
+
+    def __init__(self, embedding_model: Optional[str] = None):
+        self.embedding_model = embedding_model or os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+        self._nlp = None
+        self._embedder = None
+        self._lock = threading.Lock()
+        self.operations: Dict[str, Callable[[List[str]], List[Any]]] = {
+            "entities": self.entities,
+            "sentiment": self.sentiment,
+            "classify": self.classify,
+            "embeddings": self.embeddings,
+        }
+
+    @property
+    def nlp(self):
+        with self._lock:
+            if self._nlp is None:
+                from app.core.nlp_resources import get_nlp_resources
+                with time_model_load("spacy:en_core_web_sm"):
+                    self._nlp = get_nlp_resources().load_spacy()
+        return self._nlp
+
+    def entities(self, texts: List[str]) -> List[List[Dict[str, str]]]:
+        """Named entities per text, shaped like EnhancedContentAnalyzer._extract_entities"""
+        return [
+            [{"text": ent.text, "label": ent.label_, "description": spacy.explain(ent.label_)} for ent in doc.ents]
+            for doc in self.nlp.pipe(texts, batch_size=max(1, len(texts)))
+        ]
+
+    def sentiment(self, texts: List[str]) -> List[Dict[str, float]]:
+        """TextBlob polarity and subjectivity per text"""
+        results = []
+        for text in texts:
+            blob = textblob.TextBlob(text)
+            results.append({"polarity": blob.sentiment.polarity, "subjectivity": blob.sentiment.subjectivity})
+        return results
+
+    def classify(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Transformer sentiment label and score per text (pipeline outputs)"""
+        from app.core.batched_inference import get_batched_inference
+        from app.core.model_manager import get_model_manager
+        manager = get_model_manager()
+        if not manager.available("sentiment"):
+            from app.core.gpu_enhanced_analyzer import SENTIMENT_MODEL
+
+            def load(device: int):
+                from transformers import pipeline
+                return pipeline("sentiment-analysis", model=SENTIMENT_MODEL, device=device)
+            manager.register("sentiment", load, estimated_mb=300)
+        return get_batched_inference().run(manager.get("sentiment"), texts)
+
+    def embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Mean-pooled transformer embeddings, or spaCy document vectors without torch"""
+        from app.core.model_manager import TORCH_AVAILABLE
+        if not TORCH_AVAILABLE:
+            return [doc.vector.tolist() for doc in self.nlp.pipe(texts, batch_size=max(1, len(texts)))]
+        import torch
+        with self._lock:
+            if self._embedder is None:
+                from transformers import AutoModel, AutoTokenizer
+                with time_model_load(f"embeddings:{self.embedding_model}"):
+                    self._embedder = (AutoTokenizer.from_pretrained(self.embedding_model),
+                                      AutoModel.from_pretrained(self.embedding_model).eval())
+        tokenizer, model = self._embedder
+        with torch.inference_mode():
+            encoded = tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+            hidden = model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+            pooled = (hidden * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+        return pooled.tolist()
+
+
+class MicroBatcher:
+    """Coalesces concurrent requests for one operation into batches"""
+
+    def __init__(self, op: str, func: Callable[[List[str]], List[Any]], max_batch_size: int, max_wait: float):
+        self.op = op
+        self.func = func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue: "asyncio.Queue[Tuple[List[str], asyncio.Future, float]]" = asyncio.Queue()
+        # One thread per operation: a model only ever runs one batch at a time
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"inference-{op}")
+        self._task: Optional[asyncio.Task] = None
+
+    async def submit(self, texts: List[str]) -> List[Any]:
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((texts, future, time.perf_counter()))
+        return await future
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            size = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while size < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                size += len(item[0])
+
+            started = time.perf_counter()
+            texts = [text for item in batch for text in item[0]]
+            for _, _, queued in batch:
+                QUEUE_WAIT.observe(started - queued, op=self.op)
+            BATCH_SIZE.observe(len(texts), op=self.op)
+            BATCH_REQUESTS.observe(len(batch), op=self.op)
+            try:
+                results = await loop.run_in_executor(self._executor, self.func, texts)
+            except Exception as e:
+                logger.warning("Inference %s failed for a batch of %d texts: %s", self.op, len(texts), e)
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            offset = 0
+            for item_texts, future, _ in batch:
+                if not future.done():
+                    future.set_result(results[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+class InferenceServer:
+    """Serves InferenceModels over a unix or TCP socket"""
+
+    def __init__(self, address: Optional[str] = None, models: Optional[InferenceModels] = None,
+                 max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+        """
+        Args:
+            address: ``unix:<path>`` or ``<host>:<port>`` (INFERENCE_SERVER)
+            max_batch_size: Texts that close a micro-batch early (INFERENCE_MAX_BATCH)
+            max_wait_ms: Longest a batch waits for more requests (INFERENCE_MAX_WAIT_MS)
+        """
+        self.address = address or os.getenv("INFERENCE_SERVER") or "unix:/tmp/convocanvas-inference.sock"
+        self.models = models or InferenceModels()
+        self.max_batch_size = int(max_batch_size or os.getenv("INFERENCE_MAX_BATCH", "32"))
+        self.max_wait = float(max_wait_ms if max_wait_ms is not None else os.getenv("INFERENCE_MAX_WAIT_MS", "5")) / 1000
+        self.batchers: Dict[str, MicroBatcher] = {}
+
+    def _batcher(self, op: str) -> MicroBatcher:
+        if op not in self.batchers:
+            self.batchers[op] = MicroBatcher(op, self.models.operations[op], self.max_batch_size, self.max_wait)
+        return self.batchers[op]
+
+    async def _respond(self, request: Dict, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        response: Dict[str, Any] = {"id": request.get("id")}
+        op = request.get("op")
+        try:
+            if op == "ping":
+                response["results"] = {"pid": os.getpid(), "ops": list(self.models.operations)}
+            elif op in self.models.operations:
+                texts = request.get("texts")
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("texts must be a list of strings")
+                response["results"] = await self._batcher(op).submit(texts) if texts else []
+            else:
+                raise ValueError(f"Unknown operation {op!r}")
+        except Exception as e:
+            response = {"id": request.get("id"), "error": f"{type(e).__name__}: {e}"}
+        async with write_lock:
+            writer.write(json.dumps(response).encode() + b"\n")
+            await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on one connection are answered as they complete, matched by id
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    request = {"op": None}
+                task = asyncio.create_task(self._respond(request, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            logger.debug("Inference connection closed: %s", e)
+        finally:
+            writer.close()
+
+    def warm(self, ops: List[str]):
+        """Load the models behind ``ops`` before accepting requests"""
+        for op in ops:
+            start = time.perf_counter()
+            self.models.operations[op](["Warm-up sentence for the inference server."])
+            logger.info("Warmed %s in %.2fs", op, time.perf_counter() - start)
+
+    async def serve(self):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            server = await asyncio.start_unix_server(self._handle, path=target, limit=MAX_LINE_BYTES)
+        else:
+            server = await asyncio.start_server(self._handle, *target, limit=MAX_LINE_BYTES)
+        logger.info("Inference server listening on %s (batch %d, wait %.1fms)",
+                    self.address, self.max_batch_size, self.max_wait * 1000)
+        async with server:
+            await server.serve_forever()
+
+
+class InferenceClient:
+    """Blocking client for the inference server (one connection per thread)"""
+
+    def __init__(self, address: str, timeout: Optional[float] = None):
+        """
+        Args:
+            address: ``unix:<path>`` or ``<host>:<port>``
+            timeout: Seconds to wait for a response (INFERENCE_TIMEOUT)
+        """
+        self.address = address
+        self.kind, self.target = parse_address(address)
+        self.timeout = float(timeout or os.getenv("INFERENCE_TIMEOUT", "60"))
+        self._local = threading.local()
+        self._next_id = 0
+        self._id_lock = threading.Lock()
+
+    def _connect(self):
+        family = socket.AF_UNIX if self.kind == "unix" else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.target)
+        return sock, sock.makefile("rwb")
+
+    def _close(self):
+        connection = getattr(self._local, "connection", None)
+        self._local.connection = None
+        if connection is not None:
+            sock, stream = connection
+            stream.close()
+            sock.close()
+
+    def _call(self, op: str, texts: Optional[List[str]] = None) -> Any:
+        with self._id_lock:
+            self._next_id += 1
+            request_id = self._next_id
+        payload = json.dumps({"id": request_id, "op": op, "texts": texts}).encode() + b"\n"
+        # A kept-alive connection may have been closed by a server restart: retry once on a new one
+        for attempt in range(2):
+            try:
+                if getattr(self._local, "connection", None) is None:
+                    self._local.connection = self._connect()
+                _, stream = self._local.connection
+                stream.write(payload)
+                stream.flush()
+                line = stream.readline()
+                if not line:
+                    raise ConnectionError("connection closed by the inference server")
+                break
+            except socket.timeout as e:
+                self._close()
+                raise InferenceServerError(f"Inference server {self.address} timed out after {self.timeout}s") from e
+            except OSError as e:
+                self._close()
+                if attempt:
+                    raise InferenceServerError(f"Inference server {self.address} unreachable: {e}") from e
+        response = json.loads(line)
+        if response.get("id") != request_id:
+            self._close()
+            raise InferenceServerError(f"Mismatched response id {response.get('id')} (expected {request_id})")
+        if "error" in response:
+            raise InferenceServerError(response["error"])
+        return response["results"]
+
+    def ping(self) -> Dict[str, Any]:
+        return self._call("ping")
+
+    def entities(self, texts: List[str]) -> List[List[Dict[str, str]]]:
+        return self._call("entities", texts)
+
+    def sentiment(self, texts: List[str]) -> List[Dict[str, float]]:
+        return self._call("sentiment", texts)
+
+    def classify(self, texts: List[str]) -> List[Dict[str, Any]]:
+        return self._call("classify", texts)
+
+    def embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._call("embeddings", texts)
+
+
+class RemotePipeline:
+    """
+    Stands in for a transformers sentiment pipeline in BatchedInference and the
+    model manager; the texts are classified by the inference server
+    """
+
+    tokenizer = None
+
+    def __init__(self, client: InferenceClient):
+        self.client = client
+
+    def __call__(self, texts, **kwargs):
+        if isinstance(texts, str):
+            return self.client.classify([texts])
+        return self.client.classify(list(texts))
+
+
+# Global client (None when no inference server is configured)
+_inference_client = None
+
+
+def get_inference_client() -> Optional[InferenceClient]:
+    """Client for INFERENCE_SERVER, or None when models run in-process"""
+    global _inference_client
+    address = os.getenv("INFERENCE_SERVER")
+    if not address:
+        return None
+    if _inference_client is None or _inference_client.address != address:
+        _inference_client = InferenceClient(address)
+    return _inference_client
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ConvoCanvas NLP inference server")
+    parser.add_argument("--address", default=os.getenv("INFERENCE_SERVER") or "unix:/tmp/convocanvas-inference.sock",
+                        help="unix:<path> or <host>:<port>")
+    parser.add_argument("--max-batch", type=int, help="Texts per micro-batch (INFERENCE_MAX_BATCH)")
+    parser.add_argument("--max-wait-ms", type=float, help="Micro-batch latency window (INFERENCE_MAX_WAIT_MS)")
+    parser.add_argument("--preload", default=os.getenv("INFERENCE_PRELOAD", "entities,sentiment"),
+                        help="Operations whose models load at startup")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    server = InferenceServer(args.address, max_batch_size=args.max_batch, max_wait_ms=args.max_wait_ms)
+    server.warm([op.strip() for op in args.preload.split(",") if op.strip()])
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
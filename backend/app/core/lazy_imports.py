@@ -0,0 +1,42 @@
+"""
+Deferred imports for ConvoCanvas
+Heavy analysis dependencies (spaCy, NLTK, TextBlob, scikit-learn, plotly, ...)
+are bound to module proxies that import the real module on first attribute
+access, so importing the API does not pay for libraries a request may never use.
+"""
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule:
+    """Stand-in for a module, imported on first attribute access"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    @property
+    def loaded(self) -> bool:
+        return self._module is not None
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """``np = lazy_import("numpy")`` behaves like ``import numpy as np``, on demand"""
+    return LazyModule(name)
@@ -0,0 +1,208 @@
+"""
+Pure-Python LZ-string (base64 variant)
+Byte-compatible with lz-string's compressToBase64/decompressFromBase64, which
+the Obsidian Excalidraw plugin uses for ``compressed-json`` drawing blocks.
+Strings are processed as UTF-16 code units, like JavaScript does.
+"""
+from typing import Callable, Dict, List, Optional, Tuple
+
+_BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/="
+_BASE64_REVERSE = {char: index for index, char in enumerate(_BASE64)}
+
+
+def _to_code_units(text: str) -> str:
+    """Re-express astral characters as surrogate pairs (one char per UTF-16 unit)"""
+    if text.isascii():
+        return text
+    data = text.encode("utf-16-le", "surrogatepass")
+    return "".join(chr(data[i] | (data[i + 1] << 8)) for i in range(0, len(data), 2))
+
+
+def _from_code_units(units: str) -> str:
+    """Join surrogate pairs back into Python characters"""
+    if units.isascii():
+        return units
+    return units.encode("utf-16-le", "surrogatepass").decode("utf-16-le")
+
+
+class _BitWriter:
+    """
+    Packs values LSB-first into output symbols of ``bits_per_char`` bits
+    Bits are appended to an integer accumulator a value at a time instead of
+    one bit per loop iteration.
+    """
+
+    def __init__(self, bits_per_char: int, char_for: Callable[[int], str]):
+        self.bits_per_char = bits_per_char
+        self.mask = (1 << bits_per_char) - 1
+        self.char_for = char_for
+        self.data: List[str] = []
+        self.acc = 0
+        self.pending = 0
+
+    def write(self, value: int, num_bits: int):
+        # lz-string emits the least significant bit first
+        reversed_bits = int(format(value, f"0{num_bits}b")[::-1], 2) if value else 0
+        self.acc = (self.acc << num_bits) | reversed_bits
+        self.pending += num_bits
+        while self.pending >= self.bits_per_char:
+            self.pending -= self.bits_per_char
+            self.data.append(self.char_for((self.acc >> self.pending) & self.mask))
+        self.acc &= (1 << self.pending) - 1
+
+    def flush(self) -> str:
+        # Pad with zeros to a full symbol (a whole zero symbol if already aligned)
+        self.write(0, self.bits_per_char - self.pending)
+        return "".join(self.data)
+
+
+def _compress(text: str, bits_per_char: int, char_for: Callable[[int], str]) -> str:
+    # Phrases are keyed by (prefix code, next char) rather than by the phrase
+    # string itself, so each step hashes a small tuple instead of a long string
+    chars: Dict[str, int] = {}
+    phrases: Dict[Tuple[int, str], int] = {}
+    to_create = set()
+    writer = _BitWriter(bits_per_char, char_for)
+    w_code = -1
+    w_char: Optional[str] = None
+    enlarge_in = 2
+    dict_size = 3
+    num_bits = 2
+
+    def emit_w():
+        nonlocal enlarge_in, num_bits
+        if w_char is not None and w_char in to_create:
+            code = ord(w_char)
+            if code < 256:
+                writer.write(0, num_bits)
+                writer.write(code, 8)
+            else:
+                writer.write(1, num_bits)
+                writer.write(code, 16)
+            enlarge_in -= 1
+            if enlarge_in == 0:
+                enlarge_in = 1 << num_bits
+                num_bits += 1
+            to_create.discard(w_char)
+        else:
+            writer.write(w_code, num_bits)
+        enlarge_in -= 1
+        if enlarge_in == 0:
+            enlarge_in = 1 << num_bits
+            num_bits += 1
+
+    for c in text:
+        if c not in chars:
+            chars[c] = dict_size
+            dict_size += 1
+            to_create.add(c)
+        if w_code < 0:
+            w_code, w_char = chars[c], c
+            continue
+        code = phrases.get((w_code, c))
+        if code is not None:
+            w_code, w_char = code, None
+            continue
+        emit_w()
+        phrases[(w_code, c)] = dict_size
+        dict_size += 1
+        w_code, w_char = chars[c], c
+
+    if w_code >= 0:
+        emit_w()
+
+    # End-of-stream marker
+    writer.write(2, num_bits)
+    return writer.flush()
+
+
+def _decompress(length: int, reset_value: int, next_value: Callable[[int], int]) -> Optional[str]:
+    dictionary: Dict[int, str] = {0: "0", 1: "1", 2: "2"}
+    enlarge_in = 4
+    dict_size = 4
+    num_bits = 3
+    data_val = next_value(0)
+    data_position = reset_value
+    data_index = 1
+
+    def read(count: int) -> int:
+        nonlocal data_val, data_position, data_index
+        bits = 0
+        for power in range(count):
+            bit = data_val & data_position
+            data_position >>= 1
+            if data_position == 0:
+                data_position = reset_value
+                data_val = next_value(data_index)
+                data_index += 1
+            if bit:
+                bits |= 1 << power
+        return bits
+
+    kind = read(2)
+    if kind == 2:
+        return ""
+    c = chr(read(8 if kind == 0 else 16))
+    dictionary[3] = c
+    w = c
+    result = [c]
+
+    while True:
+        if data_index > length:
+            return ""
+        code = read(num_bits)
+        if code in (0, 1):
+            dictionary[dict_size] = chr(read(8 if code == 0 else 16))
+            dict_size += 1
+            code = dict_size - 1
+            enlarge_in -= 1
+        elif code == 2:
+            return "".join(result)
+
+        if enlarge_in == 0:
+            enlarge_in = 1 << num_bits
+            num_bits += 1
+
+        if code in dictionary:
+            entry = dictionary[code]
+        elif code == dict_size:
+            entry = w + w[0]
+        else:
+            return None
+        result.append(entry)
+
+        dictionary[dict_size] = w + entry[0]
+        dict_size += 1
+        enlarge_in -= 1
+        w = entry
+
+        if enlarge_in == 0:
+            enlarge_in = 1 << num_bits
+            num_bits += 1
+
+
+def compress_to_base64(text: str) -> str:
+    """Equivalent of LZString.compressToBase64"""
+    if not text:
+        return ""
+    result = _compress(_to_code_units(text), 6, _BASE64.__getitem__)
+    return result + "=" * (-len(result) % 4)
+
+
+def decompress_from_base64(data: str) -> Optional[str]:
+    """Equivalent of LZString.decompressFromBase64 (whitespace is ignored)"""
+    data = "".join(data.split())
+    if not data:
+        return ""
+    length = len(data)
+
+    def next_value(index: int) -> int:
+        return _BASE64_REVERSE[data[index]] if index < length else 0
+
+    result = _decompress(length, 32, next_value)
+    return None if result is None else _from_code_units(result)
+
+
+def chunk(data: str, size: int = 256) -> str:
+    """Split a compressed payload into blank-line separated lines (as the plugin writes it)"""
+    return "\n\n".join(data[i:i + size] for i in range(0, len(data), size))
@@ -0,0 +1,166 @@
+"""
+Hierarchical map-reduce summarization for ConvoCanvas
+Long conversations are packed into chunks along message boundaries, each
+chunk is summarized (map, in batches), and the summaries are summarized again
+level by level (reduce) until one summary is left. Every summary is cached by
+the hash of its input, and chunks are packed greedily from the start, so
+appending messages to a conversation only re-summarizes the tail.
+"""
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.batched_inference import BatchedInference, TokenChunker, get_batched_inference
+from app.core.metrics import record_cache, time_stage
+
+logger = logging.getLogger(__name__)
+
+
+class SummaryCache:
+    """Thread-safe LRU of summaries keyed by input hash"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = int(max_entries or os.getenv("SUMMARY_CACHE_SIZE", "4096"))
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._entries.get(key)
+            if summary is not None:
+                self._entries.move_to_end(key)
+        record_cache("summary", hit=summary is not None)
+        return summary
+
+    def put(self, key: str, summary: str):
+        with self._lock:
+            self._entries[key] = summary
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class MapReduceSummarizer:
+    """Summarizes arbitrarily long conversations with a small seq2seq model"""
+
+    def __init__(self, inference: Optional[BatchedInference] = None, cache: Optional[SummaryCache] = None,
+                 max_levels: int = 4, max_length: int = 150, min_length: int = 30):
+        """
+        Args:
+            inference: Batched runner used for every summarization call
+            cache: Summary cache (shared across conversations)
+            max_levels: Reduce levels before the remaining summaries are just joined
+            max_length, min_length: Generation limits of each summary (tokens)
+        """
+        self.inference = inference or get_batched_inference()
+        self.cache = cache or SummaryCache()
+        self.max_levels = max_levels
+        self.max_length = max_length
+        self.min_length = min_length
+
+    def chunk_messages(self, messages: List[Dict], chunker: TokenChunker) -> List[str]:
+        """
+        Pack whole messages into chunks of at most ``chunker.max_tokens``
+
+        Messages longer than a chunk are split into token-aware pieces first.
+        Packing is greedy from the first message, so earlier chunks do not
+        change when messages are appended.
+        """
+        pieces: List[Tuple[str, int]] = []
+        for message in messages:
+            content = message.get("content", "").strip()
+            if not content:
+                continue
+            label = message.get("role", "").title()
+            text = f"{label}: {content}" if label and label != "Unknown" else content
+            tokens = chunker.count([text])[0]
+            pieces.extend([(text, tokens)] if tokens <= chunker.max_tokens else chunker.chunk(text))
+        return self._pack(pieces, chunker.max_tokens)
+
+    def _pack(self, pieces: List[Tuple[str, int]], max_tokens: int) -> List[str]:
+        chunks: List[str] = []
+        current: List[str] = []
+        used = 0
+        for text, tokens in pieces:
+            if current and used + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current, used = [], 0
+            current.append(text)
+            used += tokens
+        if current:
+            chunks.append("\n\n".join(current))
+        return chunks
+
+    def _key(self, pipe, text: str) -> str:
+        model = getattr(getattr(pipe, "model", None), "name_or_path", "") or type(pipe).__name__
+        digest = hashlib.sha256(f"{model}|{self.max_length}|{self.min_length}|".encode())
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def summarize_texts(self, pipe, texts: List[str], chunker: TokenChunker) -> Tuple[List[str], int]:
+        """Summaries of ``texts`` (cached ones reused, the rest in one batched run)"""
+        keys = [self._key(pipe, text) for text in texts]
+        summaries: List[Optional[str]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        if missing:
+            lengths = chunker.count([texts[i] for i in missing])
+            outputs = self.inference.run(
+                pipe, [texts[i] for i in missing], lengths, batch_size=self.inference.summary_batch_size,
+                max_length=self.max_length, min_length=self.min_length
+            )
+            for i, output in zip(missing, outputs):
+                summaries[i] = output["summary_text"].strip()
+                self.cache.put(keys[i], summaries[i])
+        return summaries, len(missing)
+
+    def summarize(self, pipe, messages: List[Dict]) -> Dict[str, Any]:
+        """
+        Summarize a conversation
+
+        Returns:
+            {"summary", "levels", "chunks", "computed", "cached"} - ``computed``
+            counts summaries generated by the model, ``cached`` those reused
+        """
+        chunker = TokenChunker.for_pipeline(pipe)
+        texts = self.chunk_messages(messages, chunker)
+        stats = {"summary": "", "levels": 0, "chunks": len(texts), "computed": 0, "cached": 0}
+        if not texts:
+            return stats
+
+        with time_stage("map_reduce_summarization"):
+            level = 0
+            while True:
+                summaries, computed = self.summarize_texts(pipe, texts, chunker)
+                stats["computed"] += computed
+                stats["cached"] += len(texts) - computed
+                level += 1
+                if len(summaries) == 1:
+                    break
+                if level >= self.max_levels:
+                    logger.warning("Summary still has %d parts after %d levels; joining", len(summaries), level)
+                    break
+                # Reduce: pack consecutive summaries into the next level's inputs
+                pieces = list(zip(summaries, chunker.count(summaries)))
+                texts = self._pack(pieces, chunker.max_tokens)
+
+        stats["summary"] = " ".join(summaries)
+        stats["levels"] = level
+        return stats
+
+
+# Global summarizer instance
+_map_reduce_summarizer = None
+
+
+def get_map_reduce_summarizer() -> MapReduceSummarizer:
+    """Get or create the global map-reduce summarizer"""
+    global _map_reduce_summarizer
+    if _map_reduce_summarizer is None:
+        _map_reduce_summarizer = MapReduceSummarizer()
+    return _map_reduce_summarizer
@@ -0,0 +1,178 @@
+"""
+Message segmentation for ConvoCanvas
+Splits a chat message into prose, code, table and quote spans in a single
+linear scan so NLP stages only see prose and code gets cheap dedicated handling
+"""
+import re
+from collections import Counter
+from typing import Dict, List
+
+_FENCE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*([\w+#.-]*)')
+# A fence only closes on a bare run of its own character, at least as long as the opener
+_FENCE_CLOSE_RE = re.compile(r'^\s*(`{3,}|~{3,})\s*$')
+_LOG_LINE_RE = re.compile(
+    r'^\s*(?:'
+    r'\[?\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}'              # ISO timestamps
+    r'|\[?\d{2}:\d{2}:\d{2}'                            # time-only prefixes
+    r'|\[?(?:TRACE|DEBUG|INFO|WARN|WARNING|ERROR|FATAL|CRITICAL)\]?[\s:]'
+    r'|Traceback \(most recent call last\)'
+    r'|File ".+", line \d+'
+    r'|at [\w$.<>]+\(.*\)'                              # JVM/JS stack frames
+    r')'
+)
+_TABLE_RE = re.compile(r'^\s*\|')
+_QUOTE_RE = re.compile(r'^\s*>')
+_IDENTIFIER_RE = re.compile(r'\b[A-Za-z_][A-Za-z0-9_]{2,}\b')
+_DEFINITION_RE = re.compile(
+    r'\b(?:def|class|function|func|fn|const|let|var|interface|struct|type)\s+([A-Za-z_$][\w$]*)'
+)
+
+# Cheap signature checks for untagged code blocks, in priority order
+_LANGUAGE_HINTS = [
+    ("python", re.compile(r'^\s*(?:def |class \w+[:(]|import \w|from \w+ import )|self\.', re.MULTILINE)),
+    ("javascript", re.compile(r'\b(?:const|let) \w+ =|=>|console\.log|function\s*\w*\(')),
+    ("bash", re.compile(r'^\s*(?:\$ |sudo |apt(?:-get)? |pip |npm |cd |export \w+=|#!/bin/)', re.MULTILINE)),
+    ("dockerfile", re.compile(r'^\s*(?:FROM|RUN|COPY|WORKDIR|CMD|ENTRYPOINT) ', re.MULTILINE)),
+    ("sql", re.compile(r'\b(?:SELECT .+ FROM|INSERT INTO|CREATE TABLE|UPDATE \w+ SET)\b', re.IGNORECASE)),
+    ("json", re.compile(r'^\s*[\[{]\s*"?[\w-]+"?\s*:', re.MULTILINE)),
+    ("yaml", re.compile(r'^[\w-]+:\s*(?:\S.*)?$', re.MULTILINE)),
+]
+
+_CODE_KEYWORDS = {
+    'def', 'class', 'return', 'import', 'from', 'self', 'None', 'True', 'False', 'function',
+    'const', 'let', 'var', 'this', 'new', 'for', 'while', 'and', 'not', 'else', 'elif',
+    'with', 'try', 'except', 'finally', 'async', 'await', 'echo', 'sudo', 'the',
+}
+
+
+class MessageSegmenter:
+    """Segments message text into typed spans (character offsets into the message)"""
+
+    def __init__(self, max_line_chars: int = 400, max_identifiers: int = 15):
+        """
+        Args:
+            max_line_chars: Lines longer than this with almost no whitespace count as data blobs
+            max_identifiers: Identifiers kept per code span
+        """
+        self.max_line_chars = max_line_chars
+        self.max_identifiers = max_identifiers
+
+    def segment(self, text: str) -> List[Dict]:
+        """
+        Split text into spans of type prose, code, table or quote
+
+        Each span is ``{"type", "start", "end", "lines"}`` plus ``language`` for
+        code. Consecutive lines of the same kind are merged into one span.
+        """
+        spans: List[Dict] = []
+        offset = 0
+        fence = None  # (marker, language, start offset, line count)
+
+        for line in text.splitlines(keepends=True):
+            line_start, offset = offset, offset + len(line)
+            stripped = line.rstrip('\r\n')
+
+            if fence is not None:
+                marker, language, start, lines = fence
+                if self._closes_fence(marker, stripped):
+                    spans.append({"type": "code", "start": start, "end": offset,
+                                  "lines": lines + 1, "language": language})
+                    fence = None
+                else:
+                    fence = (marker, language, start, lines + 1)
+                continue
+
+            fence_match = _FENCE_RE.match(stripped)
+            if fence_match:
+                fence = (fence_match.group(1), fence_match.group(2).lower() or None, line_start, 1)
+                continue
+
+            kind, language = self._classify_line(stripped)
+            previous = spans[-1] if spans else None
+            # Fenced blocks are closed spans; only unfenced dump lines keep growing
+            mergeable = (
+                previous is not None and previous["end"] == line_start and previous["type"] == kind
+                and (kind != "code" or previous.get("open_dump"))
+            )
+            if mergeable:
+                previous["end"] = offset
+                previous["lines"] += 1
+                continue
+
+            span = {"type": kind, "start": line_start, "end": offset, "lines": 1}
+            if kind == "code":
+                span["language"] = language
+                span["open_dump"] = True
+            spans.append(span)
+
+        # Unterminated fence runs to the end of the message
+        if fence is not None:
+            marker, language, start, lines = fence
+            spans.append({"type": "code", "start": start, "end": offset,
+                          "lines": lines, "language": language})
+
+        for span in spans:
+            span.pop("open_dump", None)
+            if span["type"] == "code" and not span.get("language"):
+                span["language"] = self.detect_language(text[span["start"]:span["end"]])
+        return spans
+
+    @staticmethod
+    def _closes_fence(marker: str, line: str) -> bool:
+        """True if ``line`` closes a block opened with ``marker`` (```python inside ``` does not)"""
+        match = _FENCE_CLOSE_RE.match(line)
+        return bool(match) and match.group(1)[0] == marker[0] and len(match.group(1)) >= len(marker)
+
+    def _classify_line(self, line: str):
+        """Kind of a single line outside a fenced block"""
+        if _TABLE_RE.match(line):
+            return "table", None
+        if _QUOTE_RE.match(line):
+            return "quote", None
+        if _LOG_LINE_RE.match(line):
+            return "code", "log"
+        if len(line) > self.max_line_chars:
+            whitespace = sum(1 for ch in line if ch.isspace())
+            if whitespace / len(line) < 0.05:
+                return "code", "data"
+        return "prose", None
+
+    def prose_text(self, text: str, spans: List[Dict], include=("prose",)) -> str:
+        """Concatenate the spans of the given types"""
+        return ''.join(text[span["start"]:span["end"]] for span in spans if span["type"] in include)
+
+    def detect_language(self, code: str) -> str:
+        """Best-effort language guess for an untagged code block"""
+        for language, hint in _LANGUAGE_HINTS:
+            if hint.search(code):
+                return language
+        return "text"
+
+    def describe_code(self, text: str, span: Dict) -> Dict:
+        """Language, size and identifiers of a code span"""
+        lines = text[span["start"]:span["end"]].splitlines()
+        # Drop the block's own fences; fence lines inside it (nested examples) are content
+        if lines and _FENCE_RE.match(lines[0]):
+            lines = lines[1:]
+        if lines and _FENCE_CLOSE_RE.match(lines[-1]):
+            lines = lines[:-1]
+        body = '\n'.join(lines)
+
+        definitions = list(dict.fromkeys(_DEFINITION_RE.findall(body)))
+        counts = Counter(
+            token for token in _IDENTIFIER_RE.findall(body)
+            if token not in _CODE_KEYWORDS and token not in definitions
+        )
+        identifiers = definitions + [token for token, _ in counts.most_common(self.max_identifiers)]
+
+        return {
+            "language": span.get("language") or "text",
+            "lines": span["lines"],
+            "definitions": definitions[:self.max_identifiers],
+            "identifiers": identifiers[:self.max_identifiers]
+        }
+
+
+def segment_message(text: str) -> List[Dict]:
+    """Convenience wrapper around MessageSegmenter.segment"""
+    return MessageSegmenter().segment(text)
@@ -0,0 +1,437 @@
+"""
+Metrics for ConvoCanvas
+Small dependency-free registry rendered in the Prometheus text exposition format.
+
+Multi-worker setups (uvicorn --workers N, gunicorn): set CONVOCANVAS_METRICS_DIR
+to a directory shared by all workers. Every process then persists its samples
+there and /metrics aggregates all of them, whichever worker serves the scrape.
+"""
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1024, 10240, 102400, 524288, 1048576, 5242880, 10485760, 52428800)
+
+
+class _Metric:
+    """Base class holding labelled samples"""
+
+    type = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._samples: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def snapshot(self) -> Dict:
+        """JSON-serializable state of this metric"""
+        with self._registry.lock:
+            samples = [
+                [list(key), {**value, "buckets": list(value["buckets"])} if isinstance(value, dict) else value]
+                for key, value in self._samples.items()
+            ]
+        return {"type": self.type, "help": self.documentation, "labels": list(self.labelnames), "samples": samples}
+
+
+class Counter(_Metric):
+    """Monotonically increasing value"""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+        self._registry.mark_dirty()
+
+
+class Gauge(_Metric):
+    """
+    Value that can go up and down
+
+    multiprocess_mode decides how workers are combined: "sum" adds them up,
+    "pid" keeps one series per live worker (adds a ``pid`` label).
+    """
+
+    type = "gauge"
+
+    def __init__(self, *args, multiprocess_mode: str = "sum", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.multiprocess_mode = multiprocess_mode
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._samples[key] = float(value)
+        self._registry.mark_dirty()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            self._samples[key] = self._samples.get(key, 0.0) + amount
+        self._registry.mark_dirty()
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def snapshot(self) -> Dict:
+        data = super().snapshot()
+        data["multiprocess_mode"] = self.multiprocess_mode
+        return data
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations"""
+
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._registry.lock:
+            sample = self._samples.get(key)
+            if sample is None:
+                sample = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._samples[key] = sample
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample["buckets"][i] += 1
+                    break
+            sample["sum"] += value
+            sample["count"] += 1
+        self._registry.mark_dirty()
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall-clock duration of a block"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> Dict:
+        data = super().snapshot()
+        data["buckets"] = list(self.buckets)
+        return data
+
+
+class MetricsRegistry:
+    """Holds the metrics of this process and renders the aggregated exposition"""
+
+    def __init__(self, multiprocess_dir: Optional[str] = None, flush_interval: float = 1.0):
+        self.lock = threading.RLock()
+        self.metrics: Dict[str, _Metric] = {}
+        self.multiprocess_dir = multiprocess_dir
+        self.flush_interval = flush_interval
+        self._dirty = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        self._flusher_pid: Optional[int] = None
+        self._flush_lock = threading.Lock()
+        self._silent_pid: Optional[int] = None
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Iterable[str], **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = cls(self, name, documentation, labelnames, **kwargs)
+                self.metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+              multiprocess_mode: str = "sum") -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames, multiprocess_mode=multiprocess_mode)
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def reset_after_fork(self):
+        """
+        Call in a freshly forked worker: drops the counters and histograms
+        inherited from the parent (the parent reports those itself) and replaces
+        locks a parent thread may have held at fork time. Gauges describe state
+        the child really inherited (loaded models, readiness) and are kept.
+        """
+        self.lock = threading.RLock()
+        self._dirty = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+        self._flush_lock = threading.Lock()
+        for metric in self.metrics.values():
+            if not isinstance(metric, Gauge):
+                metric._samples.clear()
+
+    # Multi-process persistence -------------------------------------------------
+
+    def stop_publishing(self):
+        """
+        Withdraw this process from the aggregated exposition (its file is
+        removed and never written again); processes forked from it still publish.
+        For a pre-fork master, whose preloaded models its workers already report.
+        """
+        with self._flush_lock:
+            self._silent_pid = os.getpid()
+            if self.multiprocess_dir:
+                try:
+                    os.remove(os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.json"))
+                except FileNotFoundError:
+                    pass
+
+    def mark_dirty(self):
+        """Schedule a flush of this worker's samples (no-op in single-process mode)"""
+        if not self.multiprocess_dir or self._silent_pid == os.getpid():
+            return
+        self._dirty.set()
+        if self._flusher is None or self._flusher_pid != os.getpid():
+            # (Re)start the flusher - threads don't survive fork
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            time.sleep(self.flush_interval)
+            self._dirty.clear()
+            try:
+                self.flush()
+            except OSError as e:
+                logger.warning(f"Metrics flush failed: {e}")
+
+    def _snapshot(self) -> Dict[str, Dict]:
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics}
+
+    def flush(self):
+        """Atomically write this process's samples to the shared directory"""
+        if not self.multiprocess_dir:
+            return
+        with self._flush_lock:
+            if self._silent_pid == os.getpid():
+                return
+            os.makedirs(self.multiprocess_dir, exist_ok=True)
+            path = os.path.join(self.multiprocess_dir, f"metrics_{os.getpid()}.json")
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._snapshot(), f)
+            os.replace(tmp_path, path)
+
+    def _collect(self) -> List[Tuple[int, Dict[str, Dict]]]:
+        """Snapshots of every worker (this process's is always fresh)"""
+        own_pid = os.getpid()
+        snapshots = [(own_pid, self._snapshot())]
+        if not self.multiprocess_dir or not os.path.isdir(self.multiprocess_dir):
+            return snapshots
+
+        for filename in os.listdir(self.multiprocess_dir):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                pid = int(filename[len("metrics_"):-len(".json")])
+            except ValueError:
+                continue
+            if pid == own_pid:
+                continue
+            try:
+                with open(os.path.join(self.multiprocess_dir, filename)) as f:
+                    snapshots.append((pid, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    # Exposition ----------------------------------------------------------------
+
+    def render(self) -> str:
+        """Prometheus text format (version 0.0.4) aggregated over all workers"""
+        merged: Dict[str, Dict] = {}
+        own_pid = os.getpid()
+        for pid, snapshot in self._collect():
+            # Counters and histograms of exited workers still count; their gauges
+            # (in-flight requests, resident models) describe state that is gone
+            alive = pid == own_pid or _pid_alive(pid)
+            for name, data in snapshot.items():
+                target = merged.setdefault(name, {**data, "samples": {}})
+                if data["type"] == "gauge" and not alive:
+                    continue
+                labels = list(data["labels"])
+                pid_mode = data["type"] == "gauge" and data.get("multiprocess_mode") == "pid"
+                if pid_mode:
+                    target["labels"] = labels + ["pid"]
+                for key, value in data["samples"]:
+                    key = tuple(key) + ((str(pid),) if pid_mode else ())
+                    target["samples"][key] = _merge_sample(target["samples"].get(key), value)
+
+        lines = []
+        for name in sorted(merged):
+            data = merged[name]
+            lines.append(f"# HELP {name} {data['help']}")
+            lines.append(f"# TYPE {name} {data['type']}")
+            for key, value in sorted(data["samples"].items()):
+                labels = dict(zip(data["labels"], key))
+                if data["type"] == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(data["buckets"], value["buckets"]):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {value['count']}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value['sum'])}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+                else:
+                    suffix = "_total" if data["type"] == "counter" and not name.endswith("_total") else ""
+                    lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _merge_sample(existing, value):
+    """Combine the same series from two workers"""
+    if existing is None:
+        return json.loads(json.dumps(value)) if isinstance(value, dict) else value
+    if isinstance(value, dict):
+        existing["buckets"] = [a + b for a, b in zip(existing["buckets"], value["buckets"])]
+        existing["sum"] += value["sum"]
+        existing["count"] += value["count"]
+        return existing
+    return existing + value
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str], **extra) -> str:
+    items = {**labels, **extra}
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(value)}"' for key, value in items.items()) + "}"
+
+
+def current_rss_bytes() -> int:
+    """Resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux) - best we can do elsewhere
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Global registry and the standard ConvoCanvas metrics
+metrics = MetricsRegistry(multiprocess_dir=os.getenv("CONVOCANVAS_METRICS_DIR") or None)
+atexit.register(metrics.flush)
+
+STAGE_DURATION = metrics.histogram(
+    "convocanvas_stage_duration_seconds", "Time spent in each analysis pipeline stage", ["stage"]
+)
+STAGE_RSS_DELTA = metrics.histogram(
+    "convocanvas_stage_rss_delta_bytes", "Resident memory growth during each pipeline stage", ["stage"],
+    buckets=SIZE_BUCKETS
+)
+REQUEST_DURATION = metrics.histogram(
+    "convocanvas_http_request_duration_seconds", "HTTP request latency", ["method", "endpoint", "status"]
+)
+REQUEST_SIZE = metrics.histogram(
+    "convocanvas_http_request_size_bytes", "HTTP request payload size", ["endpoint"], buckets=SIZE_BUCKETS
+)
+RESPONSE_SIZE = metrics.histogram(
+    "convocanvas_http_response_size_bytes", "HTTP response payload size", ["endpoint"], buckets=SIZE_BUCKETS
+)
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "convocanvas_http_requests_in_flight", "Requests currently being processed (queue depth)"
+)
+CACHE_REQUESTS = metrics.counter(
+    "convocanvas_cache_requests", "Cache lookups by cache and result (hit/miss)", ["cache", "result"]
+)
+MODEL_LOAD_DURATION = metrics.histogram(
+    "convocanvas_model_load_seconds", "Time spent loading NLP/ML models", ["model"]
+)
+
+
+# Per-thread stage recorders (see record_stages)
+_stage_recorders = threading.local()
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Record duration and RSS growth of a pipeline stage"""
+    rss_before = current_rss_bytes()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - start
+        rss_delta = current_rss_bytes() - rss_before
+        STAGE_DURATION.observe(duration, stage=stage)
+        STAGE_RSS_DELTA.observe(max(0, rss_delta), stage=stage)
+        for recorder in getattr(_stage_recorders, "active", ()):
+            recorder.append((stage, duration, rss_delta))
+
+
+@contextmanager
+def record_stages():
+    """
+    Collect (stage, seconds, rss delta) for every stage timed in this thread
+
+    Unlike the global histograms, concurrent requests in other threads do not
+    leak into the recording.
+    """
+    recorded: List[Tuple[str, float, int]] = []
+    active = getattr(_stage_recorders, "active", None)
+    if active is None:
+        active = _stage_recorders.active = []
+    active.append(recorded)
+    try:
+        yield recorded
+    finally:
+        active.pop()
+
+
+def record_cache(cache: str, hit: bool):
+    """Count a cache hit or miss"""
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def time_model_load(model: str):
+    """Record how long a model takes to load"""
+    with MODEL_LOAD_DURATION.time(model=model):
+        yield
@@ -0,0 +1,297 @@
+"""
+Bounded-memory model manager for ConvoCanvas
+Models are registered with a loader and only loaded on first use. The manager
+tracks the resident size of every loaded model and unloads the least recently
+used ones once the configured RAM or VRAM budget is exceeded. Works on CPU-only
+machines (torch is optional).
+"""
+import gc
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    TORCH_AVAILABLE = False
+
+from app.core.metrics import metrics, current_rss_bytes, time_model_load
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+MODEL_LOADS = metrics.counter(
+    "convocanvas_model_loads", "Models loaded by the model manager", ["model", "device"]
+)
+MODEL_EVICTIONS = metrics.counter(
+    "convocanvas_model_evictions", "Models unloaded by the model manager", ["model", "reason"]
+)
+MODEL_RESIDENT_BYTES = metrics.gauge(
+    "convocanvas_model_resident_bytes", "Estimated resident size of each loaded model", ["model", "device"]
+)
+
+
+class ModelLoadError(RuntimeError):
+    """A registered model could not be loaded"""
+
+
+class ModelSpec:
+    """A registered model: how to load it and what it is expected to cost"""
+
+    def __init__(self, name: str, loader: Callable[[int], Any], estimated_mb: int = 0, gpu: bool = True):
+        """
+        Args:
+            name: Model name used for lookups and metric labels
+            loader: Called with a transformers-style device (0 = first GPU, -1 = CPU)
+            estimated_mb: Expected size, used to make room before loading
+            gpu: Whether the model may be placed on the GPU
+        """
+        self.name = name
+        self.loader = loader
+        self.estimated_mb = estimated_mb
+        self.gpu = gpu
+        self.error: Optional[str] = None
+
+
+class LoadedModel:
+    def __init__(self, model: Any, device: str, resident_bytes: int, load_seconds: float):
+        self.model = model
+        self.device = device
+        self.resident_bytes = resident_bytes
+        self.load_seconds = load_seconds
+        self.last_used = time.time()
+        self.uses = 0
+
+
+def _parameter_bytes(model: Any) -> int:
+    """Size of the weights of a torch module (or of a pipeline's ``.model``)"""
+    module = getattr(model, "model", model)
+    if not TORCH_AVAILABLE or not hasattr(module, "parameters"):
+        return 0
+    try:
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    except Exception:
+        return 0
+
+
+class ModelManager:
+    """Lazy loading with LRU unloading under RAM/VRAM budgets"""
+
+    def __init__(self, ram_budget_mb: Optional[int] = None, vram_budget_mb: Optional[int] = None,
+                 device: Optional[str] = None):
+        """
+        Args:
+            ram_budget_mb: Total size of CPU models before unloading (0 = unbounded)
+            vram_budget_mb: Total size of GPU models before unloading (0 = unbounded)
+            device: "auto", "cpu" or "cuda"
+        """
+        self.ram_budget = int(ram_budget_mb if ram_budget_mb is not None else os.getenv("MODEL_RAM_BUDGET_MB", "2048")) * MB
+        self.vram_budget = int(vram_budget_mb if vram_budget_mb is not None else os.getenv("MODEL_VRAM_BUDGET_MB", "1600")) * MB
+        self.device = (device or os.getenv("MODEL_DEVICE", "auto")).lower()
+        self.gpu_available = (self.device != "cpu" and TORCH_AVAILABLE and torch.cuda.is_available())
+
+        self._specs: Dict[str, ModelSpec] = {}
+        self._loaded: "OrderedDict[str, LoadedModel]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Loads are serialized so concurrent first uses cannot overshoot the budget
+        self._load_lock = threading.Lock()
+
+    # Registry -------------------------------------------------------------------
+
+    def register(self, name: str, loader: Callable[[int], Any], estimated_mb: int = 0, gpu: bool = True):
+        """Register a model; nothing is loaded until ``get(name)``"""
+        self._specs[name] = ModelSpec(name, loader, estimated_mb, gpu)
+
+    def available(self, name: str) -> bool:
+        """Registered and not known to fail loading"""
+        spec = self._specs.get(name)
+        return spec is not None and spec.error is None
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._loaded
+
+    def loaded_models(self) -> List[str]:
+        """Loaded model names, least recently used first"""
+        with self._lock:
+            return list(self._loaded)
+
+    # Loading ----------------------------------------------------------------------
+
+    def get(self, name: str) -> Any:
+        """Return a model, loading it (and unloading others) if needed"""
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                return self._touch(name, entry)
+
+        spec = self._specs.get(name)
+        if spec is None:
+            raise KeyError(f"Unknown model: {name}")
+        if spec.error is not None:
+            raise ModelLoadError(f"{name} failed to load: {spec.error}")
+
+        with self._load_lock:
+            with self._lock:
+                entry = self._loaded.get(name)
+                if entry is not None:
+                    return self._touch(name, entry)
+            entry = self._load(spec)
+            with self._lock:
+                self._loaded[name] = entry
+                self._touch(name, entry)
+                self._enforce_budget(entry.device, keep=name)
+        return entry.model
+
+    def _touch(self, name: str, entry: LoadedModel) -> Any:
+        self._loaded.move_to_end(name)
+        entry.last_used = time.time()
+        entry.uses += 1
+        return entry.model
+
+    def _pick_device(self, spec: ModelSpec) -> str:
+        if not (spec.gpu and self.gpu_available):
+            return "cpu"
+        needed = spec.estimated_mb * MB
+        with self._lock:
+            self._make_room("cuda", needed)
+        if self.vram_budget and needed > self.vram_budget:
+            return "cpu"
+        free, _ = torch.cuda.mem_get_info(0)
+        # Keep a safety margin for other GPU users (e.g. LM Studio)
+        return "cuda" if needed <= free * 0.85 else "cpu"
+
+    def _load(self, spec: ModelSpec) -> LoadedModel:
+        device = self._pick_device(spec)
+        if device == "cpu":
+            with self._lock:
+                self._make_room("cpu", spec.estimated_mb * MB)
+
+        rss_before = current_rss_bytes()
+        vram_before = torch.cuda.memory_allocated(0) if device == "cuda" else 0
+        start = time.perf_counter()
+        logger.info("Loading model %s on %s", spec.name, device)
+        try:
+            with time_model_load(spec.name):
+                model = spec.loader(0 if device == "cuda" else -1)
+        except Exception as e:
+            spec.error = str(e)
+            logger.error("Model %s failed to load: %s", spec.name, e)
+            raise ModelLoadError(f"{spec.name} failed to load: {e}") from e
+        load_seconds = time.perf_counter() - start
+
+        if device == "cuda":
+            resident = torch.cuda.memory_allocated(0) - vram_before
+        else:
+            resident = current_rss_bytes() - rss_before
+        # RSS deltas are noisy (allocator reuse, lazy pages); prefer the weight size when known
+        resident = _parameter_bytes(model) or max(resident, spec.estimated_mb * MB, 0)
+
+        MODEL_LOADS.inc(model=spec.name, device=device)
+        MODEL_RESIDENT_BYTES.set(resident, model=spec.name, device=device)
+        logger.info("Loaded %s on %s in %.1fs (%.0fMB)", spec.name, device, load_seconds, resident / MB)
+        return LoadedModel(model, device, resident, load_seconds)
+
+    # Unloading ----------------------------------------------------------------------
+
+    def _resident(self, device: str) -> int:
+        return sum(entry.resident_bytes for entry in self._loaded.values() if entry.device == device)
+
+    def _budget(self, device: str) -> int:
+        return self.vram_budget if device == "cuda" else self.ram_budget
+
+    def _make_room(self, device: str, needed: int):
+        """Unload LRU models on ``device`` until ``needed`` more bytes fit the budget"""
+        budget = self._budget(device)
+        if not budget:
+            return
+        for name in [n for n, entry in self._loaded.items() if entry.device == device]:
+            if self._resident(device) + needed <= budget:
+                break
+            self._unload(name, "budget")
+
+    def _enforce_budget(self, device: str, keep: str):
+        budget = self._budget(device)
+        if not budget:
+            return
+        for name in [n for n, entry in self._loaded.items() if entry.device == device and n != keep]:
+            if self._resident(device) <= budget:
+                break
+            self._unload(name, "budget")
+        if self._resident(device) > budget:
+            logger.warning("Model %s alone exceeds the %s budget (%.0fMB > %.0fMB)",
+                           keep, device, self._resident(device) / MB, budget / MB)
+
+    def _unload(self, name: str, reason: str):
+        entry = self._loaded.pop(name)
+        MODEL_EVICTIONS.inc(model=name, reason=reason)
+        MODEL_RESIDENT_BYTES.set(0, model=name, device=entry.device)
+        logger.info("Unloaded model %s from %s (%s, %.0fMB)", name, entry.device, reason, entry.resident_bytes / MB)
+        # Callers still holding the model keep it alive until they finish
+        del entry
+        gc.collect()
+        if TORCH_AVAILABLE and torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def unload(self, name: str) -> bool:
+        """Unload a model now; returns False if it was not loaded"""
+        with self._lock:
+            if name not in self._loaded:
+                return False
+            self._unload(name, "manual")
+            return True
+
+    def unload_all(self):
+        with self._lock:
+            for name in list(self._loaded):
+                self._unload(name, "manual")
+
+    def reset(self, name: str):
+        """Forget a previous load failure so the model is retried on next use"""
+        if name in self._specs:
+            self._specs[name].error = None
+
+    # Status ----------------------------------------------------------------------------
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = {
+                name: {
+                    "device": entry.device,
+                    "resident_mb": round(entry.resident_bytes / MB, 1),
+                    "load_seconds": round(entry.load_seconds, 3),
+                    "uses": entry.uses,
+                    "last_used": entry.last_used,
+                }
+                for name, entry in self._loaded.items()
+            }
+            return {
+                "gpu_available": self.gpu_available,
+                "ram_budget_mb": self.ram_budget // MB,
+                "vram_budget_mb": self.vram_budget // MB,
+                "ram_resident_mb": round(self._resident("cpu") / MB, 1),
+                "vram_resident_mb": round(self._resident("cuda") / MB, 1),
+                "registered": {
+                    name: {"estimated_mb": spec.estimated_mb, "loaded": name in self._loaded, "error": spec.error}
+                    for name, spec in self._specs.items()
+                },
+                "loaded": loaded,
+            }
+
+
+# Global model manager instance
+_model_manager = None
+
+
+def get_model_manager() -> ModelManager:
+    """Get or create the global model manager"""
+    global _model_manager
+    if _model_manager is None:
+        _model_manager = ModelManager()
+    return _model_manager
@@ -0,0 +1,332 @@
+"""
+Offline NLP resources for ConvoCanvas
+Resolves the spaCy model and NLTK corpora from a local bundle directory
+(NLP_RESOURCE_DIR) instead of the network. The bundle carries a manifest with
+a checksum per resource; it is verified once per process, the resolved paths
+are cached, and a missing or corrupt resource fails with a diagnostic naming
+the resource, the expected location and how to rebuild the bundle.
+
+    python -m app.core.nlp_resources bake /app/nlp_resources    # at image build time (network)
+    python -m app.core.nlp_resources verify /app/nlp_resources  # offline check
+
+Without NLP_RESOURCE_DIR, resources resolve from the installed packages
+(``spacy download`` / ``nltk.download``), as in development.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import logging
+import argparse
+import tempfile
+import threading
+from typing import Dict, List, Optional
+
+from app.core.lazy_imports import lazy_import
+
+spacy = lazy_import("spacy")
+nltk = lazy_import("nltk")
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+SPACY_MODEL = "en_core_web_sm"
+
+# NLTK package -> resource path; nltk>=3.9 tokenizers load punkt_tab instead of the pickled punkt
+NLTK_RESOURCES = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "stopwords": "corpora/stopwords",
+}
+
+
+class NLPResourceError(RuntimeError):
+    """Raised when an NLP resource is missing, corrupt or cannot be loaded"""
+
+    def __init__(self, problems: List[str], hint: Optional[str] = None):
+        self.problems = problems
+        self.hint = hint
+        message = "NLP resources unavailable:\n" + "\n".join(f"  - {problem}" for problem in problems)
+        if hint:
+            message += f"\n{hint}"
+        super().__init__(message)
+
+
+def tree_checksum(path: str) -> str:
+    """sha256 over the relative paths and contents of every file below ``path``"""
+    digest = hashlib.sha256()
+    files = []
+    for root, dirs, names in os.walk(path):
+        dirs.sort()
+        files.extend(os.path.join(root, name) for name in names)
+    for file_path in sorted(files):
+        digest.update(os.path.relpath(file_path, path).replace(os.sep, "/").encode())
+        digest.update(b"\0")
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _bake_hint(bundle_dir: str) -> str:
+    return f"Rebuild the bundle with: python -m app.core.nlp_resources bake {bundle_dir}"
+
+
+class NLPResourceManager:
+    """Resolves, verifies and caches the locations of the NLP resources"""
+
+    def __init__(self, bundle_dir: Optional[str] = None, verify: Optional[bool] = None):
+        """
+        Args:
+            bundle_dir: Baked resource bundle (NLP_RESOURCE_DIR); None uses the installed packages
+            verify: Check the manifest checksums when resolving (NLP_RESOURCE_VERIFY)
+        """
+        self.bundle_dir = bundle_dir if bundle_dir is not None else (os.getenv("NLP_RESOURCE_DIR") or None)
+        self.verify_checksums = verify if verify is not None else \
+            os.getenv("NLP_RESOURCE_VERIFY", "true").lower() == "true"
+        self._paths: Optional[Dict[str, str]] = None
+        self._verified_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _read_manifest(self) -> Dict:
+        manifest_path = os.path.join(self.bundle_dir, MANIFEST_NAME)
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise NLPResourceError([f"no manifest at {manifest_path}"], _bake_hint(self.bundle_dir))
+        except (OSError, ValueError) as e:
+            raise NLPResourceError([f"unreadable manifest {manifest_path}: {e}"], _bake_hint(self.bundle_dir))
+        if manifest.get("version") != MANIFEST_VERSION:
+            raise NLPResourceError(
+                [f"manifest version {manifest.get('version')!r} (expected {MANIFEST_VERSION})"],
+                _bake_hint(self.bundle_dir)
+            )
+        return manifest
+
+    def _resolve_bundle(self) -> Dict[str, str]:
+        resources = self._read_manifest().get("resources", {})
+        required = [f"spacy:{SPACY_MODEL}"] + [f"nltk:{package}" for package in NLTK_RESOURCES]
+        paths, problems = {}, []
+        for name in required:
+            entry = resources.get(name)
+            if entry is None:
+                problems.append(f"{name}: not listed in the manifest")
+                continue
+            path = os.path.join(self.bundle_dir, entry["path"])
+            if not os.path.isdir(path):
+                problems.append(f"{name}: missing directory {path}")
+                continue
+            if self.verify_checksums:
+                actual = tree_checksum(path)
+                if actual != entry["sha256"]:
+                    problems.append(f"{name}: checksum mismatch in {path} "
+                                    f"(expected {entry['sha256'][:12]}, found {actual[:12]})")
+                    continue
+            paths[name] = path
+        if problems:
+            raise NLPResourceError(problems, _bake_hint(self.bundle_dir))
+        paths["nltk_data"] = os.path.join(self.bundle_dir, "nltk_data")
+        return paths
+
+    def _resolve_installed(self) -> Dict[str, str]:
+        problems = []
+        paths = {}
+        try:
+            paths[f"spacy:{SPACY_MODEL}"] = str(spacy.util.get_package_path(SPACY_MODEL))
+        except Exception:
+            problems.append(f"spacy:{SPACY_MODEL}: not installed")
+        for package, resource in NLTK_RESOURCES.items():
+            try:
+                paths[f"nltk:{package}"] = str(nltk.data.find(resource))
+            except LookupError:
+                problems.append(f"nltk:{package}: {resource} not found in {nltk.data.path}")
+        if problems:
+            raise NLPResourceError(
+                problems,
+                f"Install them with: python -m spacy download {SPACY_MODEL} && "
+                f"python -m nltk.downloader {' '.join(NLTK_RESOURCES)}, "
+                "or point NLP_RESOURCE_DIR at a baked bundle"
+            )
+        return paths
+
+    def resolve(self) -> Dict[str, str]:
+        """Resource name -> path, verified on the first call and cached afterwards"""
+        if self._paths is None:
+            with self._lock:
+                if self._paths is None:
+                    start = time.perf_counter()
+                    paths = self._resolve_bundle() if self.bundle_dir else self._resolve_installed()
+                    self._verified_seconds = time.perf_counter() - start
+                    if self.bundle_dir:
+                        # NLTK looks here before its default locations
+                        if paths["nltk_data"] not in nltk.data.path:
+                            nltk.data.path.insert(0, paths["nltk_data"])
+                        logger.info("NLP resources verified from %s in %.2fs", self.bundle_dir,
+                                    self._verified_seconds)
+                    self._paths = paths
+        return self._paths
+
+    def spacy_model_path(self) -> str:
+        """Bundle path of the spaCy model, or the package name when using the installed model"""
+        if not self.bundle_dir:
+            return SPACY_MODEL
+        return self.resolve()[f"spacy:{SPACY_MODEL}"]
+
+    def load_spacy(self, **kwargs):
+        """Load the spaCy model from its resolved location"""
+        path = self.spacy_model_path()
+        try:
+            return spacy.load(path, **kwargs)
+        except OSError as e:
+            hint = None if self.bundle_dir else \
+                f"Install it with: python -m spacy download {SPACY_MODEL}, or point NLP_RESOURCE_DIR at a baked bundle"
+            raise NLPResourceError([f"spacy:{SPACY_MODEL}: failed to load from {path}: {e}"], hint)
+
+    def nltk_missing(self) -> List[str]:
+        """NLTK resources that cannot be found (after adding the bundle to the search path)"""
+        if self.bundle_dir:
+            try:
+                self.resolve()
+            except NLPResourceError as e:
+                logger.error("%s", e)
+        missing = []
+        for resource in NLTK_RESOURCES.values():
+            try:
+                nltk.data.find(resource)
+            except LookupError:
+                missing.append(resource)
+        return missing
+
+    def status(self) -> Dict:
+        try:
+            paths = self.resolve()
+            error = None
+        except NLPResourceError as e:
+            paths, error = {}, e.problems
+        return {
+            "source": "bundle" if self.bundle_dir else "installed",
+            "bundle_dir": self.bundle_dir,
+            "verified": self._paths is not None,
+            "verify_seconds": self._verified_seconds,
+            "resources": paths,
+            "errors": error,
+        }
+
+    def reset(self):
+        """Forget the resolved paths (verification runs again on the next resolve)"""
+        with self._lock:
+            self._paths = None
+            self._verified_seconds = None
+
+
+def bake(output_dir: str, download: bool = True) -> Dict:
+    """
+    Build a resource bundle in ``output_dir`` and write its manifest
+
+    The spaCy model is taken from the installed package (downloaded first when
+    missing and ``download`` is set); NLTK packages are downloaded into the bundle.
+    """
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    resources = {}
+
+    nltk_dir = os.path.join(output_dir, "nltk_data")
+    for package, resource in NLTK_RESOURCES.items():
+        target = os.path.join(nltk_dir, resource)
+        if not os.path.isdir(target):
+            try:
+                source = str(nltk.data.find(resource))
+            except LookupError:
+                if not download or not nltk.download(package, download_dir=nltk_dir, quiet=True):
+                    raise NLPResourceError([f"nltk:{package}: not installed and could not be downloaded"])
+            else:
+                shutil.copytree(source, target)
+        # Zip archives are only needed for download bookkeeping
+        archive = target + ".zip"
+        if os.path.exists(archive):
+            os.remove(archive)
+        resources[f"nltk:{package}"] = {"path": os.path.relpath(target, output_dir).replace(os.sep, "/")}
+
+    if not spacy.util.is_package(SPACY_MODEL):
+        if not download:
+            raise NLPResourceError([f"spacy:{SPACY_MODEL}: not installed"])
+        from spacy.cli import download as spacy_download
+        spacy_download(SPACY_MODEL)
+    nlp = spacy.load(SPACY_MODEL)
+    spacy_path = os.path.join(output_dir, "spacy", SPACY_MODEL)
+    # Written next to the final location, then swapped in, so a failed bake never leaves half a model
+    staging = tempfile.mkdtemp(dir=output_dir, prefix=".spacy-")
+    try:
+        nlp.to_disk(staging)
+        if os.path.isdir(spacy_path):
+            shutil.rmtree(spacy_path)
+        os.makedirs(os.path.dirname(spacy_path), exist_ok=True)
+        os.replace(staging, spacy_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    resources[f"spacy:{SPACY_MODEL}"] = {
+        "path": f"spacy/{SPACY_MODEL}",
+        "version": nlp.meta.get("version"),
+        "spacy_version": spacy.about.__version__,
+    }
+
+    for name, entry in resources.items():
+        entry["sha256"] = tree_checksum(os.path.join(output_dir, entry["path"]))
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "resources": resources,
+    }
+    with open(os.path.join(output_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# Global resource manager
+_nlp_resources = None
+
+
+def get_nlp_resources() -> NLPResourceManager:
+    """Get or create the global NLP resource manager"""
+    global _nlp_resources
+    if _nlp_resources is None:
+        _nlp_resources = NLPResourceManager()
+    return _nlp_resources
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bake or verify the offline NLP resource bundle")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bake_parser = commands.add_parser("bake", help="Build the bundle (downloads what is not installed)")
+    bake_parser.add_argument("directory", nargs="?", default=os.getenv("NLP_RESOURCE_DIR"))
+    bake_parser.add_argument("--no-download", action="store_true", help="Only use already installed resources")
+    verify_parser = commands.add_parser("verify", help="Check the bundle against its manifest")
+    verify_parser.add_argument("directory", nargs="?", default=os.getenv("NLP_RESOURCE_DIR"))
+    args = parser.parse_args(argv)
+
+    if not args.directory:
+        parser.error("no bundle directory given and NLP_RESOURCE_DIR is not set")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        if args.command == "bake":
+            manifest = bake(args.directory, download=not args.no_download)
+            for name, entry in sorted(manifest["resources"].items()):
+                print(f"{name:28} {entry['sha256'][:12]}  {entry['path']}")
+            print(f"Bundle written to {args.directory}")
+        # A bake is always verified, so a broken bundle never reaches an image layer
+        paths = NLPResourceManager(args.directory, verify=True).resolve()
+        print(f"Verified {len(paths) - 1} resources in {args.directory}")
+    except NLPResourceError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
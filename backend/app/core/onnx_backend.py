@@ -0,0 +1,170 @@
+"""
+ONNX Runtime inference backend for ConvoCanvas
+Exports the transformer models to ONNX once (via optimum), applies int8
+dynamic quantization and serves them through ONNX Runtime on CPU. The returned
+objects are regular transformers pipelines, so the model manager and batched
+inference use them exactly like the PyTorch ones.
+
+Enabled with ENABLE_ONNX_INFERENCE=true; needs ``optimum[onnxruntime]``.
+"""
+import os
+import shutil
+import logging
+import platform
+import threading
+from typing import Dict, List, Optional
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTModelForSequenceClassification, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    ONNX_AVAILABLE = True
+except ImportError:
+    ONNX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Files optimum writes for each task
+TASK_FILES = {
+    "sentiment-analysis": ["model.onnx"],
+    "summarization": ["encoder_model.onnx", "decoder_model.onnx", "decoder_with_past_model.onnx"],
+}
+
+
+def _quantized_name(file_name: str) -> str:
+    return file_name.replace(".onnx", "_quantized.onnx")
+
+
+def _quantization_config():
+    """Dynamic int8 config for the instruction set of this CPU"""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    if "avx512f" in flags:
+        return AutoQuantizationConfig.avx512(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+
+class OnnxModelStore:
+    """Exported/quantized models on disk and ONNX Runtime session settings"""
+
+    def __init__(self, model_dir: Optional[str] = None, intra_op_threads: Optional[int] = None,
+                 quantize: Optional[bool] = None):
+        """
+        Args:
+            model_dir: Where exported models are kept (ONNX_MODEL_DIR)
+            intra_op_threads: Threads per ONNX Runtime session, 0 = one per core (ONNX_INTRA_OP_THREADS)
+            quantize: Use int8 dynamically quantized weights (ONNX_QUANTIZE)
+        """
+        self.model_dir = model_dir or os.getenv(
+            "ONNX_MODEL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "convocanvas", "onnx")
+        )
+        self.intra_op_threads = int(intra_op_threads if intra_op_threads is not None
+                                    else os.getenv("ONNX_INTRA_OP_THREADS", "0"))
+        self.quantize = quantize if quantize is not None else os.getenv("ONNX_QUANTIZE", "true").lower() == "true"
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, model_id: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(model_id, threading.Lock())
+
+    def path(self, model_id: str, variant: str) -> str:
+        return os.path.join(self.model_dir, model_id.replace("/", "__"), variant)
+
+    def session_options(self):
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = self.intra_op_threads
+        # Requests are already parallel across workers; one inter-op thread avoids oversubscription
+        options.inter_op_num_threads = 1
+        return options
+
+    def _model_class(self, task: str):
+        return ORTModelForSeq2SeqLM if task == "summarization" else ORTModelForSequenceClassification
+
+    def export(self, model_id: str, task: str) -> str:
+        """Export ``model_id`` to ONNX (once) and return the fp32 directory"""
+        target = self.path(model_id, "fp32")
+        if os.path.exists(os.path.join(target, TASK_FILES[task][0])):
+            return target
+        from transformers import AutoTokenizer
+
+        logger.info("Exporting %s to ONNX in %s", model_id, target)
+        model = self._model_class(task).from_pretrained(model_id, export=True)
+        model.save_pretrained(target)
+        AutoTokenizer.from_pretrained(model_id).save_pretrained(target)
+        return target
+
+    def quantize_model(self, model_id: str, task: str) -> str:
+        """Int8 dynamic quantization of the exported model; returns the int8 directory"""
+        source = self.export(model_id, task)
+        target = self.path(model_id, "int8")
+        files = [name for name in TASK_FILES[task] if os.path.exists(os.path.join(source, name))]
+        if all(os.path.exists(os.path.join(target, _quantized_name(name))) for name in files):
+            return target
+
+        logger.info("Quantizing %s (int8 dynamic) into %s", model_id, target)
+        config = _quantization_config()
+        for name in files:
+            ORTQuantizer.from_pretrained(source, file_name=name).quantize(save_dir=target, quantization_config=config)
+        # Configs, tokenizer and generation settings travel with the weights
+        for name in os.listdir(source):
+            if not name.endswith((".onnx", ".onnx_data")) and not os.path.exists(os.path.join(target, name)):
+                shutil.copy(os.path.join(source, name), target)
+        return target
+
+    def load(self, model_id: str, task: str):
+        """A CPU ONNX Runtime model (quantized unless disabled), exporting on first use"""
+        with self._lock(model_id):
+            directory = self.quantize_model(model_id, task) if self.quantize else self.export(model_id, task)
+        names = TASK_FILES[task]
+        if self.quantize:
+            names = [_quantized_name(name) for name in names]
+        options = {"session_options": self.session_options(), "provider": "CPUExecutionProvider"}
+        if task == "summarization":
+            options.update(encoder_file_name=names[0], decoder_file_name=names[1])
+            if os.path.exists(os.path.join(directory, names[2])):
+                options["decoder_with_past_file_name"] = names[2]
+        else:
+            options["file_name"] = names[0]
+        return self._model_class(task).from_pretrained(directory, **options), directory
+
+    def pipeline(self, task: str, model_id: str):
+        """transformers pipeline running ``model_id`` on ONNX Runtime"""
+        if not ONNX_AVAILABLE:
+            raise RuntimeError("ONNX inference needs optimum[onnxruntime]")
+        from transformers import AutoTokenizer, pipeline
+
+        model, directory = self.load(model_id, task)
+        return pipeline(task, model=model, tokenizer=AutoTokenizer.from_pretrained(directory))
+
+    def status(self) -> Dict[str, object]:
+        exported: List[str] = []
+        if os.path.isdir(self.model_dir):
+            exported = sorted(name.replace("__", "/") for name in os.listdir(self.model_dir))
+        return {
+            "available": ONNX_AVAILABLE,
+            "model_dir": self.model_dir,
+            "intra_op_threads": self.intra_op_threads,
+            "quantize": self.quantize,
+            "exported_models": exported,
+        }
+
+
+# Global ONNX model store
+_onnx_store = None
+
+
+def get_onnx_store() -> OnnxModelStore:
+    """Get or create the global ONNX model store"""
+    global _onnx_store
+    if _onnx_store is None:
+        _onnx_store = OnnxModelStore()
+    return _onnx_store
@@ -0,0 +1,274 @@
+"""
+Analysis benchmarking service for ConvoCanvas
+Times analysis variants on one conversation the way a benchmark harness would:
+analyzers and models are set up outside the timed region, warm-up runs are
+discarded, and N repetitions are reported as min/median/p95 with a per-stage
+breakdown and memory deltas. Variants that need missing dependencies (torch,
+optimum) or hardware are reported as skipped, so it runs on CPU-only machines.
+"""
+import gc
+import time
+import logging
+import statistics
+import importlib.util
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    TORCH_AVAILABLE = False
+
+from app.core.metrics import current_rss_bytes, record_stages
+
+logger = logging.getLogger(__name__)
+
+MAX_REPETITIONS = 50
+MAX_WARMUP = 10
+FULL_OUTPUTS = ["sentiment", "entities", "decision_details", "mindmap", "topics"]
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": _percentile(ordered, 0.95),
+        "max": ordered[-1],
+    }
+
+
+def _missing(*modules: str) -> Optional[str]:
+    for module in modules:
+        if importlib.util.find_spec(module.split(".")[0]) is None:
+            return f"{module} is not installed"
+    return None
+
+
+class BenchmarkVariant:
+    """A named way of analyzing a conversation"""
+
+    def __init__(self, name: str, description: str, setup: Callable[[str], Callable[[], Any]],
+                 unavailable: Callable[[], Optional[str]] = lambda: None):
+        """
+        Args:
+            setup: Receives the conversation text, returns the callable to time (untimed)
+            unavailable: Returns why the variant cannot run here, or None
+        """
+        self.name = name
+        self.description = description
+        self.setup = setup
+        self.unavailable = unavailable
+
+
+def _pipeline():
+    from app.core.analysis_pipeline import get_analysis_pipeline
+    return get_analysis_pipeline()
+
+
+def _pipeline_setup(outputs: List[str]):
+    def setup(text):
+        pipeline = _pipeline()
+        # A fresh context per call, so no stage result is reused between runs
+        return lambda: pipeline.run(text, outputs)
+    return setup
+
+
+_benchmark_models = None
+
+
+def _benchmark_model_manager():
+    """Models loaded only for benchmarks, kept apart from the serving ModelManager
+
+    Registering them in the global manager would let a benchmark evict the live
+    sentiment/summarizer models under the RAM budget.
+    """
+    global _benchmark_models
+    if _benchmark_models is None:
+        from app.core.model_manager import ModelManager
+        _benchmark_models = ModelManager()
+    return _benchmark_models
+
+
+def _transformer_sentiment_setup(backend: str):
+    def setup(text):
+        from app.core.batched_inference import get_batched_inference
+        model_name = "distilbert-base-uncased-finetuned-sst-2-english"
+        manager = _benchmark_model_manager()
+        key = f"benchmark-sentiment:{backend}"
+        if not manager.available(key):
+            if backend == "onnx":
+                from app.core.onnx_backend import get_onnx_store
+                manager.register(key, lambda device: get_onnx_store().pipeline("sentiment-analysis", model_name),
+                                 estimated_mb=100, gpu=False)
+            else:
+                from transformers import pipeline
+                manager.register(key, lambda device: pipeline("sentiment-analysis", model=model_name, device=device),
+                                 estimated_mb=300)
+        # Loaded here so model loading stays out of the timed runs
+        manager.get(key)
+        messages = _pipeline().run(text, ["parse"]).messages
+        inference = get_batched_inference()
+        return lambda: inference.sentiment_by_message(manager.get(key), messages)
+    return setup
+
+
+def _hybrid_setup(text):
+    from app.core.gpu_analyzer_integration import GPUEnhancedContentAnalyzer
+    analyzer = GPUEnhancedContentAnalyzer()
+    return lambda: analyzer.extract_decisions(analyzer.extract_user_claude_dialogue(text))
+
+
+def _spacy_unavailable() -> Optional[str]:
+    analyzer = _pipeline().analyzer
+    if analyzer.nlp is not None or analyzer.inference_client is not None:
+        return None
+    return "spaCy model en_core_web_sm is not installed"
+
+
+def _onnx_unavailable() -> Optional[str]:
+    from app.core.onnx_backend import ONNX_AVAILABLE
+    return None if ONNX_AVAILABLE else "optimum[onnxruntime] is not installed"
+
+
+VARIANTS: Dict[str, BenchmarkVariant] = {
+    variant.name: variant for variant in [
+        BenchmarkVariant("cpu_pipeline", "Full CPU analysis pipeline (v2 analyze-enhanced)",
+                         _pipeline_setup(FULL_OUTPUTS)),
+        BenchmarkVariant("spacy_only", "Parse, segment and spaCy entities only",
+                         _pipeline_setup(["entities"]), _spacy_unavailable),
+        BenchmarkVariant("sentiment_textblob", "TextBlob sentiment per message",
+                         _pipeline_setup(["sentiment"])),
+        BenchmarkVariant("sentiment_torch", "Batched distilbert sentiment, PyTorch",
+                         _transformer_sentiment_setup("torch"), lambda: _missing("torch", "transformers")),
+        BenchmarkVariant("sentiment_onnx", "Batched distilbert sentiment, ONNX Runtime int8",
+                         _transformer_sentiment_setup("onnx"), _onnx_unavailable),
+        BenchmarkVariant("hybrid_gpu_cpu", "v3 GPU-enhanced dialogue and decision extraction",
+                         _hybrid_setup, lambda: _missing("torch")),
+    ]
+}
+
+
+class PerformanceBenchmark:
+    """Warm-up, repetition and reporting around benchmark variants"""
+
+    def __init__(self, variants: Optional[Dict[str, BenchmarkVariant]] = None):
+        self.variants = variants or VARIANTS
+
+    def _gpu_memory(self) -> Optional[int]:
+        if TORCH_AVAILABLE and torch.cuda.is_available():
+            return torch.cuda.memory_allocated(0)
+        return None
+
+    def run_variant(self, variant: BenchmarkVariant, text: str, warmup: int, repetitions: int) -> Dict[str, Any]:
+        """Benchmark a single variant; never raises"""
+        reason = variant.unavailable()
+        if reason:
+            return {"description": variant.description, "skipped": reason}
+
+        try:
+            gc.collect()
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            func = variant.setup(text)
+            setup_seconds = time.perf_counter() - start
+            setup_rss = current_rss_bytes() - rss_before
+
+            for _ in range(warmup):
+                func()
+
+            durations: List[float] = []
+            rss_deltas: List[int] = []
+            gpu_deltas: List[int] = []
+            stages: Dict[str, List[float]] = {}
+            for _ in range(repetitions):
+                gc.collect()
+                rss_before = current_rss_bytes()
+                gpu_before = self._gpu_memory()
+                with record_stages() as recorded:
+                    start = time.perf_counter()
+                    func()
+                    durations.append(time.perf_counter() - start)
+                rss_deltas.append(current_rss_bytes() - rss_before)
+                if gpu_before is not None:
+                    gpu_deltas.append(self._gpu_memory() - gpu_before)
+                # A stage may run more than once per repetition; sum per run
+                per_run: Dict[str, float] = {}
+                for stage, seconds, _ in recorded:
+                    per_run[stage] = per_run.get(stage, 0.0) + seconds
+                for stage, seconds in per_run.items():
+                    stages.setdefault(stage, []).append(seconds)
+        except Exception as e:
+            logger.warning("Benchmark variant %s failed: %s", variant.name, e)
+            return {"description": variant.description, "error": str(e)}
+
+        result = {
+            "description": variant.description,
+            "setup_seconds": setup_seconds,
+            "seconds": _summary(durations),
+            "stages": {
+                stage: {"median": statistics.median(values), "p95": _percentile(sorted(values), 0.95),
+                        "runs": len(values)}
+                for stage, values in stages.items()
+            },
+            "memory": {
+                "setup_rss_delta_mb": setup_rss / 1024**2,
+                "rss_delta_mb": {key: value / 1024**2 for key, value in _summary(rss_deltas).items()},
+            },
+        }
+        if gpu_deltas:
+            result["memory"]["gpu_delta_mb"] = {key: value / 1024**2 for key, value in _summary(gpu_deltas).items()}
+        return result
+
+    def run(self, text: str, variants: Optional[List[str]] = None, warmup: int = 1,
+            repetitions: int = 5, baseline: str = "cpu_pipeline") -> Dict[str, Any]:
+        """
+        Benchmark the selected variants (all by default) on one conversation
+
+        Returns per-variant results plus each variant's speedup over ``baseline``
+        (median of the baseline / median of the variant).
+        """
+        names = variants or list(self.variants)
+        unknown = [name for name in names if name not in self.variants]
+        if unknown:
+            raise ValueError(f"Unknown benchmark variants: {', '.join(unknown)} (available: {', '.join(self.variants)})")
+        warmup = max(0, min(warmup, MAX_WARMUP))
+        repetitions = max(1, min(repetitions, MAX_REPETITIONS))
+
+        results = {name: self.run_variant(self.variants[name], text, warmup, repetitions) for name in names}
+
+        base = results.get(baseline, {}).get("seconds", {}).get("median")
+        comparison = {
+            name: base / result["seconds"]["median"]
+            for name, result in results.items()
+            if base and "seconds" in result and result["seconds"]["median"] > 0
+        }
+        return {
+            "settings": {
+                "warmup": warmup,
+                "repetitions": repetitions,
+                "baseline": baseline,
+                "text_length": len(text),
+                "gpu_available": bool(TORCH_AVAILABLE and torch.cuda.is_available()),
+            },
+            "variants": results,
+            "speedup_vs_baseline": comparison,
+        }
+
+
+# Global benchmark service
+_performance_benchmark = None
+
+
+def get_performance_benchmark() -> PerformanceBenchmark:
+    """Get or create the global benchmark service"""
+    global _performance_benchmark
+    if _performance_benchmark is None:
+        _performance_benchmark = PerformanceBenchmark()
+    return _performance_benchmark
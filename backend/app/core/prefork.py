@@ -0,0 +1,142 @@
+"""
+Pre-fork model serving for ConvoCanvas
+Under gunicorn with preload_app (gunicorn.conf.py), the master loads the models
+once before forking, so workers share those memory pages copy-on-write instead
+of each loading a private copy. gc.freeze() then moves everything loaded so far
+out of the collector's reach: collections in the workers no longer write to
+(and thereby un-share) the model objects. Per-worker RSS, PSS and shared memory
+are sampled into pid-mode gauges so /metrics shows how much actually stays shared.
+"""
+import gc
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from app.core.metrics import current_rss_bytes, metrics
+
+logger = logging.getLogger(__name__)
+
+WORKER_MEMORY = metrics.gauge(
+    "convocanvas_worker_memory_bytes",
+    "Memory of this worker process by kind (rss, pss, shared, private)",
+    ["kind"], multiprocess_mode="pid"
+)
+WORKER_SHARED_RATIO = metrics.gauge(
+    "convocanvas_worker_shared_ratio", "Fraction of this worker's resident memory shared with other processes",
+    multiprocess_mode="pid"
+)
+
+# Loaded by the worker itself: CUDA cannot be used in a child forked after it was initialized
+GPU_MODELS = {"sentiment", "summarizer"}
+
+
+def process_memory() -> Dict[str, int]:
+    """RSS, PSS, shared and private bytes of this process (Linux; RSS only elsewhere)"""
+    fields: Dict[str, int] = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except OSError:
+        pass
+    if "Rss" in fields:
+        return {
+            "rss": fields["Rss"],
+            "pss": fields.get("Pss", fields["Rss"]),
+            "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+            "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        }
+    rss = current_rss_bytes()
+    return {"rss": rss, "pss": rss, "shared": 0, "private": rss}
+
+
+def preload_models(models: Optional[List[str]] = None) -> Dict:
+    """
+    Load and exercise models in the gunicorn master before workers are forked
+
+    Uses the warm-up loaders (PRELOAD_MODELS, defaulting to WARMUP_MODELS).
+    GPU pipelines are left to the workers when a GPU is in use.
+    """
+    from app.core.warmup import WarmupManager
+    if models is None:
+        value = os.getenv("PRELOAD_MODELS", os.getenv("WARMUP_MODELS", "spacy,nltk,pipeline"))
+        models = [name.strip() for name in value.split(",") if name.strip()]
+    gpu_models = [name for name in models if name in GPU_MODELS]
+    if gpu_models:
+        from app.core.model_manager import get_model_manager
+        if get_model_manager().gpu_available:
+            logger.info("Not preloading %s in the master: GPU models load in each worker", ", ".join(gpu_models))
+            models = [name for name in models if name not in GPU_MODELS]
+
+    preloader = WarmupManager(models=models, required=[], enabled=True)
+    preloader.start()
+    preloader.wait()
+    status = preloader.status()
+    for name, item in status["models"].items():
+        logger.info("Preloaded %s: %s%s", name, item["state"], f" ({item['detail']})" if item["detail"] else "")
+    return status
+
+
+def freeze_heap():
+    """Collect once, then exclude every surviving object from future collections"""
+    gc.collect()
+    gc.freeze()
+    logger.info("Froze %d objects before fork", gc.get_freeze_count())
+
+
+def after_fork():
+    """Reset per-process state in a newly forked worker"""
+    metrics.reset_after_fork()
+    get_worker_memory_monitor().sample()
+
+
+class WorkerMemoryMonitor:
+    """Samples this worker's memory into the worker gauges"""
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Args:
+            interval: Seconds between samples (WORKER_MEMORY_INTERVAL); 0 only samples on scrape
+        """
+        self.interval = interval if interval is not None else float(os.getenv("WORKER_MEMORY_INTERVAL", "15"))
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def sample(self) -> Dict[str, int]:
+        memory = process_memory()
+        for kind, value in memory.items():
+            WORKER_MEMORY.set(value, kind=kind)
+        WORKER_SHARED_RATIO.set(memory["shared"] / memory["rss"] if memory["rss"] else 0.0)
+        return memory
+
+    def start(self):
+        """Start periodic sampling in this process (once per process)"""
+        if self.interval <= 0 or self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        self._thread = threading.Thread(target=self._loop, name="worker-memory", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                logger.warning("Worker memory sampling failed: %s", e)
+            time.sleep(self.interval)
+
+
+# Global memory monitor
+_worker_memory_monitor = None
+
+
+def get_worker_memory_monitor() -> WorkerMemoryMonitor:
+    """Get or create the global worker memory monitor"""
+    global _worker_memory_monitor
+    if _worker_memory_monitor is None:
+        _worker_memory_monitor = WorkerMemoryMonitor()
+    return _worker_memory_monitor
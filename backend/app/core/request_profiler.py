@@ -0,0 +1,287 @@
+"""
+Opt-in per-request profiling for ConvoCanvas
+A request is profiled when it asks for it (``X-Profile`` header or ``?profile=``
+query param) or is picked by random sampling, and only while the
+REQUEST_PROFILING feature flag is on. Profiles are stored by request id as
+pyinstrument HTML or speedscope JSON. On-demand profiling and /debug/profiles
+require the PROFILING_ADMIN_TOKEN (X-Profile-Token header).
+"""
+import os
+import sys
+import hmac
+import json
+import time
+import uuid
+import random
+import logging
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Optional statistical profiler with nicer output (pip install pyinstrument)
+try:
+    from pyinstrument import Profiler as _PyinstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    _PyinstrumentProfiler = None
+    PYINSTRUMENT_AVAILABLE = False
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+MEDIA_TYPES = {"html": "text/html; charset=utf-8", "speedscope": "application/json"}
+EXTENSIONS = {"html": "html", "speedscope": "speedscope.json"}
+_PROFILE_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Sampling interval bounds: finer than 1ms costs more than it reveals, coarser than 100ms shows nothing
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 0.1
+
+
+def valid_profile_id(profile_id: Optional[str]) -> bool:
+    """Profile ids become file names, so only allow a safe character set"""
+    return bool(profile_id) and bool(_PROFILE_ID_RE.match(profile_id))
+
+
+def parse_interval(value: Optional[str]) -> Optional[float]:
+    """
+    Sampling interval from a ``profile_interval`` query param, clamped to
+    [MIN_INTERVAL, MAX_INTERVAL]; None when not given
+
+    Raises:
+        ValueError: If the value is not a finite number
+    """
+    if not value:
+        return None
+    interval = float(value)
+    if interval != interval or interval in (float("inf"), float("-inf")):
+        raise ValueError(f"profile_interval must be a finite number of seconds, got {value!r}")
+    return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+
+class StackSampler:
+    """
+    Built-in sampling profiler
+    A daemon thread snapshots one thread's stack every ``interval`` seconds via
+    sys._current_frames(); the profiled code itself is not instrumented.
+    """
+
+    def __init__(self, interval: float = 0.005, thread_id: Optional[int] = None, max_depth: int = 128):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.max_depth = max_depth
+        self.frames: List[Dict] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: List[List[int]] = []
+        self.weights: List[float] = []
+        self._stop = threading.Event()
+        self._thread = None
+        self.started = self.stopped = 0.0
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": key[0], "file": key[1], "line": key[2]})
+        return index
+
+    def _sample(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                break
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(self._frame_id(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def speedscope(self, name: str) -> str:
+        """Render the collected samples as a speedscope 'sampled' profile"""
+        return json.dumps({
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": name,
+            "exporter": "convocanvas",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": self.stopped - self.started,
+                "samples": self.samples,
+                "weights": self.weights,
+            }],
+        })
+
+
+class ProfileSession:
+    """One profiled request (pyinstrument when installed, else StackSampler)"""
+
+    def __init__(self, profile_id: str, interval: float, output_format: str, request_id: Optional[str] = None):
+        """
+        Args:
+            profile_id: Server-generated id the profile is stored under
+            request_id: The client's X-Request-Id, only recorded in the profile's name
+        """
+        self.profile_id = profile_id
+        self.request_id = request_id
+        self.interval = interval
+        self.output_format = output_format
+        self.engine = "pyinstrument" if PYINSTRUMENT_AVAILABLE else "sampler"
+        if self.engine == "sampler":
+            # The built-in sampler only produces speedscope output
+            self.output_format = "speedscope"
+        self._profiler = None
+
+    def start(self):
+        if self.engine == "pyinstrument":
+            self._profiler = _PyinstrumentProfiler(interval=self.interval, async_mode="enabled")
+        else:
+            self._profiler = StackSampler(interval=self.interval)
+        self._profiler.start()
+
+    def stop(self) -> str:
+        """Stop profiling and return the rendered profile"""
+        self._profiler.stop()
+        name = f"request {self.request_id or self.profile_id}"
+        if self.engine == "sampler":
+            return self._profiler.speedscope(name)
+        if self.output_format == "html":
+            return self._profiler.output_html()
+        from pyinstrument.renderers import SpeedscopeRenderer
+        return self._profiler.output(SpeedscopeRenderer())
+
+
+class ProfileStore:
+    """Keeps the most recent profiles on disk, keyed by profile id"""
+
+    def __init__(self, directory: str, max_profiles: int = 50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def _path(self, profile_id: str, output_format: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{EXTENSIONS[output_format]}")
+
+    def save(self, profile_id: str, output_format: str, content: str) -> str:
+        """Store a new profile; raises FileExistsError rather than replacing one"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(profile_id, output_format)
+        with open(path, "x", encoding="utf-8") as f:
+            f.write(content)
+        self._evict()
+        return path
+
+    def load(self, profile_id: str) -> Optional[Tuple[str, str]]:
+        """Return (content, media type) of a stored profile"""
+        if not valid_profile_id(profile_id):
+            return None
+        for output_format in EXTENSIONS:
+            path = self._path(profile_id, output_format)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    return f.read(), MEDIA_TYPES[output_format]
+        return None
+
+    def list(self) -> List[Dict]:
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for entry in os.scandir(self.directory):
+            profile_id, _, extension = entry.name.partition(".")
+            if extension not in EXTENSIONS.values():
+                continue
+            stat = entry.stat()
+            profiles.append({"profile_id": profile_id, "format": "html" if extension == "html" else "speedscope",
+                             "bytes": stat.st_size, "created": stat.st_mtime})
+        return sorted(profiles, key=lambda p: p["created"], reverse=True)
+
+    def _evict(self):
+        for stale in self.list()[self.max_profiles:]:
+            try:
+                os.remove(self._path(stale["profile_id"], stale["format"]))
+            except OSError:
+                pass
+
+
+class RequestProfiler:
+    """Decides which requests to profile and stores the results"""
+
+    def __init__(self):
+        self.admin_token = os.getenv("PROFILING_ADMIN_TOKEN", "")
+        # Without a token profiles are only served if this is explicitly allowed (local development)
+        self.allow_insecure = os.getenv("PROFILING_ALLOW_INSECURE", "false").lower() == "true"
+        self.interval = float(os.getenv("PROFILING_INTERVAL", "0.005"))
+        self.sample_rate = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+        self.default_format = os.getenv("PROFILING_FORMAT", "html" if PYINSTRUMENT_AVAILABLE else "speedscope")
+        self.store = ProfileStore(
+            os.getenv("PROFILING_DIR", "/tmp/convocanvas-profiles"),
+            int(os.getenv("PROFILING_MAX_PROFILES", "50"))
+        )
+        # Only one request is profiled at a time to bound overhead
+        self._busy = threading.Lock()
+
+    def authorized(self, token: Optional[str]) -> bool:
+        """
+        True if ``token`` matches the admin token
+
+        With no PROFILING_ADMIN_TOKEN configured every request is refused,
+        unless PROFILING_ALLOW_INSECURE opts out of authentication.
+        """
+        if not self.admin_token:
+            return self.allow_insecure
+        return bool(token) and hmac.compare_digest(token, self.admin_token)
+
+    def requested_mode(self, headers, query_params) -> Optional[str]:
+        """
+        Profiling mode asked for by the client, if any
+
+        Returns:
+            "store" (save the profile and reference it in response headers),
+            "return" (respond with the profile itself) or None
+        """
+        value = (headers.get("x-profile") or query_params.get("profile") or "").lower()
+        if value in ("1", "true", "store"):
+            return "store"
+        if value == "return":
+            return "return"
+        return None
+
+    def sampled(self) -> bool:
+        """Random background sampling (PROFILING_SAMPLE_RATE)"""
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def acquire(self) -> bool:
+        return self._busy.acquire(blocking=False)
+
+    def release(self):
+        self._busy.release()
+
+    def session(self, request_id: Optional[str] = None, output_format: Optional[str] = None,
+                interval: Optional[float] = None) -> ProfileSession:
+        output_format = output_format if output_format in EXTENSIONS else self.default_format
+        # Stored under a fresh id: a client-chosen id could replace someone else's profile
+        request_id = request_id if valid_profile_id(request_id) else None
+        interval = min(MAX_INTERVAL, max(MIN_INTERVAL, interval or self.interval))
+        return ProfileSession(uuid.uuid4().hex, interval, output_format, request_id=request_id)
+
+
+# Global profiler instance
+request_profiler = RequestProfiler()
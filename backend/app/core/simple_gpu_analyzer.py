@@ -3,23 +3,63 @@ Simple GPU-Enhanced Conversation Analyzer for ConvoCanvas
 Uses PyTorch GPU acceleration without complex model dependencies
 """
 
-import torch
 import logging
-import spacy
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import gc
 
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    torch = None
+    TORCH_AVAILABLE = False
+
+from app.core.metrics import STAGE_DURATION, time_model_load, time_stage
+from app.core.nlp_resources import get_nlp_resources
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Entities and key phrases are reported from the start of the conversation only
+ENTITY_WINDOW_CHARS = 10000
+
+
+class SharedAnalysisContext:
+    """
+    Per-conversation analysis state shared by dialogue, decision and action-item
+    extraction: the spaCy Doc, its sentences and the GPU analysis result are
+    each computed once and then reused.
+    """
+
+    def __init__(self, text: str, nlp):
+        self.text = text
+        self.nlp = nlp
+        self._doc = None
+        self._sentences: Optional[List[str]] = None
+        self.result: Optional[Dict[str, Any]] = None
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            with time_stage("gpu_spacy_parse"):
+                self._doc = self.nlp(self.text)
+        return self._doc
+
+    @property
+    def sentences(self) -> List[str]:
+        if self._sentences is None:
+            self._sentences = [sent.text for sent in self.doc.sents]
+        return self._sentences
+
+
 class SimpleGPUAnalyzer:
     """Simplified GPU-accelerated conversation analyzer"""
 
     def __init__(self):
-        self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        self.is_gpu_available = torch.cuda.is_available()
+        self.is_gpu_available = TORCH_AVAILABLE and torch.cuda.is_available()
+        self.device = torch.device('cuda' if self.is_gpu_available else 'cpu') if TORCH_AVAILABLE else 'cpu'
         self.nlp = None
         self._initialize_models()
 
@@ -33,17 +73,26 @@ class SimpleGPUAnalyzer:
 
             # Initialize spaCy with CPU (works reliably)
             logger.info("💻 Initializing spaCy with CPU...")
-            self.nlp = spacy.load("en_core_web_sm")
+            with time_model_load("spacy:en_core_web_sm"):
+                self.nlp = get_nlp_resources().load_spacy()
 
             logger.info("✅ Basic models initialized successfully")
 
         except Exception as e:
             logger.error(f"❌ Model initialization failed: {e}")
             # Fallback to basic CPU processing
-            self.nlp = spacy.load("en_core_web_sm") if self.nlp is None else self.nlp
+            self.nlp = get_nlp_resources().load_spacy() if self.nlp is None else self.nlp
 
-    def analyze_conversation_simple(self, text: str, conversation_title: str = "") -> Dict[str, Any]:
+    def context_for(self, text: str) -> SharedAnalysisContext:
+        """New shared analysis context for one conversation"""
+        return SharedAnalysisContext(text, self.nlp)
+
+    def analyze_conversation_simple(self, text: str, conversation_title: str = "",
+                                    context: Optional[SharedAnalysisContext] = None) -> Dict[str, Any]:
         """Simplified conversation analysis with basic GPU utilization"""
+        if context is not None and context.result is not None:
+            return context.result
+        context = context or self.context_for(text)
         start_time = datetime.now()
 
         try:
@@ -63,14 +112,14 @@ class SimpleGPUAnalyzer:
 
             # 1. Basic NLP processing with spaCy
             logger.info("🔍 Processing with spaCy...")
-            doc = self.nlp(text[:10000])  # Limit to 10k chars for memory safety
+            doc = context.doc
 
             # Extract entities
-            entities = [(ent.text, ent.label_) for ent in doc.ents]
+            entities = [(ent.text, ent.label_) for ent in doc.ents if ent.start_char < ENTITY_WINDOW_CHARS]
             results["entities"] = entities[:20]  # Top 20 entities
 
             # Extract key phrases (noun phrases)
-            noun_phrases = [chunk.text for chunk in doc.noun_chunks]
+            noun_phrases = [chunk.text for chunk in doc.noun_chunks if chunk.start_char < ENTITY_WINDOW_CHARS]
             results["key_phrases"] = noun_phrases[:15]  # Top 15 phrases
 
             # 2. Simple GPU-accelerated text processing
@@ -81,17 +130,18 @@ class SimpleGPUAnalyzer:
                 results["gpu_features"] = gpu_features
 
             # 3. Decision extraction (pattern-based)
-            decisions = self._extract_decisions_simple(text)
+            decisions = self._extract_decisions_simple(context.sentences)
             results["decisions"] = decisions
 
             # 4. Action items extraction
-            action_items = self._extract_action_items_simple(text)
+            action_items = self._extract_action_items_simple(context.sentences)
             results["action_items"] = action_items
 
             # Performance metrics
             end_time = datetime.now()
             processing_time = (end_time - start_time).total_seconds()
             results["processing_time_seconds"] = processing_time
+            STAGE_DURATION.observe(processing_time, stage="gpu_simple_analysis")
 
             if self.is_gpu_available:
                 final_memory = torch.cuda.memory_allocated(0) / 1024**2
@@ -105,6 +155,7 @@ class SimpleGPUAnalyzer:
                 torch.cuda.empty_cache()
                 gc.collect()
 
+            context.result = results
             return results
 
         except Exception as e:
@@ -117,7 +168,7 @@ class SimpleGPUAnalyzer:
                 "gpu_accelerated": False
             }
 
-    def _text_to_tensor(self, text: str) -> torch.Tensor:
+    def _text_to_tensor(self, text: str) -> "torch.Tensor":
         """Convert text to simple tensor for GPU processing"""
         # Simple character-level encoding
         char_indices = [ord(c) % 128 for c in text[:512]]  # Limit to 512 chars
@@ -126,7 +177,7 @@ class SimpleGPUAnalyzer:
             tensor = tensor.to(self.device)
         return tensor
 
-    def _extract_gpu_features(self, text_tensor: torch.Tensor) -> Dict[str, float]:
+    def _extract_gpu_features(self, text_tensor: "torch.Tensor") -> Dict[str, float]:
         """Extract simple features using GPU tensor operations"""
         try:
             # Simple statistical features using GPU
@@ -141,8 +192,8 @@ class SimpleGPUAnalyzer:
             logger.warning(f"GPU feature extraction failed: {e}")
             return {}
 
-    def _extract_decisions_simple(self, text: str) -> List[Dict[str, Any]]:
-        """Simple decision extraction using spaCy"""
+    def _extract_decisions_simple(self, sentences: List[str]) -> List[Dict[str, Any]]:
+        """Simple decision extraction over spaCy sentences"""
         decisions = []
 
         decision_patterns = [
@@ -150,9 +201,6 @@ class SimpleGPUAnalyzer:
             "selected", "determined", "concluded", "opted for"
         ]
 
-        doc = self.nlp(text)
-        sentences = [sent.text for sent in doc.sents]
-
         for i, sentence in enumerate(sentences):
             for pattern in decision_patterns:
                 if pattern.lower() in sentence.lower():
@@ -165,8 +213,8 @@ class SimpleGPUAnalyzer:
 
         return decisions[:10]
 
-    def _extract_action_items_simple(self, text: str) -> List[Dict[str, Any]]:
-        """Simple action item extraction"""
+    def _extract_action_items_simple(self, sentences: List[str]) -> List[Dict[str, Any]]:
+        """Simple action item extraction over spaCy sentences"""
         action_items = []
 
         action_patterns = [
@@ -174,9 +222,6 @@ class SimpleGPUAnalyzer:
             "implement", "create", "build", "setup", "configure"
         ]
 
-        doc = self.nlp(text)
-        sentences = [sent.text for sent in doc.sents]
-
         for i, sentence in enumerate(sentences):
             for pattern in action_patterns:
                 if pattern.lower() in sentence.lower():
@@ -219,10 +264,11 @@ def get_simple_gpu_analyzer() -> SimpleGPUAnalyzer:
         _simple_gpu_analyzer = SimpleGPUAnalyzer()
     return _simple_gpu_analyzer
 
-def analyze_conversation_simple_gpu(text: str, title: str = "") -> Dict[str, Any]:
+def analyze_conversation_simple_gpu(text: str, title: str = "",
+                                    context: Optional[SharedAnalysisContext] = None) -> Dict[str, Any]:
     """Main entry point for simple GPU-accelerated conversation analysis"""
     analyzer = get_simple_gpu_analyzer()
-    return analyzer.analyze_conversation_simple(text, title)
+    return analyzer.analyze_conversation_simple(text, title, context)
 
 def get_simple_analyzer_status() -> Dict[str, Any]:
     """Get current simple analyzer status"""
@@ -0,0 +1,291 @@
+"""
+Vault-wide decision canvas for ConvoCanvas
+Builds one Obsidian canvas across every indexed conversation, with a row per
+date bucket and a group per technical domain. Each group links its source
+notes through file nodes. Groups are rendered from the analysis index (no
+re-analysis), cached, and only re-rendered when their source conversations
+change. The canvas is streamed to disk one group at a time.
+
+    python -m app.core.vault_canvas /path/to/vault --folder AI-Conversations --by month
+"""
+import os
+import sys
+import json
+import hashlib
+import logging
+import argparse
+import tempfile
+import shutil
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+from app.core.analysis_index import AnalysisIndex
+from app.core.canvas_generator import CanvasDecisionVisualizer, decision_key
+from app.core.canvas_layout import CanvasLayoutEngine, LayoutGroup
+from app.core.metrics import time_stage
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered group format changes so cached groups are rebuilt
+RENDER_VERSION = "3"
+GRANULARITIES = ("day", "week", "month")
+
+
+class VaultCanvasBuilder:
+    """Renders a vault-wide canvas from an AnalysisIndex"""
+
+    def __init__(self, index: AnalysisIndex, granularity: str = "month",
+                 engine: Optional[CanvasLayoutEngine] = None):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {GRANULARITIES}, got {granularity!r}")
+        self.index = index
+        self.granularity = granularity
+        self.visualizer = CanvasDecisionVisualizer()
+        self.engine = engine or self.visualizer.layout_engine
+        self.row_label_width = 260
+        self.gap = self.visualizer.padding * 2
+
+    def bucket(self, conversation_date: str) -> str:
+        """Date bucket label for a YYYY-MM-DD date"""
+        if self.granularity == "day":
+            return conversation_date
+        if self.granularity == "month":
+            return conversation_date[:7]
+        year, week, _ = date.fromisoformat(conversation_date).isocalendar()
+        return f"{year}-W{week:02d}"
+
+    def plan(self) -> Dict[str, Dict]:
+        """
+        Group membership and change signature of every group
+
+        Only decision domains and content hashes are read here; decision text
+        is loaded later for the groups that actually need re-rendering.
+        """
+        groups: Dict[str, Dict] = {}
+        for row in self.index.decision_domains():
+            domains = json.loads(row["technical_domains"]) or ["general"]
+            bucket = self.bucket(row["conversation_date"])
+            key = f"{bucket}/{domains[0]}"
+            group = groups.setdefault(key, {"bucket": bucket, "domain": domains[0], "sources": {}})
+            group["sources"][row["path"]] = row["content_hash"]
+
+        for key, group in groups.items():
+            digest = hashlib.sha256(f"{RENDER_VERSION}|{key}".encode())
+            for path, content_hash in sorted(group["sources"].items()):
+                digest.update(f"|{path}:{content_hash}".encode())
+            group["signature"] = digest.hexdigest()
+        return groups
+
+    def render_group(self, key: str, group: Dict) -> Tuple[int, int, List[Dict], List[Dict]]:
+        """Nodes and edges of one group, positioned relative to the group's top-left corner"""
+        items: List[Tuple[str, Dict]] = []
+        for conversation in self.index.conversations(group["sources"]):
+            items.append(("note", dict(conversation)))
+            for decision in self.index.decisions(conversation["path"]):
+                domains = decision["technical_domains"] or ["general"]
+                if domains[0] == group["domain"]:
+                    items.append(("decision", {**decision, "path": conversation["path"]}))
+
+        slug = LayoutGroup(key, key).slug
+        layout = LayoutGroup(key, key, list(range(len(items))))
+        width, height = self.engine.layout([layout], origin=(0, 0), framed=True)
+
+        nodes = [{
+            "id": f"group-{slug}",
+            "type": "group",
+            "x": 0,
+            "y": 0,
+            "width": width,
+            "height": height,
+            "label": f"{group['domain'].replace('_', ' ').title()} ({group['bucket']})",
+        }]
+        edges = []
+        note_id = None
+        for (kind, item), (x, y) in zip(items, layout.positions):
+            if kind == "note":
+                note_id = f"note-{hashlib.sha1(item['path'].encode()).hexdigest()[:12]}-{slug}"
+                nodes.append({
+                    "id": note_id,
+                    "type": "file",
+                    "file": item["path"],
+                    "x": x,
+                    "y": y,
+                    "width": self.visualizer.node_width,
+                    "height": self.visualizer.node_height,
+                    "color": self.visualizer.colors["summary"],
+                })
+                continue
+            # The position keeps two decisions with the same text in one note apart
+            node_id = f"{note_id}-{item['position']}-{decision_key(item)}"
+            nodes.append({
+                "id": node_id,
+                "type": "text",
+                "x": x,
+                "y": y,
+                "width": self.visualizer.node_width,
+                "height": self.visualizer.node_height,
+                "color": self.visualizer._get_decision_color(item),
+                "text": self.visualizer._format_decision_text(item, item["position"] + 1),
+            })
+            edges.append(self.visualizer._create_edge(note_id, node_id))
+        return width, height, nodes, edges
+
+    def build(self, output_path: str, canvas_name: Optional[str] = None,
+              title: str = "Vault Decisions") -> Dict[str, int]:
+        """
+        Write the vault canvas to ``output_path``
+
+        Returns:
+            Counts of groups (total / rendered / reused), nodes, edges and bytes written
+        """
+        canvas_name = canvas_name or f"{os.path.basename(output_path)}:{self.granularity}"
+        stats = {"groups": 0, "rendered": 0, "reused": 0, "nodes": 0, "edges": 0, "bytes": 0}
+
+        with time_stage("vault_canvas_plan"):
+            planned = self.plan()
+            cached = self.index.cached_groups(canvas_name)
+
+        sizes: Dict[str, Tuple[int, int]] = {}
+        with time_stage("vault_canvas_render"):
+            for key, group in planned.items():
+                previous = cached.get(key)
+                if previous and previous["signature"] == group["signature"]:
+                    sizes[key] = (previous["width"], previous["height"])
+                    stats["reused"] += 1
+                    continue
+                width, height, nodes, edges = self.render_group(key, group)
+                self.index.save_group(canvas_name, key, group["signature"], width, height, nodes, edges)
+                sizes[key] = (width, height)
+                stats["rendered"] += 1
+            self.index.prune_groups(canvas_name, planned)
+            self.index.commit()
+        stats["groups"] = len(planned)
+
+        with time_stage("vault_canvas_write"):
+            self._write(output_path, canvas_name, title, planned, sizes, stats)
+        logger.info("Vault canvas %s: %s", output_path, stats)
+        return stats
+
+    def _place(self, planned: Dict[str, Dict], sizes: Dict[str, Tuple[int, int]]) -> Tuple[List[Dict], Dict[str, Tuple[int, int]]]:
+        """Row labels and absolute origins: one row per date bucket, groups left to right"""
+        labels = []
+        origins: Dict[str, Tuple[int, int]] = {}
+        rows: Dict[str, List[str]] = {}
+        for key, group in planned.items():
+            rows.setdefault(group["bucket"], []).append(key)
+
+        y = 250
+        for bucket in sorted(rows):
+            labels.append({
+                "id": f"row-{bucket}",
+                "type": "text",
+                "x": 0,
+                "y": y,
+                "width": self.row_label_width,
+                "height": 80,
+                "color": self.visualizer.colors["summary"],
+                "text": f"## {bucket}",
+            })
+            x = self.row_label_width + self.gap
+            row_height = 80
+            for key in sorted(rows[bucket], key=lambda k: planned[k]["domain"]):
+                origins[key] = (x, y)
+                x += sizes[key][0] + self.gap
+                row_height = max(row_height, sizes[key][1])
+            y += row_height + self.gap
+        return labels, origins
+
+    def _write(self, output_path: str, canvas_name: str, title: str, planned: Dict[str, Dict],
+               sizes: Dict[str, Tuple[int, int]], stats: Dict[str, int]):
+        """Stream nodes then edges to a temp file and atomically replace the canvas"""
+        labels, origins = self._place(planned, sizes)
+        conversations = len({path for group in planned.values() for path in group["sources"]})
+        title_node = {
+            "id": "title",
+            "type": "text",
+            "x": 0,
+            "y": 0,
+            "width": self.visualizer.node_width + 100,
+            "height": 160,
+            "color": self.visualizer.colors["summary"],
+            "text": f"# {title}\n\n**Conversations:** {conversations}\n**Groups:** {len(planned)}\n"
+                    f"**Grouped by:** {self.granularity} / technical domain",
+        }
+
+        directory = os.path.dirname(os.path.abspath(output_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".vault-canvas-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as out, tempfile.TemporaryFile("w+", encoding="utf-8") as edges_out:
+                out.write('{\n"nodes": [\n')
+                first_node = first_edge = True
+
+                def emit_node(node):
+                    nonlocal first_node
+                    out.write(("" if first_node else ",\n") + json.dumps(node))
+                    first_node = False
+                    stats["nodes"] += 1
+
+                def emit_edge(edge):
+                    nonlocal first_edge
+                    edges_out.write(("" if first_edge else ",\n") + json.dumps(edge))
+                    first_edge = False
+                    stats["edges"] += 1
+
+                emit_node(title_node)
+                for label in labels:
+                    emit_node(label)
+
+                for key in sorted(origins, key=lambda k: origins[k][::-1]):
+                    ox, oy = origins[key]
+                    stored = self.index.load_group(canvas_name, key)
+                    for node in json.loads(stored["nodes"]):
+                        node["x"] += ox
+                        node["y"] += oy
+                        emit_node(node)
+                    for edge in json.loads(stored["edges"]):
+                        emit_edge(edge)
+
+                out.write('\n],\n"edges": [\n')
+                edges_out.seek(0)
+                shutil.copyfileobj(edges_out, out)
+                out.write("\n]\n}\n")
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        stats["bytes"] = os.path.getsize(output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a vault-wide decision canvas")
+    parser.add_argument("vault", help="Path to the Obsidian vault")
+    parser.add_argument("--output", default="ConvoCanvas/Vault-Decisions.canvas",
+                        help="Canvas path, relative to the vault")
+    parser.add_argument("--index", help="Analysis index database (default: <vault>/.convocanvas/analysis-index.sqlite)")
+    parser.add_argument("--folder", action="append", help="Vault folder with conversations (repeatable)")
+    parser.add_argument("--by", choices=GRANULARITIES, default="month", help="Date bucket per canvas row")
+    parser.add_argument("--title", default="Vault Decisions")
+    parser.add_argument("--no-reindex", action="store_true", help="Use the index as is, without scanning the vault")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    index = AnalysisIndex(args.index or os.path.join(args.vault, ".convocanvas", "analysis-index.sqlite"))
+    try:
+        if not args.no_reindex:
+            report = index.index_vault(args.vault, folders=args.folder)
+            print(f"Indexed: {len(report['updated'])} updated, {len(report['removed'])} removed, "
+                  f"{len(report['unchanged'])} unchanged")
+        builder = VaultCanvasBuilder(index, granularity=args.by)
+        stats = builder.build(os.path.join(args.vault, args.output), title=args.title)
+        print(f"Canvas written to {args.output}: {stats['groups']} groups "
+              f"({stats['rendered']} rendered, {stats['reused']} reused), "
+              f"{stats['nodes']} nodes, {stats['edges']} edges")
+    finally:
+        index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
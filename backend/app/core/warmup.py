@@ -0,0 +1,208 @@
+"""
+Startup warm-up and readiness for ConvoCanvas
+Preloads the configured models in a background thread when a worker starts,
+runs a warm-up inference through the analysis pipeline and records per-model
+state and load durations. /readyz reports ready only once every required
+model is warm, so load balancers do not route requests to cold workers.
+"""
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from app.core.metrics import metrics, time_model_load
+
+logger = logging.getLogger(__name__)
+
+MODEL_READY = metrics.gauge(
+    "convocanvas_model_ready", "Whether a model finished warming up in this worker (1) or not (0)",
+    ["model"], multiprocess_mode="pid"
+)
+
+# States of a warm-up item
+PENDING, LOADING, READY, FAILED, SKIPPED = "pending", "loading", "ready", "failed", "skipped"
+
+WARMUP_CONVERSATION = """## User
+We need to automate the MPLS backbone configuration. Should we use Ansible or Terraform?
+
+## Claude
+I recommend Terraform for provisioning because plans are reviewable. Let's go with GitLab CI/CD
+for the pipeline and monitor the rollout with Grafana and Prometheus.
+
+## User
+Great, we decided to use Terraform and keep Ansible for troubleshooting playbooks.
+"""
+
+
+class WarmupItem:
+    """One model (or model group) to preload"""
+
+    def __init__(self, name: str, loader: Callable[[], Optional[str]], required: bool):
+        """
+        Args:
+            loader: Loads and exercises the model; may return a reason to mark it skipped
+            required: Whether readiness waits for this item
+        """
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = PENDING
+        self.seconds: Optional[float] = None
+        self.detail: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {"state": self.state, "required": self.required, "seconds": self.seconds, "detail": self.detail}
+
+
+def _warm_pipeline() -> Optional[str]:
+    from app.core.analysis_pipeline import get_analysis_pipeline
+    pipeline = get_analysis_pipeline()
+    pipeline.run(WARMUP_CONVERSATION, ["sentiment", "entities", "decision_details", "mindmap", "topics"])
+    return None
+
+
+def _warm_spacy() -> Optional[str]:
+    from app.core.analysis_pipeline import get_analysis_pipeline
+    analyzer = get_analysis_pipeline().analyzer
+    if analyzer.inference_client is not None:
+        # spaCy lives in the inference server; make sure it answers
+        analyzer.inference_client.entities(["Warm-up sentence for the spaCy pipeline."])
+        return None
+    nlp = analyzer.nlp
+    if nlp is None:
+        raise RuntimeError("spaCy model en_core_web_sm is not installed")
+    nlp("Warm-up sentence for the spaCy pipeline.")
+    return None
+
+
+def _warm_nltk() -> Optional[str]:
+    from app.core.enhanced_content_analyzer import ensure_nltk_data
+    missing = ensure_nltk_data()
+    if missing:
+        raise RuntimeError(f"NLTK data missing: {', '.join(missing)}")
+    return None
+
+
+def _warm_transformer(name: str) -> Callable[[], Optional[str]]:
+    def warm() -> Optional[str]:
+        from app.core.model_manager import TORCH_AVAILABLE
+        if not TORCH_AVAILABLE:
+            return "torch is not installed"
+        from app.core.gpu_enhanced_analyzer import get_gpu_analyzer
+        analyzer = get_gpu_analyzer()
+        model = analyzer.model_manager.get(name)
+        messages = analyzer._split_messages(WARMUP_CONVERSATION)
+        if name == "sentiment":
+            analyzer.inference.sentiment_by_message(model, messages)
+        else:
+            # The warm-up result is cached like any other summary, which is harmless
+            analyzer.summarizer.summarize(model, messages)
+        return None
+    return warm
+
+
+LOADERS: Dict[str, Callable[[], Optional[str]]] = {
+    "spacy": _warm_spacy,
+    "nltk": _warm_nltk,
+    "pipeline": _warm_pipeline,
+    "sentiment": _warm_transformer("sentiment"),
+    "summarizer": _warm_transformer("summarizer"),
+}
+
+
+def _names(value: str) -> List[str]:
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class WarmupManager:
+    """Background preloading and readiness state of this worker"""
+
+    def __init__(self, models: Optional[List[str]] = None, required: Optional[List[str]] = None,
+                 enabled: Optional[bool] = None):
+        """
+        Args:
+            models: Items to preload, in order (WARMUP_MODELS)
+            required: Items /readyz waits for (WARMUP_REQUIRED); others only report
+            enabled: Run the warm-up at startup (WARMUP_ENABLED); when off every item is skipped
+        """
+        models = models if models is not None else _names(os.getenv("WARMUP_MODELS", "spacy,nltk,pipeline"))
+        required = required if required is not None else _names(os.getenv("WARMUP_REQUIRED", "pipeline"))
+        self.enabled = enabled if enabled is not None else os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+        unknown = [name for name in models if name not in LOADERS]
+        if unknown:
+            raise ValueError(f"Unknown warm-up models: {', '.join(unknown)} (available: {', '.join(LOADERS)})")
+        self.items: Dict[str, WarmupItem] = {
+            name: WarmupItem(name, LOADERS[name], name in required) for name in models
+        }
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start preloading in a background thread (once)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.started_at = time.time()
+            if not self.enabled:
+                for item in self.items.values():
+                    item.state, item.detail = SKIPPED, "warm-up disabled"
+                self.finished_at = self.started_at
+                return
+            self._thread = threading.Thread(target=self._run, name="convocanvas-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        for item in self.items.values():
+            item.state = LOADING
+            MODEL_READY.set(0, model=item.name)
+            start = time.perf_counter()
+            try:
+                with time_model_load(f"warmup:{item.name}"):
+                    reason = item.loader()
+            except Exception as e:
+                item.state, item.detail = FAILED, str(e)
+                logger.warning("Warm-up of %s failed: %s", item.name, e)
+            else:
+                item.state, item.detail = (SKIPPED, reason) if reason else (READY, None)
+            item.seconds = time.perf_counter() - start
+            MODEL_READY.set(1 if item.state == READY else 0, model=item.name)
+            logger.info("Warm-up %s: %s in %.2fs", item.name, item.state, item.seconds)
+        self.finished_at = time.time()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the warm-up finished; returns False on timeout"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    @property
+    def ready(self) -> bool:
+        """Every required item is warm (skipped items never block; a disabled warm-up is ready)"""
+        if not self.enabled:
+            return True
+        return all(item.state in (READY, SKIPPED) for item in self.items.values() if item.required)
+
+    def status(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "warmup_enabled": self.enabled,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "models": {name: item.to_dict() for name, item in self.items.items()},
+        }
+
+
+# Global warm-up manager (one per worker process)
+_warmup_manager = None
+
+
+def get_warmup_manager() -> WarmupManager:
+    """Get or create the global warm-up manager"""
+    global _warmup_manager
+    if _warmup_manager is None:
+        _warmup_manager = WarmupManager()
+    return _warmup_manager
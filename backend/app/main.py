@@ -1,13 +1,34 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from app.api.conversations import router as conversations_router
 from app.api.enhanced_conversations import router as enhanced_conversations_router
 from app.core.feature_flags import feature_flags, Features
+from app.core.metrics import metrics, REQUEST_DURATION, REQUEST_SIZE, RESPONSE_SIZE, REQUESTS_IN_FLIGHT
+from app.core.request_profiler import request_profiler, parse_interval, MEDIA_TYPES
+from app.core.nlp_resources import get_nlp_resources
+from app.core.prefork import get_worker_memory_monitor
+from app.core.warmup import get_warmup_manager
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fail fast: an incomplete or corrupt NLP resource bundle stops the worker with a diagnostic
+    resources = get_nlp_resources()
+    if resources.bundle_dir:
+        resources.resolve()
+    # Preload models in the background; /readyz turns 200 once they are warm
+    get_warmup_manager().start()
+    get_worker_memory_monitor().start()
+    yield
 
 app = FastAPI(
     title="ConvoCanvas API",
     version="0.2.0-alpha",
-    description="AI-powered conversation analysis with decision tracking and visual insights"
+    description="AI-powered conversation analysis with decision tracking and visual insights",
+    lifespan=lifespan
 )
 
 # Add CORS middleware for frontend integration
@@ -19,6 +40,70 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Record latency, payload sizes and queue depth per endpoint"""
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        REQUESTS_IN_FLIGHT.dec()
+        # Label by route template (not raw path) to keep cardinality bounded
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        REQUEST_DURATION.observe(
+            time.perf_counter() - start, method=request.method, endpoint=endpoint, status=str(status_code)
+        )
+        REQUEST_SIZE.observe(int(request.headers.get("content-length") or 0), endpoint=endpoint)
+        if status_code != 500:
+            RESPONSE_SIZE.observe(int(response.headers.get("content-length") or 0), endpoint=endpoint)
+
+@app.middleware("http")
+async def profile_requests(request: Request, call_next):
+    """Profile a request when asked for (X-Profile / ?profile=) or randomly sampled"""
+    if not feature_flags.is_enabled(Features.REQUEST_PROFILING):
+        return await call_next(request)
+
+    mode = request_profiler.requested_mode(request.headers, request.query_params)
+    if mode and not request_profiler.authorized(request.headers.get("x-profile-token")):
+        mode = None
+    interval = None
+    if mode:
+        try:
+            interval = parse_interval(request.query_params.get("profile_interval"))
+        except ValueError:
+            return JSONResponse({"detail": "profile_interval must be a number of seconds"}, status_code=400)
+    if mode is None and request_profiler.sampled():
+        mode = "store"
+    if mode is None or not request_profiler.acquire():
+        return await call_next(request)
+
+    try:
+        session = request_profiler.session(
+            request_id=request.headers.get("x-request-id"),
+            output_format=request.query_params.get("profile_format"),
+            interval=interval
+        )
+        session.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profile = session.stop()
+        request_profiler.store.save(session.profile_id, session.output_format, profile)
+    finally:
+        request_profiler.release()
+
+    if mode == "return":
+        return Response(profile, media_type=MEDIA_TYPES[session.output_format],
+                        headers={"X-Profile-Id": session.profile_id})
+    response.headers["X-Profile-Id"] = session.profile_id
+    response.headers["X-Profile-URL"] = f"/debug/profiles/{session.profile_id}"
+    return response
+
 # Include routers
 app.include_router(conversations_router, prefix="/api/conversations", tags=["conversations"])
 app.include_router(enhanced_conversations_router, prefix="/api/v2/conversations", tags=["enhanced-analysis"])
@@ -64,6 +149,46 @@ async def root():
 async def health():
     return {"status": "healthy", "version": "0.2.0"}
 
+@app.get("/livez")
+async def livez():
+    """Liveness: the worker is up and its event loop responds"""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: 200 once every required model is warm, 503 (with per-model state) before"""
+    status = get_warmup_manager().status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus scrape endpoint (aggregated across workers when CONVOCANVAS_METRICS_DIR is set)"""
+    get_worker_memory_monitor().sample()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+def _require_profiling_admin(token: str):
+    if not feature_flags.is_enabled(Features.REQUEST_PROFILING):
+        raise HTTPException(status_code=404, detail="Request profiling is disabled")
+    if not request_profiler.authorized(token):
+        detail = "Invalid profiling token" if request_profiler.admin_token else "PROFILING_ADMIN_TOKEN is not configured"
+        raise HTTPException(status_code=403, detail=detail)
+
+@app.get("/debug/profiles")
+async def list_profiles(x_profile_token: str = Header(None)):
+    """Stored request profiles, newest first"""
+    _require_profiling_admin(x_profile_token)
+    return {"profiles": request_profiler.store.list()}
+
+@app.get("/debug/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile_token: str = Header(None)):
+    """Download a stored profile (HTML or speedscope JSON)"""
+    _require_profiling_admin(x_profile_token)
+    stored = request_profiler.store.load(profile_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=f"No profile {profile_id}")
+    content, media_type = stored
+    return Response(content, media_type=media_type)
+
 @app.get("/feature-flags")
 async def get_feature_flags():
     return {"feature_flags": feature_flags.get_config()}
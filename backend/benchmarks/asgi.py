@@ -0,0 +1,66 @@
+"""Minimal in-process ASGI client (no network, no extra dependencies)"""
+import uuid
+from typing import Dict, Iterable, Tuple
+
+
+def multipart_file(field: str, filename: str, content: bytes) -> Tuple[bytes, str]:
+    """Encode a single-file multipart/form-data body"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+        "Content-Type: text/markdown\r\n\r\n"
+    ).encode() + content + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"",
+                       headers: Iterable[Tuple[str, str]] = ()) -> Tuple[int, Dict[str, str], bytes]:
+    """Send one HTTP request straight into an ASGI app"""
+    path, _, query = path.partition("?")
+    raw_headers = [(k.lower().encode(), v.encode()) for k, v in headers]
+    raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": raw_headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("127.0.0.1", 8000),
+    }
+
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    status = 500
+    response_headers: Dict[str, str] = {}
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers.update({k.decode(): v.decode() for k, v in message.get("headers", [])})
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+async def upload(app, path: str, filename: str, content: bytes, headers: Iterable[Tuple[str, str]] = ()):
+    """POST a conversation file the way the frontend does"""
+    body, content_type = multipart_file("file", filename, content)
+    return await asgi_request(app, "POST", path, body, [("content-type", content_type), *headers])
@@ -0,0 +1,29 @@
+"""Benchmark inputs: the real exports in data/exports plus seeded synthetic corpora"""
+import os
+from functools import lru_cache
+from typing import Dict
+
+from benchmarks.synthetic import generate_conversation
+
+EXPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "data", "exports")
+
+SYNTHETIC_FIXTURES = {
+    "synthetic-small": dict(seed=1, messages=10, code_ratio=0.2, decision_density=0.3),
+    "synthetic-medium": dict(seed=2, messages=60, target_chars=60_000, code_ratio=0.3, decision_density=0.2),
+    "synthetic-large": dict(seed=3, messages=200, target_chars=400_000, code_ratio=0.4, decision_density=0.1),
+}
+
+
+@lru_cache(maxsize=None)
+def load_fixtures() -> Dict[str, str]:
+    """All benchmark fixtures keyed by name"""
+    fixtures = {}
+    if os.path.isdir(EXPORTS_DIR):
+        for filename in sorted(os.listdir(EXPORTS_DIR)):
+            if filename.endswith(".md"):
+                with open(os.path.join(EXPORTS_DIR, filename), encoding="utf-8") as f:
+                    fixtures[f"export:{filename[:-3]}"] = f.read()
+
+    for name, options in SYNTHETIC_FIXTURES.items():
+        fixtures[name] = generate_conversation(**options)
+    return fixtures
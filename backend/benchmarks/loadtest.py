@@ -0,0 +1,385 @@
+"""
+Load-test harness for the ConvoCanvas API
+
+Drives the app in-process over ASGI (default) or a running server over HTTP,
+sweeping concurrency levels and conversation sizes:
+
+    python -m benchmarks.loadtest                                   # in-process sweep
+    python -m benchmarks.loadtest --concurrency 1,8,32 --duration 20 --fixture synthetic
+    python -m benchmarks.loadtest --spawn-uvicorn --output run.json
+    python -m benchmarks.loadtest --url http://127.0.0.1:8000 --compare baseline.json --report report.md
+
+Per cell (endpoint x fixture x concurrency) it records throughput, latency
+percentiles, error counts, RSS growth of the server process and event-loop lag.
+Event-loop lag is the app's own loop in-process; against a URL it only
+reflects the load generator.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from benchmarks.asgi import multipart_file, upload
+from benchmarks.fixtures import load_fixtures
+
+DEFAULT_ENDPOINTS = [
+    "/api/v2/conversations/analyze-enhanced",
+    "/api/v2/conversations/decisions/extract",
+    "/api/v2/conversations/canvas/generate",
+]
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def rss_bytes(pid: int) -> int:
+    """Resident set size of ``pid`` (0 where /proc is unavailable)"""
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class InProcessTarget:
+    """Send requests straight into the ASGI app on this event loop"""
+
+    name = "in-process"
+
+    def __init__(self):
+        from app.main import app
+        self.app = app
+        self.pid = os.getpid()
+
+    async def post_file(self, path: str, filename: str, content: bytes) -> Tuple[int, int]:
+        status, _, body = await upload(self.app, path, filename, content)
+        return status, len(body)
+
+    def close(self):
+        pass
+
+
+class HTTPTarget:
+    """Minimal HTTP/1.1 client for a running server (one connection per request)"""
+
+    def __init__(self, base_url: str, pid: Optional[int] = None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.name = base_url
+        self.pid = pid
+
+    async def post_file(self, path: str, filename: str, content: bytes) -> Tuple[int, int]:
+        body, content_type = multipart_file("file", filename, content)
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = (
+                f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode() + body)
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        status_line, _, rest = response.partition(b"\r\n")
+        _, _, payload = rest.partition(b"\r\n\r\n")
+        return int(status_line.split()[1]), len(payload)
+
+    def close(self):
+        pass
+
+
+class UvicornTarget(HTTPTarget):
+    """Start ``uvicorn app.main:app`` on a free local port and drive it over HTTP"""
+
+    def __init__(self, workers: int = 1, startup_timeout: float = 120.0):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+             "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        super().__init__(f"http://127.0.0.1:{port}", pid=self.process.pid)
+        self._wait_ready(startup_timeout)
+
+    def _wait_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {self.process.returncode}")
+            try:
+                with socket.create_connection((self.host, self.port), timeout=1) as s:
+                    s.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                    if s.recv(64).startswith(b"HTTP/1.1 200"):
+                        return
+            except OSError:
+                pass
+            time.sleep(0.25)
+        self.close()
+        raise RuntimeError("uvicorn did not become ready in time")
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class LoopMonitor:
+    """Samples event-loop lag (sleep overshoot) and peak RSS while a cell runs"""
+
+    def __init__(self, pid: Optional[int], interval: float = 0.01):
+        self.pid = pid
+        self.interval = interval
+        self.lags: List[float] = []
+        self.peak_rss = 0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - start - self.interval))
+            if self.pid:
+                self.peak_rss = max(self.peak_rss, rss_bytes(self.pid))
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+async def run_cell(target, path: str, filename: str, content: bytes, concurrency: int,
+                   duration: float, max_requests: Optional[int]) -> Dict:
+    """Closed-loop load: ``concurrency`` workers issue requests back to back"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    errors = 0
+    issued = 0
+    rss_before = rss_bytes(target.pid) if target.pid else 0
+    monitor = LoopMonitor(target.pid)
+    monitor.start()
+    started = time.perf_counter()
+    stop_at = started + duration
+
+    async def worker():
+        nonlocal errors, issued
+        while time.perf_counter() < stop_at and (max_requests is None or issued < max_requests):
+            issued += 1
+            t0 = time.perf_counter()
+            try:
+                status, _ = await target.post_file(path, filename, content)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+            if status >= 400:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+    await monitor.stop()
+    rss_after = rss_bytes(target.pid) if target.pid else 0
+
+    ordered = sorted(latencies)
+    lags = sorted(monitor.lags)
+    ms = 1000.0
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(latencies) / wall, 3) if wall else 0.0,
+        "latency_ms": {
+            "min": round(ordered[0] * ms, 2) if ordered else 0.0,
+            "mean": round(statistics.fmean(ordered) * ms, 2) if ordered else 0.0,
+            "p50": round(percentile(ordered, 50) * ms, 2),
+            "p95": round(percentile(ordered, 95) * ms, 2),
+            "p99": round(percentile(ordered, 99) * ms, 2),
+            "max": round(ordered[-1] * ms, 2) if ordered else 0.0,
+        },
+        "loop_lag_ms": {
+            "p50": round(percentile(lags, 50) * ms, 2),
+            "p99": round(percentile(lags, 99) * ms, 2),
+            "max": round(lags[-1] * ms, 2) if lags else 0.0,
+        },
+        "rss_mb": {
+            "before": round(rss_before / 2**20, 1),
+            "after": round(rss_after / 2**20, 1),
+            "peak": round(max(monitor.peak_rss, rss_after) / 2**20, 1),
+            "growth": round((rss_after - rss_before) / 2**20, 1),
+        },
+    }
+
+
+async def sweep(target, endpoints: Iterable[str], fixtures: Dict[str, str], levels: Iterable[int],
+                duration: float, max_requests: Optional[int], warmup: int) -> List[Dict]:
+    """Run every endpoint x fixture x concurrency cell"""
+    cells = []
+    for path in endpoints:
+        for fixture_name, text in fixtures.items():
+            content = text.encode("utf-8")
+            filename = f"{fixture_name.replace(':', '_')}.md"
+            for _ in range(warmup):
+                await target.post_file(path, filename, content)
+            for concurrency in levels:
+                result = await run_cell(target, path, filename, content, concurrency, duration, max_requests)
+                result.update({"endpoint": path, "fixture": fixture_name, "bytes": len(content),
+                               "concurrency": concurrency})
+                cells.append(result)
+                print(f"{path:45s} {fixture_name:28s} c={concurrency:<3d} "
+                      f"{result['throughput_rps']:8.2f} req/s  p50 {result['latency_ms']['p50']:8.1f} ms  "
+                      f"p99 {result['latency_ms']['p99']:8.1f} ms  lag p99 {result['loop_lag_ms']['p99']:7.1f} ms  "
+                      f"rss +{result['rss_mb']['growth']:.1f} MB  errors {result['errors']}", flush=True)
+    return cells
+
+
+def _cell_key(cell: Dict) -> Tuple[str, str, int]:
+    return cell["endpoint"], cell["fixture"], cell["concurrency"]
+
+
+def render_report(current: Dict, baseline: Optional[Dict] = None) -> str:
+    """Markdown report of a run, with ratios against a baseline run if given"""
+    meta = current["meta"]
+    lines = [
+        "# ConvoCanvas load test",
+        "",
+        f"- Target: {meta['target']}",
+        f"- Commit: {meta['commit']}",
+        f"- Date: {meta['timestamp']}",
+        f"- Python {meta['python']} on {meta['platform']} ({meta['cpu_count']} CPUs)",
+        f"- Duration per cell: {meta['duration']}s",
+        "",
+    ]
+    previous = {_cell_key(c): c for c in (baseline or {}).get("cells", [])}
+    header = "| Endpoint | Fixture | Conc. | req/s | p50 ms | p95 ms | p99 ms | loop lag p99 ms | RSS growth MB | errors |"
+    if previous:
+        header += " req/s vs base | p99 vs base |"
+        lines.append(f"Baseline: commit {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+        lines.append("")
+    lines.append(header)
+    lines.append("|" + "---|" * (header.count("|") - 1))
+
+    for cell in current["cells"]:
+        latency = cell["latency_ms"]
+        row = (f"| {cell['endpoint']} | {cell['fixture']} | {cell['concurrency']} | {cell['throughput_rps']} "
+               f"| {latency['p50']} | {latency['p95']} | {latency['p99']} | {cell['loop_lag_ms']['p99']} "
+               f"| {cell['rss_mb']['growth']} | {cell['errors']} |")
+        if previous:
+            old = previous.get(_cell_key(cell))
+            if old and old["throughput_rps"] and old["latency_ms"]["p99"]:
+                row += (f" x{cell['throughput_rps'] / old['throughput_rps']:.2f} "
+                        f"| x{latency['p99'] / old['latency_ms']['p99']:.2f} |")
+            else:
+                row += " n/a | n/a |"
+        lines.append(row)
+    return "\n".join(lines) + "\n"
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ConvoCanvas load-test harness")
+    parser.add_argument("--url", help="Drive a running server instead of the in-process app")
+    parser.add_argument("--spawn-uvicorn", action="store_true", help="Start a local uvicorn and drive it")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn-uvicorn")
+    parser.add_argument("--endpoint", action="append", help="Endpoint path (repeatable)")
+    parser.add_argument("--fixture", default="", help="Only use fixtures whose name contains this")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per cell")
+    parser.add_argument("--max-requests", type=int, help="Stop a cell after this many requests")
+    parser.add_argument("--warmup", type=int, default=1, help="Requests per endpoint/fixture before measuring")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--report", help="Write a markdown report here (printed otherwise)")
+    args = parser.parse_args(argv)
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    endpoints = args.endpoint or DEFAULT_ENDPOINTS
+    fixtures = {k: v for k, v in load_fixtures().items() if args.fixture in k}
+    if not fixtures:
+        parser.error(f"No fixtures match {args.fixture!r}")
+
+    if args.spawn_uvicorn:
+        target = UvicornTarget(workers=args.workers)
+    elif args.url:
+        target = HTTPTarget(args.url)
+    else:
+        target = InProcessTarget()
+
+    try:
+        cells = asyncio.run(sweep(target, endpoints, fixtures, levels, args.duration, args.max_requests, args.warmup))
+    finally:
+        target.close()
+
+    results = {
+        "meta": {
+            "target": target.name,
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "duration": args.duration,
+            "concurrency": levels,
+        },
+        "cells": cells,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    report = render_report(results, baseline)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(report)
+        print(f"Report written to {args.report}")
+    else:
+        print()
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
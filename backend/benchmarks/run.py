@@ -0,0 +1,330 @@
+"""
+Benchmark runner for the ConvoCanvas analysis pipeline (asv-style)
+
+    python -m benchmarks.run                                  # everything
+    python -m benchmarks.run --filter pipeline --fixture synthetic-small
+    python -m benchmarks.run --output new.json --compare baseline.json --fail-on-regression
+
+Each benchmark is a setup function that receives a fixture's text and returns
+the zero-argument callable to time; setup work is never timed. Results are
+written as JSON so runs can be compared over time.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import platform
+import argparse
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Tuple
+
+from benchmarks.asgi import upload
+from benchmarks.fixtures import load_fixtures
+
+BENCHMARKS: List[Tuple[str, Callable[[str], Callable[[], object]]]] = []
+
+
+def benchmark(name: str):
+    """Register a benchmark setup function"""
+    def decorator(setup: Callable[[str], Callable[[], object]]):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return decorator
+
+
+def _pipeline():
+    from app.core.analysis_pipeline import get_analysis_pipeline
+    return get_analysis_pipeline()
+
+
+def _prepared_messages(text: str, *stages: str) -> List[Dict]:
+    return _pipeline().run(text, list(stages) or ["parse"]).messages
+
+
+# Analyzer stages -------------------------------------------------------------
+
+@benchmark("pipeline.parse")
+def bench_parse(text):
+    analyzer = _pipeline().analyzer
+    return lambda: analyzer.split_dialogue(text)
+
+
+@benchmark("pipeline.segment")
+def bench_segment(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text)
+    return lambda: analyzer.segment_messages(messages)
+
+
+@benchmark("pipeline.domains")
+def bench_domains(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text)
+    return lambda: analyzer.classify_message_domains(messages)
+
+
+@benchmark("pipeline.sentiment")
+def bench_sentiment(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text, "segment")
+    return lambda: analyzer.analyze_message_sentiment(messages)
+
+
+@benchmark("pipeline.entities")
+def bench_entities(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text, "segment")
+    return lambda: analyzer.extract_message_entities(messages)
+
+
+@benchmark("pipeline.decisions")
+def bench_decisions(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text, "segment", "domains")
+    return lambda: analyzer.extract_decisions_guarded(messages, enrich=False, deadline_seconds=0)
+
+
+@benchmark("pipeline.decision_details")
+def bench_decision_details(text):
+    context = _pipeline().run(text, ["decisions"])
+    return lambda: _pipeline().analyzer.enrich_decisions(context.decisions)
+
+
+@benchmark("pipeline.topics")
+def bench_topics(text):
+    context = _pipeline().run(text, ["sentiment", "domains", "decisions"])
+    return lambda: _pipeline().analyzer.generate_enhanced_content_ideas(context.messages, context.decisions)
+
+
+@benchmark("pipeline.mindmap")
+def bench_mindmap(text):
+    context = _pipeline().run(text, ["decisions"])
+    return lambda: _pipeline().analyzer.create_decision_mindmap(context.decisions)
+
+
+@benchmark("pipeline.full")
+def bench_full_pipeline(text):
+    outputs = ["sentiment", "entities", "decision_details", "mindmap", "topics"]
+    return lambda: _pipeline().run(text, outputs)
+
+
+@benchmark("dedup.minhash")
+def bench_dedup(text):
+    analyzer, messages = _pipeline().analyzer, _prepared_messages(text, "segment", "domains")
+    raw = analyzer.extract_decisions_guarded(messages, deduplicate=False, enrich=False, deadline_seconds=0)
+    return lambda: analyzer.deduplicator.deduplicate(raw["decisions"])
+
+
+# GPU analyzers (CPU without torch; need the spaCy model, recorded as errors without it) ---------
+
+@benchmark("gpu.simple_analysis")
+def bench_gpu_simple(text):
+    from app.core.simple_gpu_analyzer import get_simple_gpu_analyzer
+    analyzer = get_simple_gpu_analyzer()
+    return lambda: analyzer.analyze_conversation_simple(text)
+
+
+@benchmark("gpu.dialogue_and_decisions")
+def bench_gpu_dialogue_and_decisions(text):
+    # The /analyze-gpu flow: dialogue then decisions, sharing one GPU pass
+    from app.core.gpu_analyzer_integration import GPUEnhancedContentAnalyzer
+    analyzer = GPUEnhancedContentAnalyzer()
+
+    def call():
+        analyzer.extract_decisions(analyzer.extract_user_claude_dialogue(text))
+    return call
+
+
+# Transformer inference backends (PyTorch vs ONNX Runtime int8, CPU) ------------------
+
+def _transformer_pipeline(task: str, backend: str):
+    model = "distilbert-base-uncased-finetuned-sst-2-english" if task == "sentiment-analysis" else \
+        os.getenv("SUMMARY_MODEL_CPU", "sshleifer/distilbart-cnn-6-6")
+    if backend == "onnx":
+        from app.core.onnx_backend import get_onnx_store
+        return get_onnx_store().pipeline(task, model)
+    from transformers import pipeline
+    return pipeline(task, model=model, device=-1)
+
+
+def _inference_benchmark(task: str, backend: str):
+    def setup(text):
+        from app.core.batched_inference import get_batched_inference
+        from app.core.map_reduce_summarizer import MapReduceSummarizer, SummaryCache
+        pipe, messages = _transformer_pipeline(task, backend), _prepared_messages(text)
+        if task == "sentiment-analysis":
+            return lambda: get_batched_inference().sentiment_by_message(pipe, messages)
+        # Fresh cache per call so every chunk is actually summarized
+        return lambda: MapReduceSummarizer(cache=SummaryCache()).summarize(pipe, messages)
+    return setup
+
+
+for _task in ["sentiment-analysis", "summarization"]:
+    for _backend in ["torch", "onnx"]:
+        benchmark(f"inference.{_task.split('-')[0]}.{_backend}")(_inference_benchmark(_task, _backend))
+
+
+# Generators --------------------------------------------------------------------
+
+@benchmark("generator.canvas")
+def bench_canvas(text):
+    from app.core.canvas_generator import CanvasDecisionVisualizer
+    decisions, visualizer = _pipeline().run(text, ["decisions"]).decisions, CanvasDecisionVisualizer()
+    return lambda: visualizer.create_decision_canvas(decisions, "Benchmark")
+
+
+@benchmark("generator.excalidraw")
+def bench_excalidraw(text):
+    from app.core.canvas_generator import ExcalidrawDecisionVisualizer
+    decisions, visualizer = _pipeline().run(text, ["decisions"]).decisions, ExcalidrawDecisionVisualizer()
+    return lambda: visualizer.create_decision_excalidraw(decisions, "Benchmark")
+
+
+# Endpoints (in-process ASGI, no network) ------------------------------------------
+
+def _endpoint_benchmark(path: str):
+    def setup(text):
+        from app.main import app
+        content = text.encode("utf-8")
+
+        def call():
+            status, _, body = asyncio.run(upload(app, path, "benchmark.md", content))
+            if status != 200:
+                raise RuntimeError(f"{path} returned {status}: {body[:200]!r}")
+        return call
+    return setup
+
+
+for _path in ["analyze-enhanced", "decisions/extract", "mindmap/generate", "canvas/generate", "excalidraw/generate"]:
+    benchmark(f"endpoint.{_path.replace('/', '.')}")(_endpoint_benchmark(f"/api/v2/conversations/{_path}"))
+
+
+# Harness -------------------------------------------------------------------------
+
+def measure(func: Callable[[], object], repeat: int, warmup: int, min_time: float) -> Dict[str, float]:
+    """Time ``func``: warm up, calibrate calls per sample, then collect ``repeat`` samples"""
+    for _ in range(warmup):
+        func()
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1000:
+            break
+        number *= 10
+
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - start) / number)
+
+    ordered = sorted(samples)
+    return {
+        "min": ordered[0],
+        "median": statistics.median(ordered),
+        "mean": statistics.fmean(ordered),
+        "p95": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "repeat": len(ordered),
+        "number": number,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(name_filter: str = "", fixture_filter: str = "", repeat: int = 5, warmup: int = 1,
+                   min_time: float = 0.05) -> Dict:
+    """Run all matching benchmarks against all matching fixtures"""
+    fixtures = {k: v for k, v in load_fixtures().items() if fixture_filter in k}
+    results: Dict[str, Dict[str, Dict]] = {}
+
+    for name, setup in BENCHMARKS:
+        if name_filter not in name:
+            continue
+        for fixture_name, text in fixtures.items():
+            try:
+                stats = measure(setup(text), repeat, warmup, min_time)
+            except Exception as e:
+                stats = {"error": str(e)}
+            results.setdefault(name, {})[fixture_name] = stats
+            summary = f"{stats['median'] * 1000:10.2f} ms" if "median" in stats else f"ERROR {stats['error']}"
+            print(f"{name:40s} {fixture_name:45s} {summary}", flush=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "warmup": warmup,
+            "fixtures": {name: len(text) for name, text in fixtures.items()},
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.10) -> List[Dict]:
+    """Median ratios (current / baseline) for every benchmark present in both runs"""
+    rows = []
+    for name, by_fixture in current["results"].items():
+        for fixture, stats in by_fixture.items():
+            old = baseline.get("results", {}).get(name, {}).get(fixture)
+            if not old or "median" not in old or "median" not in stats or old["median"] <= 0:
+                continue
+            ratio = stats["median"] / old["median"]
+            rows.append({
+                "benchmark": name,
+                "fixture": fixture,
+                "baseline_ms": old["median"] * 1000,
+                "current_ms": stats["median"] * 1000,
+                "ratio": ratio,
+                "status": "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "same",
+            })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ConvoCanvas benchmark suite")
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--fixture", default="", help="Only use fixtures whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per sample")
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Relative change treated as significant")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.filter, args.fixture, args.repeat, args.warmup, args.min_time)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        rows = compare(baseline, results, args.threshold)
+        print(f"\nComparison against {args.compare} (commit {baseline.get('meta', {}).get('commit', '?')[:10]}):")
+        for row in rows:
+            print(f"  {row['benchmark']:40s} {row['fixture']:45s} "
+                  f"{row['baseline_ms']:9.2f} -> {row['current_ms']:9.2f} ms  x{row['ratio']:.2f}  {row['status']}")
+        if args.fail_on_regression and any(row["status"] == "regression" for row in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
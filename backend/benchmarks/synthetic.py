@@ -0,0 +1,94 @@
+"""
+Seeded synthetic conversation generator
+Produces Save My Chatbot-style markdown exports of configurable size, code
+ratio and decision density so benchmark inputs are reproducible
+"""
+import random
+from typing import List, Optional
+
+TECH_TERMS = [
+    "FastAPI", "Docker", "Kubernetes", "GitLab CI", "Terraform", "Ansible", "Grafana",
+    "Prometheus", "MPLS", "BGP", "OSPF", "Redis", "PostgreSQL", "React", "Next.js",
+    "Obsidian", "spaCy", "pytest", "nginx", "the API gateway", "the CI/CD pipeline",
+]
+SUBJECTS = ["The backend", "Our network team", "This pipeline", "The parser", "The new service", "Monitoring"]
+VERBS = ["needs", "should support", "depends on", "integrates with", "replaces", "talks to"]
+OBJECTS = [
+    "automated testing", "configuration drift detection", "real-time dashboards",
+    "zero-downtime deploys", "structured logging", "a canary rollout", "the legacy VPN config",
+]
+DECISION_TEMPLATES = [
+    "Let's go with {term} for {obj}.",
+    "We decided to use {term} to handle {obj}.",
+    "Final: adopt {term} for {obj} across all environments.",
+    "I recommend {term} because it simplifies {obj}.",
+    "Approach: standardise on {term} and revisit {obj} next sprint.",
+]
+CODE_SNIPPETS = {
+    "python": "def handle_{name}(request):\n    config = load_config('{name}')\n    return process(request, config)\n",
+    "bash": "$ docker build -t {name} .\n$ docker run -p 8000:8000 {name}\n",
+    "yaml": "{name}:\n  image: registry/{name}:latest\n  replicas: 3\n",
+    "json": '{{"service": "{name}", "port": 8000, "enabled": true}}\n',
+}
+
+
+class SyntheticConversationGenerator:
+    """Generates reproducible conversation exports from a seed"""
+
+    def __init__(self, seed: int = 42):
+        self.seed = seed
+
+    def generate(self, messages: int = 20, target_chars: Optional[int] = None, code_ratio: float = 0.2,
+                 decision_density: float = 0.3, title: str = "Synthetic Conversation") -> str:
+        """
+        Build a conversation export
+
+        Args:
+            messages: Number of User/Claude messages
+            target_chars: Approximate total size; sentences are added until reached
+            code_ratio: Probability that a Claude message contains a fenced code block
+            decision_density: Probability that a sentence is a decision statement
+            title: Conversation title for the header
+        """
+        rng = random.Random(self.seed)
+        per_message = max(200, (target_chars or messages * 600) // max(messages, 1))
+
+        parts = [
+            f"# {title}",
+            "Exported on 01/01/2025 at 12:00:00 [from Claude Chat](https://claude.ai/chat/synthetic) "
+            "- with [SaveMyChatbot](https://save.hugocollin.com)",
+            "",
+        ]
+        for index in range(messages):
+            role = "User" if index % 2 == 0 else "Claude"
+            parts.append(f"## {role}")
+            parts.append(self._message(rng, per_message, role == "Claude" and rng.random() < code_ratio,
+                                       decision_density))
+            parts.append("")
+        return "\n".join(parts)
+
+    def _message(self, rng: random.Random, size: int, with_code: bool, decision_density: float) -> str:
+        sentences: List[str] = []
+        length = 0
+        while length < size:
+            sentence = self._sentence(rng, decision_density)
+            sentences.append(sentence)
+            length += len(sentence) + 1
+
+        text = " ".join(sentences)
+        if with_code:
+            language = rng.choice(sorted(CODE_SNIPPETS))
+            name = rng.choice(["gateway", "parser", "collector", "router_sync"])
+            code = CODE_SNIPPETS[language].format(name=name)
+            text = f"{text}\n\n```{language}\n{code}```\n\nThat should get you started."
+        return text
+
+    def _sentence(self, rng: random.Random, decision_density: float) -> str:
+        if rng.random() < decision_density:
+            return rng.choice(DECISION_TEMPLATES).format(term=rng.choice(TECH_TERMS), obj=rng.choice(OBJECTS))
+        return f"{rng.choice(SUBJECTS)} {rng.choice(VERBS)} {rng.choice(TECH_TERMS)} for {rng.choice(OBJECTS)}."
+
+
+def generate_conversation(seed: int = 42, **kwargs) -> str:
+    """Convenience wrapper around SyntheticConversationGenerator.generate"""
+    return SyntheticConversationGenerator(seed).generate(**kwargs)
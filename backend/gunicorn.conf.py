@@ -0,0 +1,48 @@
+"""
+Gunicorn configuration for ConvoCanvas: pre-fork model serving
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+With preload_app the master imports the app and loads the models (see
+app/core/prefork.py) before forking, so workers share them copy-on-write
+instead of each holding a private copy. GUNICORN_PRELOAD=false restores
+per-worker loading. Metrics from all workers are aggregated through
+CONVOCANVAS_METRICS_DIR.
+"""
+import os
+import glob
+
+# Must be set before the app (and its metrics registry) is imported
+os.environ.setdefault("CONVOCANVAS_METRICS_DIR", "/tmp/convocanvas-metrics")
+
+bind = f"{os.getenv('API_HOST', '0.0.0.0')}:{os.getenv('API_PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+
+def on_starting(server):
+    # Samples of workers from a previous run would otherwise be aggregated
+    for path in glob.glob(os.path.join(os.environ["CONVOCANVAS_METRICS_DIR"], "metrics_*.json")):
+        os.remove(path)
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before the first fork
+    if preload_app:
+        from app.core.prefork import freeze_heap, preload_models
+        preload_models()
+        freeze_heap()
+        # The workers report the preloaded models they inherit; were the master
+        # to publish too, each model would be counted once more
+        from app.core.metrics import metrics
+        metrics.stop_publishing()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app.core.prefork import after_fork
+        after_fork()
@@ -0,0 +1,99 @@
+"""Token-aware chunking and length-sorted batched inference (fake pipelines, no torch needed)"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.batched_inference import BatchedInference, TokenChunker
+
+
+class FakeClassifier:
+    """Stands in for a text-classification pipeline; records the batches it is given"""
+
+    tokenizer = None
+
+    def __init__(self, label=lambda text: ("NEGATIVE", 1.0) if "bad" in text else ("POSITIVE", 1.0),
+                 wrap=False):
+        self.label = label
+        self.wrap = wrap
+        self.batches = []
+
+    def __call__(self, texts, batch_size=None, truncation=True, **kwargs):
+        self.batches.append(list(texts))
+        outputs = []
+        for text in texts:
+            label, score = self.label(text)
+            output = {"label": label, "score": score, "text": text}
+            outputs.append([output] if self.wrap else output)
+        return outputs
+
+
+def _sentence(words, word="word"):
+    return " ".join([word] * (words - 1) + [word + "."])
+
+
+@pytest.mark.parametrize("wrap", [False, True])
+def test_run_returns_outputs_in_input_order(wrap):
+    pipe = FakeClassifier(wrap=wrap)
+    texts = ["a" * length for length in (3, 10, 1, 7, 5)]
+    outputs = BatchedInference(batch_size=2).run(pipe, texts)
+
+    assert [output["text"] for output in outputs] == texts
+    # Batches are length-sorted, longest first
+    assert pipe.batches == [["a" * 10, "a" * 7], ["a" * 5, "a" * 3], ["a"]]
+
+
+def test_run_sorts_by_given_lengths():
+    pipe = FakeClassifier()
+    BatchedInference(batch_size=2).run(pipe, ["x", "y", "z"], lengths=[1, 30, 20])
+    assert pipe.batches == [["y", "z"], ["x"]]
+    assert BatchedInference().run(pipe, []) == []
+
+
+def test_chunks_respect_max_tokens():
+    chunker = TokenChunker(max_tokens=40)
+    text = " ".join(_sentence(words) for words in (10, 20, 5, 25, 12, 3))
+    chunks = chunker.chunk(text)
+
+    assert len(chunks) > 1
+    assert all(tokens <= 40 for _, tokens in chunks)
+    # Reported counts are sums of sentence counts, never below a recount of the chunk
+    assert all(tokens >= recount for (_, tokens), recount in zip(chunks, chunker.count([c for c, _ in chunks])))
+    # Nothing is lost or reordered
+    assert " ".join(chunk for chunk, _ in chunks).split() == text.split()
+
+
+def test_overlong_sentence_is_split():
+    chunker = TokenChunker(max_tokens=20)
+    sentence = " ".join(f"w{i}" for i in range(100))
+    chunks = chunker.chunk(sentence)
+
+    assert len(chunks) > 1
+    assert all(tokens <= 20 for _, tokens in chunks)
+    assert " ".join(chunk for chunk, _ in chunks).split() == sentence.split()
+
+
+def test_sentiment_is_token_weighted_per_message():
+    chunker = TokenChunker(max_tokens=510)
+    long_good = " ".join(_sentence(30, "good") for _ in range(30))
+    short_bad = _sentence(5, "bad")
+    messages = [
+        {"role": "user", "content": long_good + " " + short_bad},
+        {"role": "claude", "content": ""},
+        {"role": "user", "content": short_bad},
+    ]
+    result = BatchedInference(batch_size=4).sentiment_by_message(FakeClassifier(), messages)
+
+    # The empty message gets no entry
+    assert [entry["message_index"] for entry in result["messages"]] == [0, 2]
+    first, third = result["messages"]
+    chunks = chunker.chunk(messages[0]["content"])
+    assert first["chunks"] == len(chunks) > 1
+    good = sum(tokens for text, tokens in chunks if "bad" not in text)
+    bad = sum(tokens for text, tokens in chunks if "bad" in text)
+    assert first["polarity"] == pytest.approx((good - bad) / (good + bad))
+    assert first["label"] == "POSITIVE"
+    assert third["polarity"] == -1.0 and third["label"] == "NEGATIVE"
+    assert result["chunks"] == first["chunks"] + 1
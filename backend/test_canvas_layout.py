@@ -0,0 +1,118 @@
+"""Canvas layout engine (grouping, collapsing, pagination, packing) and paginated canvas output"""
+
+import os
+import sys
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.canvas_generator import CanvasDecisionVisualizer
+from app.core.canvas_layout import CanvasLayoutEngine
+
+engine = CanvasLayoutEngine(node_width=300, node_height=150, gap=50)
+
+
+def _decisions(count, domains=("automation", "networking", "monitoring")):
+    return [
+        {"id": f"decision_{i}", "text": f"use tool number {i} for the pipeline", "message_index": i // 3,
+         "role": "user" if i % 2 == 0 else "claude", "technical_domains": [domains[i % len(domains)]],
+         "confidence": 0.5}
+        for i in range(count)
+    ]
+
+
+def _overlaps(a, b, width=300, height=150):
+    return a[0] < b[0] + width and b[0] < a[0] + width and a[1] < b[1] + height and b[1] < a[1] + height
+
+
+def test_group_by_domain_and_message():
+    decisions = _decisions(7)
+    by_domain = engine.group_decisions(decisions, "domain")
+    assert [group.key for group in by_domain] == ["automation", "networking", "monitoring"]
+    assert by_domain[0].indices == [0, 3, 6]
+
+    by_message = engine.group_decisions(decisions, "message")
+    assert [group.indices for group in by_message] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert by_message[0].label == "Message 1 (user)"
+
+    with pytest.raises(ValueError):
+        engine.group_decisions(decisions, "colour")
+
+
+def test_collapse_counts_one_node():
+    groups = engine.collapse(engine.group_decisions(_decisions(9), "domain"), threshold=2)
+    assert all(group.collapsed for group in groups)
+    assert sum(group.node_count for group in groups) == 3
+
+
+def test_paginate_keeps_groups_whole_and_splits_oversized_ones():
+    groups = engine.group_decisions(_decisions(12), "domain")
+    pages = engine.paginate(groups, max_nodes=8)
+    assert [[group.key for group in page] for page in pages] == [["automation", "networking"], ["monitoring"]]
+
+    big = engine.group_decisions(_decisions(10), "none")
+    pages = engine.paginate(big, max_nodes=4)
+    assert [[len(group.indices) for group in page] for page in pages] == [[4], [4], [2]]
+    assert pages[0][0].label == "Decisions (1/3)"
+    assert engine.paginate(big, max_nodes=0) == [big]
+
+
+def test_layout_places_every_node_without_overlap():
+    groups = engine.group_decisions(_decisions(40), "domain")
+    width, height = engine.layout(groups, origin=(200, 300))
+    positions = [position for group in groups for position in group.positions]
+    assert len(positions) == 40
+    assert all(200 <= x and x + 300 <= 200 + width and 300 <= y and y + 150 <= 300 + height for x, y in positions)
+    for i, a in enumerate(positions):
+        assert not any(_overlaps(a, b) for b in positions[i + 1:])
+
+
+def test_layout_snake_order_keeps_neighbours_adjacent():
+    group = engine.group_decisions(_decisions(9), "none")[0]
+    engine.layout([group], framed=False)
+    for a, b in zip(group.positions, group.positions[1:]):
+        assert abs(a[0] - b[0]) + abs(a[1] - b[1]) in (350, 200)
+
+
+def test_canvas_page_is_standalone_json():
+    visualizer = CanvasDecisionVisualizer()
+    decisions = _decisions(12)
+    canvas_json, pages = visualizer.create_decision_canvas_page(decisions, "Big", page=2, max_nodes=5)
+    canvas = json.loads(canvas_json)
+    assert pages == 3
+    decision_nodes = [node for node in canvas["nodes"] if node["id"].startswith("decision-")]
+    assert len(decision_nodes) == 5
+    assert not any(node["type"] == "file" for node in canvas["nodes"])
+    with pytest.raises(ValueError):
+        visualizer.create_decision_canvas_page(decisions, "Big", page=4, max_nodes=5)
+
+
+@pytest.fixture
+def client():
+    from app.main import app
+    return TestClient(app)
+
+
+def _conversation(count):
+    sentences = " ".join(f"We decided to use tool{i} for stage{i} of the pipeline." for i in range(count))
+    return ("## User\n" + sentences).encode("utf-8")
+
+
+def test_canvas_endpoint_returns_json_pages_by_default(client):
+    files = {"file": ("big-chat.md", _conversation(12), "text/markdown")}
+    response = client.post("/api/v2/conversations/canvas/generate?max_nodes=5", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["X-Canvas-Pages"] == "3"
+    assert response.headers["X-Canvas-Page"] == "1"
+    assert "page=2" in response.headers["X-Canvas-Next"]
+    assert json.loads(response.content)["nodes"]
+
+    last = client.post("/api/v2/conversations/canvas/generate?max_nodes=5&page=3", files=files)
+    assert last.status_code == 200 and "X-Canvas-Next" not in last.headers
+    assert client.post("/api/v2/conversations/canvas/generate?max_nodes=5&page=9", files=files).status_code == 404
+
+    archive = client.post("/api/v2/conversations/canvas/generate?max_nodes=5&output=zip", files=files)
+    assert archive.headers["content-type"] == "application/zip"
@@ -0,0 +1,140 @@
+"""Incremental canvas / Excalidraw sync: minimal changes, stable ids, user layout kept"""
+
+import os
+import sys
+import json
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.canvas_generator import CanvasDecisionVisualizer, ExcalidrawDecisionVisualizer
+from app.core.canvas_sync import CanvasSynchronizer
+
+sync = CanvasSynchronizer()
+
+
+def _decision(text, role="user", confidence=0.6):
+    return {"text": text, "role": role, "confidence": confidence, "technical_domains": ["automation"],
+            "message_index": 0}
+
+
+DECISIONS = [_decision(f"use tool {name} for the pipeline") for name in ("alpha", "beta", "gamma", "delta")]
+
+
+def _nodes(canvas_json):
+    return {node["id"]: node for node in json.loads(canvas_json)["nodes"]}
+
+
+def _decision_ids(canvas_json):
+    return [node_id for node_id in _nodes(canvas_json) if node_id.startswith("decision-")]
+
+
+def _initial():
+    content, _ = sync.update_canvas("", DECISIONS, "Chat")
+    return content
+
+
+def test_unchanged_decisions_return_the_same_bytes():
+    existing = _initial()
+    content, stats = sync.update_canvas(existing, [dict(d) for d in DECISIONS], "Chat")
+    assert content is existing
+    assert stats["changed"] is False and stats["updated"] == 0 and stats["added"] == 0
+
+
+def test_insert_only_adds_the_new_node():
+    existing = _initial()
+    content, stats = sync.update_canvas(existing, [_decision("adopt Grafana dashboards")] + DECISIONS, "Chat")
+    assert stats["added"] == 1 and stats["removed"] == 0
+    # Only the decision count in the title and the summary totals change
+    assert stats["updated"] == 2
+    before, after = _nodes(existing), _nodes(content)
+    assert all(after[node_id] == node for node_id, node in before.items() if node_id.startswith("decision-"))
+    assert len(_decision_ids(content)) == 5
+
+
+def test_delete_removes_node_and_its_edges():
+    existing = _initial()
+    removed_id = _decision_ids(existing)[1]
+    content, stats = sync.update_canvas(existing, DECISIONS[:1] + DECISIONS[2:], "Chat")
+    assert stats["removed"] == 1 and stats["added"] == 0
+    canvas = json.loads(content)
+    assert removed_id not in _nodes(content)
+    assert not any(removed_id in (edge["fromNode"], edge["toNode"]) for edge in canvas["edges"])
+
+
+def test_reorder_keeps_nodes_and_rewires_edges():
+    existing = _initial()
+    reordered = DECISIONS[::-1]
+    content, stats = sync.update_canvas(existing, reordered, "Chat")
+    assert stats["added"] == stats["removed"] == 0
+    assert sorted(_decision_ids(content)) == sorted(_decision_ids(existing))
+    assert all(_nodes(content)[node_id] == node for node_id, node in _nodes(existing).items()
+               if node_id.startswith("decision-"))
+    edges = {(edge["fromNode"], edge["toNode"]) for edge in json.loads(content)["edges"]}
+    ids = _decision_ids(existing)
+    assert (ids[3], ids[2]) in edges and (ids[0], ids[1]) not in edges
+
+
+def test_user_positions_and_nodes_are_preserved():
+    canvas = json.loads(_initial())
+    moved_id = _decision_ids(json.dumps(canvas))[0]
+    for node in canvas["nodes"]:
+        if node["id"] == moved_id:
+            node["x"], node["y"] = -900, -900
+    canvas["nodes"].append({"id": "my-note", "type": "text", "text": "mine", "x": 5000, "y": 5000,
+                            "width": 100, "height": 100})
+    canvas["edges"].append({"id": "e1", "fromNode": "my-note", "toNode": moved_id})
+
+    content, stats = sync.update_canvas(json.dumps(canvas), DECISIONS + [_decision("add alerting")], "Chat")
+    nodes = _nodes(content)
+    assert (nodes[moved_id]["x"], nodes[moved_id]["y"]) == (-900, -900)
+    assert nodes["my-note"]["text"] == "mine"
+    assert any(edge["id"] == "e1" for edge in json.loads(content)["edges"])
+    assert stats["added"] == 1
+
+
+def test_numbered_files_are_not_rewritten_for_their_ordinals():
+    existing = CanvasDecisionVisualizer().create_decision_canvas(DECISIONS, "Chat")
+    assert "Decision #1" in existing
+    content, stats = sync.update_canvas(existing, DECISIONS, "Chat")
+    assert content is existing and stats["updated"] == 0
+
+
+def test_excalidraw_insert_and_unchanged():
+    existing = ExcalidrawDecisionVisualizer(number_decisions=False).create_decision_excalidraw(DECISIONS, "Chat")
+    content, stats = sync.update_excalidraw(existing, DECISIONS, "Chat")
+    assert content is existing and stats["changed"] is False
+
+    content, stats = sync.update_excalidraw(existing, [_decision("adopt Grafana dashboards")] + DECISIONS, "Chat")
+    # A rectangle and a text element for the new decision; only the title's count changes
+    assert stats["added"] == 2 and stats["updated"] == 1 and stats["removed"] == 0
+
+
+def test_excalidraw_keeps_elements_the_user_deleted():
+    existing = ExcalidrawDecisionVisualizer(number_decisions=False).create_decision_excalidraw(DECISIONS, "Chat")
+    scene, compressed = sync.parse_excalidraw(existing)
+    elements = scene["elements"]
+    deleted = [e["id"] for e in elements if "convocanvas" in (e.get("customData") or {})][:2]
+    for element in elements:
+        if element["id"] in deleted:
+            element["isDeleted"] = True
+    edited = sync.excalidraw._render_file(elements, "Chat - Decision Flow Visualization", compressed)
+
+    content, stats = sync.update_excalidraw(edited, DECISIONS, "Chat")
+    assert content is edited and stats["updated"] == 0
+
+    content, _ = sync.update_excalidraw(edited, [_decision("adopt Grafana dashboards")] + DECISIONS, "Chat")
+    elements = {e["id"]: e for e in sync.parse_excalidraw(content)[0]["elements"]}
+    assert all(elements[element_id]["isDeleted"] for element_id in deleted)
+
+
+def test_update_file_writes_only_on_change(tmp_path):
+    path = tmp_path / "Chat.canvas"
+    path.write_text(_initial(), encoding="utf-8")
+    mtime = path.stat().st_mtime_ns
+    os.utime(path, ns=(mtime - 10_000_000, mtime - 10_000_000))
+    stale = path.stat().st_mtime_ns
+
+    assert sync.update_file(str(path), DECISIONS, "Chat")["changed"] is False
+    assert path.stat().st_mtime_ns == stale
+
+    assert sync.update_file(str(path), DECISIONS[:2], "Chat")["changed"] is True
+    assert len(_decision_ids(path.read_text(encoding="utf-8"))) == 2
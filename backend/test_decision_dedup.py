@@ -0,0 +1,101 @@
+"""Near-duplicate decision merging: what merges, what stays apart, and the provenance kept"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.decision_dedup import MinHashLSHDeduplicator, deduplicate_decisions
+
+
+def _decision(text, message_index=0, role="user", confidence=0.5):
+    return {"id": f"decision_{message_index}", "text": text, "message_index": message_index,
+            "role": role, "confidence": confidence}
+
+
+def test_true_near_duplicates_merge():
+    decisions = [
+        _decision("Let's go with GitLab CI/CD approach", 0, "user"),
+        _decision("go with GitLab CI/CD approach.", 1, "claude", confidence=0.7),
+        _decision("Let's go with GitLab CI/CD", 2, "user"),
+    ]
+    merged = deduplicate_decisions(decisions)
+    assert len(merged) == 1
+    assert merged[0]["text"] == "Let's go with GitLab CI/CD approach"
+    assert merged[0]["confidence"] == 0.7
+    assert [o["message_index"] for o in merged[0]["occurrences"]] == [0, 1, 2]
+
+
+def test_distinct_technologies_stay_separate():
+    decisions = [
+        _decision("go with Docker for real-time dashboards", 0),
+        _decision("go with Redis for real-time dashboards", 1),
+        _decision("go with Grafana for real-time dashboards", 2),
+    ]
+    assert len(deduplicate_decisions(decisions)) == 3
+
+
+def test_word_order_is_significant():
+    decisions = [
+        _decision("deploy to staging first and then production", 0),
+        _decision("deploy to production first and then staging", 1),
+    ]
+    assert len(deduplicate_decisions(decisions)) == 2
+
+
+def test_no_transitive_chaining():
+    # Each text differs from the previous one by one word, so neighbours are near-duplicates,
+    # but every step drifts further from the first text
+    words = ("we decided to move the whole monitoring stack for the core network onto prometheus "
+             "and grafana with alertmanager routing pages to the on call rotation after review").split()
+    texts = [" ".join(words)]
+    for position, replacement in [(5, "entire"), (15, "influxdb"), (25, "oncall")]:
+        words = list(words)
+        words[position] = replacement
+        texts.append(" ".join(words))
+
+    dedup = MinHashLSHDeduplicator()
+    assert all(dedup.similarity(a, b) >= dedup.threshold for a, b in zip(texts, texts[1:]))
+    assert dedup.similarity(texts[0], texts[-1]) < dedup.threshold
+
+    clusters = dedup.find_clusters(texts)
+    assert len(clusters) > 1
+    for members in clusters:
+        representative = texts[members[0]]
+        assert all(dedup.similarity(representative, texts[i]) >= dedup.threshold for i in members)
+
+
+def test_ids_are_renumbered_and_occurrences_counted():
+    decisions = [
+        _decision("use Terraform for network provisioning", 0),
+        _decision("adopt Prometheus alerting for BGP sessions", 1),
+        _decision("use Terraform for network provisioning!", 2, "claude"),
+        _decision("migrate the CI runners to Kubernetes", 3),
+    ]
+    merged = deduplicate_decisions(decisions)
+    assert [d["id"] for d in merged] == ["decision_0", "decision_1", "decision_2"]
+    assert [d["occurrence_count"] for d in merged] == [2, 1, 1]
+    assert [(o["message_index"], o["role"]) for o in merged[0]["occurrences"]] == [(0, "user"), (2, "claude")]
+    assert merged[1]["text"] == "adopt Prometheus alerting for BGP sessions"
+
+
+def test_deduplicate_across_conversations_keeps_sources():
+    merged = MinHashLSHDeduplicator().deduplicate_across({
+        "a.md": [_decision("use Terraform for network provisioning", 0)],
+        "b.md": [_decision("use Terraform for network provisioning", 4), _decision("adopt Grafana dashboards", 5)],
+    })
+    assert len(merged) == 2
+    assert [o["conversation"] for o in merged[0]["occurrences"]] == ["a.md", "b.md"]
+    assert merged[0]["occurrence_count"] == 2
+
+
+def test_exact_similarity():
+    dedup = MinHashLSHDeduplicator()
+    assert dedup.similarity("Use Docker.", "use docker") == 1.0
+    assert dedup.similarity("use docker", "") == 0.0
+
+
+def test_invalid_threshold():
+    with pytest.raises(ValueError):
+        MinHashLSHDeduplicator(threshold=0)
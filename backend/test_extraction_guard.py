@@ -0,0 +1,71 @@
+"""Decision extraction stays within its time budget, merging included"""
+
+import os
+import sys
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.enhanced_content_analyzer import EnhancedContentAnalyzer
+
+DEADLINE = 0.5
+
+
+@pytest.fixture(scope="module")
+def analyzer():
+    return EnhancedContentAnalyzer()
+
+
+def _pathological_conversation(messages: int = 20, decisions_per_message: int = 300) -> str:
+    """Quick to scan, but thousands of distinct decisions take seconds to merge"""
+    rng = random.Random(7)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    sections = []
+    for index in range(messages):
+        sentences = [
+            "We should use " + " ".join(rng.choice(vocabulary) for _ in range(12)) + "."
+            for _ in range(decisions_per_message)
+        ]
+        sections.append(f"## {'User' if index % 2 == 0 else 'Claude'}\n" + " ".join(sentences))
+    return "\n\n".join(sections)
+
+
+def _messages(analyzer, content):
+    messages = analyzer.split_dialogue(content)
+    analyzer.segment_messages(messages)
+    analyzer.classify_message_domains(messages)
+    return messages
+
+
+def test_pathological_input_stops_at_the_deadline(analyzer):
+    messages = _messages(analyzer, _pathological_conversation())
+    result = analyzer.extract_decisions_guarded(messages, deadline_seconds=DEADLINE, enrich=False)
+
+    # Judged by the budget's flags rather than wall-clock time, which flakes on loaded runners.
+    # Merging everything takes seconds, so the budget runs out (normally while merging, or
+    # still scanning on a slow machine) and the unmerged remainder is returned
+    assert result["extraction"]["truncated"] is True
+    assert result["extraction"]["deduplicated"] is False
+    assert result["decisions"]
+    assert len({d["id"] for d in result["decisions"]}) == len(result["decisions"])
+
+
+def test_dedup_cap_leaves_the_rest_unmerged(analyzer, monkeypatch):
+    monkeypatch.setattr(analyzer.extraction_guard, "max_dedup_decisions", 2)
+    content = "## User\n" + " ".join(["We should use Terraform for network provisioning."] * 4)
+    result = analyzer.extract_decisions_guarded(_messages(analyzer, content), deadline_seconds=0, enrich=False)
+
+    assert [d["occurrence_count"] for d in result["decisions"]] == [2, 1, 1]
+    assert result["extraction"]["deduplicated"] is False
+    assert result["extraction"]["truncated"] is True
+
+
+def test_small_input_is_fully_merged(analyzer):
+    content = "## User\nWe should use Terraform for network provisioning.\n\n" \
+              "## Claude\nAgreed, we should use Terraform for network provisioning."
+    result = analyzer.extract_decisions_guarded(_messages(analyzer, content), enrich=False)
+
+    assert [d["occurrence_count"] for d in result["decisions"]] == [2]
+    assert result["extraction"]["deduplicated"] is True
+    assert result["extraction"]["truncated"] is False
@@ -0,0 +1,57 @@
+"""Import-time budget for the API: `import app.main` stays fast, offline and light"""
+
+import os
+import re
+import sys
+import json
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Cumulative `python -X importtime` budget for app.main, in seconds
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", "1.5"))
+
+# Must only be imported when an analysis actually needs them
+HEAVY_MODULES = ["spacy", "nltk", "textblob", "networkx", "plotly", "sklearn", "scipy", "numpy", "pandas", "torch",
+                 "transformers"]
+
+
+def _run(code: str, *flags: str) -> subprocess.CompletedProcess:
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True,
+                          timeout=120)
+
+
+def _app_main_import_seconds() -> float:
+    result = _run("import app.main", "-X", "importtime")
+    assert result.returncode == 0, result.stderr[-2000:]
+    match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", result.stderr, re.MULTILINE)
+    assert match, "app.main missing from -X importtime output"
+    return int(match.group(1)) / 1e6
+
+
+def test_import_time_budget():
+    # Best of three, so a momentarily busy machine does not fail the build
+    best = min(_app_main_import_seconds() for _ in range(3))
+    assert best < IMPORT_TIME_BUDGET, f"import app.main took {best:.2f}s (budget {IMPORT_TIME_BUDGET:.2f}s)"
+
+
+def test_no_heavy_modules_at_import():
+    result = _run(
+        "import sys, json, app.main; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+def test_no_network_at_import():
+    result = _run(
+        "import socket\n"
+        "def refuse(*args, **kwargs):\n"
+        "    raise RuntimeError('network access during import')\n"
+        "socket.socket.connect = refuse\n"
+        "socket.create_connection = refuse\n"
+        "socket.getaddrinfo = refuse\n"
+        "import app.main\n"
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
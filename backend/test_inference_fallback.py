@@ -0,0 +1,83 @@
+"""Decision enrichment through the inference server, and the local fallback when it fails"""
+
+import os
+import sys
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import enhanced_content_analyzer
+from app.core.enhanced_content_analyzer import EnhancedContentAnalyzer
+from app.core.inference_server import InferenceServerError
+
+DECISIONS = [{"text": "use Terraform for the MPLS rollout"}, {"text": "deploy Grafana dashboards next week"}]
+
+
+class FakeClient:
+    address = "fake:0"
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = []
+
+    def _answer(self, op, texts, value):
+        self.calls.append((op, list(texts)))
+        if self.fail:
+            raise InferenceServerError("connection refused")
+        return [value(text) for text in texts]
+
+    def sentiment(self, texts):
+        return self._answer("sentiment", texts, lambda text: {"polarity": 0.5, "subjectivity": 0.1})
+
+    def entities(self, texts):
+        return self._answer("entities", texts, lambda text: [{"text": text.split()[1], "label": "ORG",
+                                                              "description": "remote"}])
+
+
+def _fake_nlp(text):
+    return SimpleNamespace(ents=[SimpleNamespace(text=text.split()[1], label_="ORG")])
+
+
+@pytest.fixture
+def loads(monkeypatch):
+    """Counts local spaCy loads (served by a stand-in model)"""
+    loads = []
+
+    def load_spacy():
+        loads.append(1)
+        return _fake_nlp
+
+    monkeypatch.setattr(enhanced_content_analyzer, "get_nlp_resources", lambda: SimpleNamespace(load_spacy=load_spacy))
+    return loads
+
+
+def _analyzer(monkeypatch, client):
+    monkeypatch.setattr(enhanced_content_analyzer, "get_inference_client", lambda: client)
+    return EnhancedContentAnalyzer()
+
+
+def test_decisions_are_enriched_in_one_batched_call(monkeypatch, loads):
+    client = FakeClient()
+    analyzer = _analyzer(monkeypatch, client)
+    decisions = analyzer.enrich_decisions([dict(d) for d in DECISIONS])
+
+    texts = [d["text"] for d in DECISIONS]
+    assert client.calls == [("sentiment", texts), ("entities", texts)]
+    assert [d["entities"][0]["text"] for d in decisions] == ["Terraform", "Grafana"]
+    assert decisions[0]["sentiment"]["polarity"] == 0.5
+    assert loads == []
+
+
+def test_failing_server_falls_back_to_local_spacy(monkeypatch, loads):
+    analyzer = _analyzer(monkeypatch, FakeClient(fail=True))
+    assert analyzer.nlp is None
+
+    decisions = analyzer.enrich_decisions([dict(d) for d in DECISIONS])
+    assert [d["entities"][0]["text"] for d in decisions] == ["Terraform", "Grafana"]
+    assert all("polarity" in d["sentiment"] for d in decisions)
+
+    messages = analyzer.extract_message_entities([{"content": d["text"]} for d in DECISIONS])
+    assert [m["entities"][0]["label"] for m in messages] == ["ORG", "ORG"]
+    # Loaded once, then reused
+    assert loads == [1]
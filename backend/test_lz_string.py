@@ -0,0 +1,79 @@
+"""LZ-string codec (compatible with the JS library the Excalidraw plugin uses) and compressed drawings"""
+
+import os
+import re
+import sys
+import json
+import random
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import lz_string
+from app.core.canvas_generator import ExcalidrawDecisionVisualizer
+
+# Outputs of LZString.compressToBase64 (astral characters are compressed as UTF-16 surrogate pairs, as in JS)
+KNOWN_VECTORS = [
+    ("a", "IZA="),
+    ("hello world", "BYUwNmD2AEDukCcwBMg="),
+    ("hello hello hello hello", "BYUwNmD2AEoTcq3FIA=="),
+    ("a" * 48, "IY18ZXaQ"),
+    ("Decision: use Terraform für Netzwerk", "CIUwxglgzhD2B2AuABAVyiZAVEAnXAhgGay4C2yRAP7sgHIgAuAXgO54DWQA"),
+    ('{"type":"excalidraw","version":2}', "N4IgLgngDgpiBcIYA8DGBDANgSwCYCd0B3EAGhADcZ8BnbAewDsEAmAXyA=="),
+    ("😀😀😀𝄞", "rwbgA92wWDcPF2g="),
+    ("Decision 🚀: ship it 🚀🚀", "CIUwxglgzhD2B2ACQvBuAC9gXIqALCAHRCAFxVTSA==="),
+]
+
+
+@pytest.mark.parametrize("text, encoded", KNOWN_VECTORS)
+def test_known_vectors(text, encoded):
+    assert lz_string.compress_to_base64(text) == encoded
+    assert lz_string.decompress_from_base64(encoded) == text
+
+
+def test_empty_string():
+    assert lz_string.compress_to_base64("") == ""
+    assert lz_string.decompress_from_base64("") == ""
+
+
+def test_round_trip_random_text():
+    rng = random.Random(11)
+    alphabet = "abc xyz{}\":,\n" + "äöüß€" + "漢字" + "😀🚀𝄞"
+    for length in (1, 2, 3, 17, 256, 5000):
+        text = "".join(rng.choice(alphabet) for _ in range(length))
+        assert lz_string.decompress_from_base64(lz_string.compress_to_base64(text)) == text
+
+
+def test_decompress_ignores_chunking_whitespace():
+    text = json.dumps({"elements": [{"id": i, "text": f"decision {i}"} for i in range(200)]})
+    chunked = lz_string.chunk(lz_string.compress_to_base64(text), size=64)
+    assert "\n\n" in chunked
+    assert lz_string.decompress_from_base64(chunked) == text
+
+
+def _decisions():
+    return [
+        {"id": f"decision_{i}", "text": f"use tool {i} for the pipeline 🚀", "role": "user" if i % 2 else "claude",
+         "confidence": 0.5 + i / 20, "technical_domains": ["automation"], "message_index": i}
+        for i in range(6)
+    ]
+
+
+def _drawing(markdown, fence):
+    return re.search(rf"```{fence}\n(.*?)\n```", markdown, re.DOTALL).group(1)
+
+
+def test_excalidraw_output_is_deterministic():
+    visualizer = ExcalidrawDecisionVisualizer()
+    first = visualizer.create_decision_excalidraw(_decisions(), "Chat", compressed=True)
+    second = ExcalidrawDecisionVisualizer().create_decision_excalidraw(_decisions(), "Chat", compressed=True)
+    assert first == second
+
+
+def test_compressed_drawing_matches_plain_json():
+    visualizer = ExcalidrawDecisionVisualizer()
+    compressed = visualizer.create_decision_excalidraw(_decisions(), "Chat", compressed=True)
+    plain = visualizer.create_decision_excalidraw(_decisions(), "Chat", compressed=False)
+
+    decoded = lz_string.decompress_from_base64(_drawing(compressed, "compressed-json"))
+    assert json.loads(decoded) == json.loads(_drawing(plain, "json"))
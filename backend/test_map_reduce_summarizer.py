@@ -0,0 +1,104 @@
+"""Map-reduce summarization: chunking, reduce levels and summary reuse when messages are appended"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.batched_inference import BatchedInference, TokenChunker
+from app.core.map_reduce_summarizer import MapReduceSummarizer, SummaryCache
+
+
+class FakeSummarizer:
+    """Stands in for a summarization pipeline: the first few words of the input and its word count"""
+
+    tokenizer = None
+
+    def __init__(self, words=4):
+        self.words = words
+        self.inputs = []
+        self.outputs = []
+
+    def __call__(self, texts, batch_size=None, truncation=True, **kwargs):
+        self.inputs.extend(texts)
+        outputs = [" ".join(text.split()[:self.words] + [f"({len(text.split())})"]) for text in texts]
+        self.outputs.extend(outputs)
+        return [{"summary_text": output} for output in outputs]
+
+
+def _messages(count, words=100):
+    return [{"role": "user" if i % 2 == 0 else "claude",
+             "content": " ".join(f"m{i}w{j}" for j in range(words))} for i in range(count)]
+
+
+def _summarizer(**kwargs):
+    return MapReduceSummarizer(inference=BatchedInference(batch_size=4, summary_batch_size=2),
+                               cache=SummaryCache(), **kwargs)
+
+
+def test_chunks_keep_whole_messages_within_the_limit():
+    chunker = TokenChunker(max_tokens=300)
+    chunks = _summarizer().chunk_messages(_messages(7), chunker)
+    # 100 words are 131 tokens: two messages per chunk
+    assert len(chunks) == 4
+    assert all(tokens <= 300 for tokens in chunker.count(chunks))
+    assert chunks[0].startswith("User: m0w0") and "\n\nClaude: m1w0" in chunks[0]
+
+
+def test_long_message_is_split_before_packing():
+    chunker = TokenChunker(max_tokens=50)
+    chunks = _summarizer().chunk_messages(_messages(1, words=200), chunker)
+    assert len(chunks) > 1
+    assert all(tokens <= 50 for tokens in chunker.count(chunks))
+
+
+def test_reduces_to_a_single_summary():
+    pipe = FakeSummarizer()
+    stats = _summarizer().summarize(pipe, _messages(10))
+    assert stats["chunks"] == 4
+    assert stats["levels"] == 2
+    assert stats["computed"] == 5 and stats["cached"] == 0
+    # The reduce input is the packed chunk summaries
+    assert pipe.inputs[-1].startswith("User: m0w0")
+    assert stats["summary"] == pipe.outputs[-1]
+
+
+def test_appending_a_message_only_resummarizes_the_tail():
+    summarizer = _summarizer()
+    pipe = FakeSummarizer()
+    messages = _messages(10)
+    summarizer.summarize(pipe, messages)
+
+    pipe.inputs.clear()
+    stats = summarizer.summarize(pipe, messages + _messages(11)[10:])
+    # Chunks 1-3 are unchanged; the last chunk and the reduce step are new
+    assert stats["chunks"] == 4
+    assert stats["cached"] == 3 and stats["computed"] == 2
+    assert len(pipe.inputs) == 2 and "m10w0" in pipe.inputs[0]
+
+    pipe.inputs.clear()
+    again = summarizer.summarize(pipe, messages + _messages(11)[10:])
+    assert again["computed"] == 0 and again["cached"] == 5 and pipe.inputs == []
+
+
+def test_max_levels_joins_the_remaining_summaries():
+    pipe = FakeSummarizer(words=1000)
+    stats = _summarizer(max_levels=1).summarize(pipe, _messages(10))
+    assert stats["levels"] == 1
+    assert stats["computed"] == 4
+    assert stats["summary"] == " ".join(pipe.outputs)
+
+
+def test_empty_conversation():
+    stats = _summarizer().summarize(FakeSummarizer(), [{"role": "user", "content": "  "}])
+    assert stats == {"summary": "", "levels": 0, "chunks": 0, "computed": 0, "cached": 0}
+
+
+def test_summary_cache_is_a_bounded_lru():
+    cache = SummaryCache(max_entries=2)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"
+    cache.put("c", "C")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
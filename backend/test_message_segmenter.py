@@ -0,0 +1,83 @@
+"""Segmentation of chat messages into prose, code, table and quote spans"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.core.message_segmenter import MessageSegmenter
+
+segmenter = MessageSegmenter()
+
+
+def _kinds(text):
+    return [(span["type"], text[span["start"]:span["end"]]) for span in segmenter.segment(text)]
+
+
+def test_spans_cover_the_text():
+    text = "Intro\n```python\nx = 1\n```\n| a | b |\n|---|---|\n> quoted\nOutro"
+    spans = segmenter.segment(text)
+    assert spans[0]["start"] == 0 and spans[-1]["end"] == len(text)
+    assert all(a["end"] == b["start"] for a, b in zip(spans, spans[1:]))
+    assert [span["type"] for span in spans] == ["prose", "code", "table", "quote", "prose"]
+
+
+def test_fenced_code_block():
+    text = "Try this:\n```python\ndef handler(request):\n    return request\n```\nDone."
+    spans = segmenter.segment(text)
+    code = [span for span in spans if span["type"] == "code"]
+    assert len(code) == 1
+    assert code[0]["language"] == "python"
+    assert code[0]["lines"] == 4
+    assert segmenter.describe_code(text, code[0])["definitions"] == ["handler"]
+
+
+def test_info_string_does_not_close_a_fence():
+    text = "````markdown\nExample:\n```python\nprint('hi')\n```\n````\nAfter the example."
+    kinds = _kinds(text)
+    assert [kind for kind, _ in kinds] == ["code", "prose"]
+    assert kinds[0][1].endswith("````\n")
+    assert kinds[1][1] == "After the example."
+
+
+def test_shorter_or_other_marker_does_not_close_a_fence():
+    text = "````\nline\n```\n~~~~\n````\nprose"
+    assert [kind for kind, _ in _kinds(text)] == ["code", "prose"]
+
+
+def test_adjacent_fences():
+    text = "```bash\nls\n```\n```python\nimport os\n```\nThen we deploy."
+    spans = segmenter.segment(text)
+    assert [(span["type"], span.get("language")) for span in spans] == [
+        ("code", "bash"), ("code", "python"), ("prose", None)
+    ]
+
+
+def test_unterminated_fence_runs_to_the_end():
+    text = "Start\n```\nimport os\nprint(os.getcwd())\n"
+    spans = segmenter.segment(text)
+    assert spans[-1]["type"] == "code"
+    assert spans[-1]["end"] == len(text)
+    assert spans[-1]["lines"] == 3
+    assert spans[-1]["language"] == "python"
+
+
+def test_table_and_quote_spans_merge_consecutive_lines():
+    text = "| tool | use |\n|------|-----|\n| git | vcs |\n> first\n> second\n"
+    spans = segmenter.segment(text)
+    assert [(span["type"], span["lines"]) for span in spans] == [("table", 3), ("quote", 2)]
+
+
+def test_log_lines_are_code():
+    text = "It failed:\n2025-01-02 10:00:01 ERROR boom\n2025-01-02 10:00:02 INFO retry\nAny idea?"
+    spans = segmenter.segment(text)
+    assert [(span["type"], span.get("language")) for span in spans] == [
+        ("prose", None), ("code", "log"), ("prose", None)
+    ]
+
+
+def test_prose_text():
+    text = "We chose Terraform.\n```hcl\nresource \"x\" {}\n```\n> quoted\n| a |\nThanks!"
+    spans = segmenter.segment(text)
+    assert segmenter.prose_text(text, spans) == "We chose Terraform.\nThanks!"
+    assert segmenter.prose_text(text, spans, include=("prose", "quote", "table")) == \
+        "We chose Terraform.\n> quoted\n| a |\nThanks!"
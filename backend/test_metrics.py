@@ -0,0 +1,181 @@
+"""Prometheus text exposition and multi-worker aggregation of the metrics registry"""
+
+import os
+import sys
+import json
+import subprocess
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.metrics import MetricsRegistry
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _lines(registry):
+    return registry.render().splitlines()
+
+
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    requests = registry.counter("app_requests", "Requests served", ["method"])
+    requests.inc(method="GET")
+    requests.inc(2, method="GET")
+    requests.inc(method="POST")
+
+    assert _lines(registry) == [
+        "# HELP app_requests Requests served",
+        "# TYPE app_requests counter",
+        'app_requests_total{method="GET"} 3',
+        'app_requests_total{method="POST"} 1',
+    ]
+
+
+def test_histogram_exposition_is_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("app_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        latency.observe(value)
+
+    assert _lines(registry)[2:] == [
+        'app_latency_seconds_bucket{le="0.1"} 1',
+        'app_latency_seconds_bucket{le="1"} 3',
+        'app_latency_seconds_bucket{le="+Inf"} 4',
+        "app_latency_seconds_sum 4.25",
+        "app_latency_seconds_count 4",
+    ]
+
+
+def test_label_escaping():
+    registry = MetricsRegistry()
+    registry.gauge("app_info", "Info", ["path"]).set(1, path='C:\\notes\\"draft"\nv2')
+    assert _lines(registry)[-1] == 'app_info{path="C:\\\\notes\\\\\\"draft\\"\\nv2"} 1'
+
+
+def test_wrong_labels_are_rejected():
+    registry = MetricsRegistry()
+    counter = registry.counter("app_errors", "Errors", ["kind"])
+    with pytest.raises(ValueError):
+        counter.inc(stage="parse")
+
+
+def test_same_name_returns_the_same_metric():
+    registry = MetricsRegistry()
+    assert registry.counter("app_hits", "Hits") is registry.counter("app_hits", "Hits")
+
+
+def _worker_snapshot(tmp_path, code):
+    """Run a separate (by now exited) worker that flushes its samples into tmp_path"""
+    script = (
+        "from app.core.metrics import MetricsRegistry\n"
+        f"registry = MetricsRegistry(multiprocess_dir={str(tmp_path)!r})\n" + code + "\nregistry.flush()\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=BACKEND_DIR, check=True, timeout=60)
+
+
+def test_multiprocess_sums_counters_and_histograms(tmp_path):
+    _worker_snapshot(tmp_path, (
+        "registry.counter('app_requests', 'Requests', ['method']).inc(5, method='GET')\n"
+        "registry.histogram('app_latency_seconds', 'Latency', buckets=(1.0,)).observe(0.5)"
+    ))
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.counter("app_requests", "Requests", ["method"]).inc(2, method="GET")
+    registry.histogram("app_latency_seconds", "Latency", buckets=(1.0,)).observe(2.0)
+
+    lines = _lines(registry)
+    assert 'app_requests_total{method="GET"} 7' in lines
+    assert 'app_latency_seconds_bucket{le="1"} 1' in lines
+    assert 'app_latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert "app_latency_seconds_sum 2.5" in lines
+
+
+def _live_worker_snapshot(tmp_path, snapshot):
+    """Samples of a live worker (the parent process stands in for it)"""
+    pid = os.getppid()
+    with open(tmp_path / f"metrics_{pid}.json", "w") as f:
+        json.dump(snapshot, f)
+    return pid
+
+
+def test_sum_mode_gauges_add_up_across_workers(tmp_path):
+    _live_worker_snapshot(tmp_path, {"app_in_flight": {"type": "gauge", "help": "In flight", "labels": [],
+                                                       "multiprocess_mode": "sum", "samples": [[[], 3.0]]}})
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.gauge("app_in_flight", "In flight").set(1)
+    assert "app_in_flight 4" in _lines(registry)
+
+
+def test_exited_workers_gauges_are_dropped_but_counters_kept(tmp_path):
+    # A worker killed mid-request must not leave its in-flight count behind
+    _worker_snapshot(tmp_path, (
+        "registry.gauge('app_in_flight', 'In flight').set(3)\n"
+        "registry.counter('app_requests', 'Requests').inc(5)"
+    ))
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.gauge("app_in_flight", "In flight").set(1)
+    registry.counter("app_requests", "Requests").inc()
+    lines = _lines(registry)
+    assert "app_in_flight 1" in lines
+    assert "app_requests_total 6" in lines
+
+
+def test_pid_mode_gauges_keep_live_workers_only(tmp_path):
+    # An exited worker's series disappears...
+    _worker_snapshot(tmp_path, "registry.gauge('app_rss_bytes', 'RSS', multiprocess_mode='pid').set(100)")
+    # ...while a live one is reported with its pid
+    live_pid = _live_worker_snapshot(tmp_path, {"app_rss_bytes": {
+        "type": "gauge", "help": "RSS", "labels": [], "multiprocess_mode": "pid", "samples": [[[], 200.0]]}})
+
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.gauge("app_rss_bytes", "RSS", multiprocess_mode="pid").set(300)
+
+    samples = [line for line in _lines(registry) if not line.startswith("#")]
+    assert sorted(samples) == sorted([
+        f'app_rss_bytes{{pid="{os.getpid()}"}} 300',
+        f'app_rss_bytes{{pid="{live_pid}"}} 200',
+    ])
+
+
+def test_flush_writes_this_process_atomically(tmp_path):
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.counter("app_requests", "Requests").inc()
+    registry.flush()
+    assert os.listdir(tmp_path) == [f"metrics_{os.getpid()}.json"]
+
+
+def test_reset_after_fork_keeps_gauges_only():
+    registry = MetricsRegistry()
+    registry.counter("app_requests", "Requests").inc(5)
+    registry.histogram("app_latency_seconds", "Latency").observe(0.2)
+    registry.gauge("app_models_loaded", "Models").set(2)
+    lock = registry.lock
+
+    registry.reset_after_fork()
+
+    lines = _lines(registry)
+    assert "app_models_loaded 2" in lines
+    assert not any(line.startswith(("app_requests_total", "app_latency_seconds_")) for line in lines)
+    assert registry.lock is not lock
+    # Metrics stay registered and usable in the child
+    registry.counter("app_requests", "Requests").inc()
+    assert "app_requests_total 1" in _lines(registry)
+
+
+def test_stopped_process_withdraws_but_its_forks_publish(tmp_path):
+    registry = MetricsRegistry(multiprocess_dir=str(tmp_path))
+    registry.gauge("app_models_loaded", "Models").set(1)
+    registry.flush()
+
+    # A pre-fork master stops publishing before forking its workers
+    registry.stop_publishing()
+    registry.flush()
+    assert os.listdir(tmp_path) == []
+
+    pid = os.fork()
+    if pid == 0:
+        registry.reset_after_fork()
+        registry.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+    assert os.listdir(tmp_path) == [f"metrics_{pid}.json"]
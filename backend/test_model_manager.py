@@ -0,0 +1,122 @@
+"""Model manager: lazy loading and LRU unloading under a RAM budget (fake loaders, CPU only)"""
+
+import os
+import sys
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core import model_manager
+from app.core.model_manager import ModelLoadError, ModelManager
+
+
+@pytest.fixture(autouse=True)
+def steady_rss(monkeypatch):
+    # Resident sizes then come from estimated_mb alone
+    monkeypatch.setattr(model_manager, "current_rss_bytes", lambda: 0)
+
+
+def _manager(ram_budget_mb=250, **sizes):
+    manager = ModelManager(ram_budget_mb=ram_budget_mb, vram_budget_mb=0, device="cpu")
+    for name, size in sizes.items():
+        manager.register(name, lambda device, name=name: f"{name}@{device}", estimated_mb=size)
+    return manager
+
+
+def test_lazy_load_on_cpu():
+    manager = _manager(a=100)
+    assert not manager.is_loaded("a")
+    assert manager.get("a") == "a@-1"
+    assert manager.loaded_models() == ["a"]
+    assert manager.status()["ram_resident_mb"] == 100
+
+
+def test_least_recently_used_is_unloaded_first():
+    manager = _manager(a=100, b=100, c=100)
+    manager.get("a")
+    manager.get("b")
+    manager.get("a")
+    manager.get("c")
+    assert manager.loaded_models() == ["a", "c"]
+
+    manager.get("b")
+    assert manager.loaded_models() == ["c", "b"]
+
+
+def test_model_over_budget_is_kept_alone():
+    manager = _manager(a=100, b=100, big=400)
+    manager.get("a")
+    manager.get("b")
+    assert manager.get("big") == "big@-1"
+    # Everything else made room; the model just used is never unloaded
+    assert manager.loaded_models() == ["big"]
+
+
+def test_enforce_budget_keeps_the_new_model():
+    manager = _manager(a=100, b=100)
+    manager.get("a")
+    manager.get("b")
+    manager.ram_budget = 150 * model_manager.MB
+    with manager._lock:
+        manager._enforce_budget("cpu", keep="a")
+    assert manager.loaded_models() == ["a"]
+
+
+def test_unbounded_budget_never_unloads():
+    manager = _manager(ram_budget_mb=0, a=1000, b=1000)
+    manager.get("a")
+    manager.get("b")
+    assert manager.loaded_models() == ["a", "b"]
+
+
+def test_loads_are_serialized():
+    manager = ModelManager(ram_budget_mb=0, vram_budget_mb=0, device="cpu")
+    active, peak, calls = [0], [0], []
+    lock = threading.Lock()
+
+    def loader(name):
+        def load(device):
+            with lock:
+                calls.append(name)
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+            return name
+        return load
+
+    for name in ("a", "b", "c"):
+        manager.register(name, loader(name), estimated_mb=10)
+    threads = [threading.Thread(target=manager.get, args=(name,)) for name in ("a", "b", "c", "a", "a")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] == 1
+    # Concurrent first uses of the same model load it once
+    assert sorted(calls) == ["a", "b", "c"]
+
+
+def test_load_failure_is_remembered_until_reset():
+    manager = ModelManager(ram_budget_mb=0, vram_budget_mb=0, device="cpu")
+    attempts = []
+
+    def broken(device):
+        attempts.append(device)
+        raise OSError("weights not found")
+
+    manager.register("broken", broken)
+    with pytest.raises(ModelLoadError):
+        manager.get("broken")
+    with pytest.raises(ModelLoadError):
+        manager.get("broken")
+    assert len(attempts) == 1 and not manager.available("broken")
+
+    manager.reset("broken")
+    assert manager.available("broken")
+    with pytest.raises(KeyError):
+        manager.get("unknown")
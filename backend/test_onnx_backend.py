@@ -0,0 +1,79 @@
+"""Accuracy parity of the ONNX Runtime (int8) backend against the PyTorch pipelines"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("optimum.onnxruntime")
+
+from app.core.onnx_backend import OnnxModelStore
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+SUMMARY_MODEL = "sshleifer/distilbart-cnn-6-6"
+
+SENTENCES = [
+    "This approach works great and the deployment was painless.",
+    "The migration failed twice and we lost a day of work.",
+    "Let's go with GitLab CI/CD, it fits our workflow perfectly.",
+    "I'm frustrated that the BGP sessions keep flapping.",
+    "Grafana dashboards made the latency problem obvious, very helpful.",
+    "The documentation is confusing and incomplete.",
+    "Terraform plans are clean and easy to review.",
+    "Docker builds are painfully slow on the CI runners.",
+]
+
+ARTICLE = (
+    "We evaluated three options for automating the MPLS backbone configuration. "
+    "Ansible was familiar to the team but struggled with device state drift. "
+    "Terraform gave us reviewable plans and a clear state file, and the network provider "
+    "covered every platform we run. We decided to use Terraform for provisioning and keep "
+    "Ansible only for ad-hoc troubleshooting playbooks. The pipeline runs in GitLab CI, "
+    "with a plan stage on every merge request and an apply stage gated on approval. "
+    "Monitoring moves to Prometheus and Grafana so configuration changes can be correlated "
+    "with latency and packet loss."
+)
+
+
+def _load(factory):
+    try:
+        return factory()
+    except OSError as e:
+        pytest.skip(f"model not available offline: {e}")
+
+
+@pytest.fixture(scope="module")
+def store(tmp_path_factory):
+    return OnnxModelStore(model_dir=str(tmp_path_factory.mktemp("onnx")), intra_op_threads=1, quantize=True)
+
+
+def test_sentiment_parity(store):
+    from transformers import pipeline
+
+    reference = _load(lambda: pipeline("sentiment-analysis", model=SENTIMENT_MODEL, device=-1))
+    quantized = _load(lambda: store.pipeline("sentiment-analysis", SENTIMENT_MODEL))
+
+    expected = reference(SENTENCES)
+    actual = quantized(SENTENCES)
+
+    assert [r["label"] for r in actual] == [r["label"] for r in expected]
+    for r_actual, r_expected in zip(actual, expected):
+        assert abs(r_actual["score"] - r_expected["score"]) < 0.05
+
+
+def test_summarization_parity(store):
+    from transformers import pipeline
+
+    reference = _load(lambda: pipeline("summarization", model=SUMMARY_MODEL, device=-1))
+    quantized = _load(lambda: store.pipeline("summarization", SUMMARY_MODEL))
+
+    expected = reference(ARTICLE, max_length=80, min_length=20, do_sample=False)[0]["summary_text"]
+    actual = quantized(ARTICLE, max_length=80, min_length=20, do_sample=False)[0]["summary_text"]
+
+    expected_words = set(expected.lower().split())
+    actual_words = set(actual.lower().split())
+    overlap = len(expected_words & actual_words) / len(expected_words | actual_words)
+    assert overlap >= 0.5, (expected, actual)
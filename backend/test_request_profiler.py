@@ -0,0 +1,112 @@
+"""Request profiling: admin token enforcement and profile_interval validation"""
+
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.feature_flags import feature_flags, Features
+from app.core.request_profiler import (MAX_INTERVAL, MIN_INTERVAL, ProfileStore, RequestProfiler, parse_interval,
+                                       request_profiler)
+from app.main import app
+
+TOKEN = "s3cret"
+
+
+def _profiler(monkeypatch, token="", allow_insecure=None):
+    monkeypatch.setenv("PROFILING_ADMIN_TOKEN", token)
+    if allow_insecure is None:
+        monkeypatch.delenv("PROFILING_ALLOW_INSECURE", raising=False)
+    else:
+        monkeypatch.setenv("PROFILING_ALLOW_INSECURE", allow_insecure)
+    return RequestProfiler()
+
+
+def test_refuses_without_a_configured_token(monkeypatch):
+    profiler = _profiler(monkeypatch)
+    assert not profiler.authorized(None)
+    assert not profiler.authorized("anything")
+
+
+def test_explicit_insecure_opt_in(monkeypatch):
+    assert _profiler(monkeypatch, allow_insecure="true").authorized(None)
+
+
+def test_token_must_match(monkeypatch):
+    profiler = _profiler(monkeypatch, token=TOKEN, allow_insecure="true")
+    assert profiler.authorized(TOKEN)
+    assert not profiler.authorized(None)
+    assert not profiler.authorized("wrong")
+
+
+def test_parse_interval():
+    assert parse_interval(None) is None
+    assert parse_interval("") is None
+    assert parse_interval("0.01") == 0.01
+    assert parse_interval("0") == MIN_INTERVAL
+    assert parse_interval("-5") == MIN_INTERVAL
+    assert parse_interval("3600") == MAX_INTERVAL
+    for value in ("abc", "nan", "inf"):
+        with pytest.raises(ValueError):
+            parse_interval(value)
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setitem(feature_flags.flags, Features.REQUEST_PROFILING, True)
+    monkeypatch.setattr(request_profiler, "admin_token", TOKEN)
+    monkeypatch.setattr(request_profiler, "allow_insecure", False)
+    monkeypatch.setattr(request_profiler.store, "directory", str(tmp_path))
+    return TestClient(app)
+
+
+def test_invalid_interval_is_a_bad_request(client):
+    response = client.get("/feature-flags?profile=1&profile_interval=abc", headers={"X-Profile-Token": TOKEN})
+    assert response.status_code == 400
+
+
+def test_invalid_interval_ignored_without_profiling(client):
+    assert client.get("/feature-flags?profile_interval=abc").status_code == 200
+
+
+def test_debug_profiles_require_the_token(client, monkeypatch):
+    assert client.get("/debug/profiles").status_code == 403
+    assert client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN}).status_code == 200
+
+    monkeypatch.setattr(request_profiler, "admin_token", "")
+    response = client.get("/debug/profiles")
+    assert response.status_code == 403
+    assert "PROFILING_ADMIN_TOKEN" in response.json()["detail"]
+
+
+def _profile(client):
+    return client.get("/feature-flags?profile=1&profile_interval=0.002&profile_format=speedscope",
+                      headers={"X-Profile-Token": TOKEN, "X-Request-Id": "req-1"})
+
+
+def test_profiled_request_is_stored(client):
+    response = _profile(client)
+    assert response.status_code == 200
+    profile_id = response.headers["X-Profile-Id"]
+    assert profile_id != "req-1"
+    stored = client.get(f"/debug/profiles/{profile_id}", headers={"X-Profile-Token": TOKEN})
+    assert stored.status_code == 200
+    assert "request req-1" in stored.text
+
+
+def test_reused_request_id_does_not_replace_a_profile(client):
+    first = _profile(client).headers["X-Profile-Id"]
+    second = _profile(client).headers["X-Profile-Id"]
+    assert first != second
+    listed = client.get("/debug/profiles", headers={"X-Profile-Token": TOKEN}).json()["profiles"]
+    assert {first, second} <= {profile["profile_id"] for profile in listed}
+
+
+def test_store_never_replaces_a_profile(tmp_path):
+    store = ProfileStore(str(tmp_path))
+    store.save("abc", "speedscope", "{}")
+    with pytest.raises(FileExistsError):
+        store.save("abc", "speedscope", "{\"replaced\": true}")
+    assert store.load("abc")[0] == "{}"
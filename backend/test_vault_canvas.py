@@ -0,0 +1,150 @@
+"""Incremental analysis index and the vault-wide decision canvas built from it"""
+
+import os
+import sys
+import json
+import time
+from types import SimpleNamespace
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import pytest
+
+from app.core.analysis_index import AnalysisIndex
+from app.core.vault_canvas import VaultCanvasBuilder
+
+
+class FakePipeline:
+    """Stands in for the analysis pipeline: every "- text #domain" line is a decision"""
+
+    def __init__(self):
+        self.analyzed = 0
+
+    def run(self, content, outputs):
+        self.analyzed += 1
+        decisions = []
+        for line in content.splitlines():
+            if line.startswith("- "):
+                text, _, domain = line[2:].partition(" #")
+                decisions.append({"text": text, "role": "user", "confidence": 0.5, "message_index": 0,
+                                  "technical_domains": [domain] if domain else []})
+        return SimpleNamespace(decisions=decisions)
+
+
+def _write(vault, relative, body):
+    path = vault / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(body, encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def vault(tmp_path):
+    vault = tmp_path / "vault"
+    _write(vault, "chats/2025-01-05-terraform.md", "# Terraform\n- use Terraform for provisioning #automation\n")
+    _write(vault, "chats/2025-01-20-bgp.md", "# BGP\n- tune BGP timers #networking\n- add Grafana alerts #monitoring\n")
+    _write(vault, "chats/2025-02-03-ci.md", "# CI\n- move builds to GitLab CI #automation\n")
+    _write(vault, ".obsidian/workspace.md", "- not a conversation #automation\n")
+    return vault
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = AnalysisIndex(str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def _bump_mtime(path):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+def test_incremental_reindex(vault, index):
+    pipeline = FakePipeline()
+    report = index.index_vault(str(vault), pipeline)
+    assert sorted(report["updated"]) == ["chats/2025-01-05-terraform.md", "chats/2025-01-20-bgp.md",
+                                         "chats/2025-02-03-ci.md"]
+    assert pipeline.analyzed == 3
+
+    # Touched without edits, edited, removed, and untouched
+    _bump_mtime(vault / "chats/2025-01-05-terraform.md")
+    _write(vault, "chats/2025-01-20-bgp.md", "# BGP\n- tune BGP timers #networking\n")
+    (vault / "chats/2025-02-03-ci.md").unlink()
+
+    report = index.index_vault(str(vault), pipeline)
+    assert report == {"updated": ["chats/2025-01-20-bgp.md"], "removed": ["chats/2025-02-03-ci.md"],
+                      "unchanged": ["chats/2025-01-05-terraform.md"]}
+    assert pipeline.analyzed == 4
+    assert [d["text"] for d in index.decisions("chats/2025-01-20-bgp.md")] == ["tune BGP timers"]
+
+    # The touched note's new mtime was recorded, so it is not even re-read next time
+    report = index.index_vault(str(vault), pipeline)
+    assert sorted(report["unchanged"]) == ["chats/2025-01-05-terraform.md", "chats/2025-01-20-bgp.md"]
+    assert pipeline.analyzed == 4
+
+
+def test_conversations_by_path(vault, index):
+    index.index_vault(str(vault), FakePipeline())
+    rows = index.conversations(["chats/2025-02-03-ci.md", "chats/2025-01-05-terraform.md", "missing.md"])
+    assert [row["path"] for row in rows] == ["chats/2025-01-05-terraform.md", "chats/2025-02-03-ci.md"]
+    assert len(index.conversations()) == 3
+
+
+def test_invalid_dates_fall_back(tmp_path, index):
+    vault = tmp_path / "dates"
+    note = _write(vault, "2025-13-40-broken.md", "- plan the rollout #automation\n")
+    _write(vault, "fm.md", "---\ndate: 2025-02-30\n---\n- plan the rollout #automation\n")
+    _write(vault, "2024-06-01/2025-99-01-nested.md", "- plan the rollout #automation\n")
+    index.index_vault(str(vault), FakePipeline())
+
+    dates = {row["path"]: row["conversation_date"] for row in index.conversations()}
+    mtime_date = time.strftime("%Y-%m-%d", time.localtime(note.stat().st_mtime))
+    assert dates["2025-13-40-broken.md"] == mtime_date
+    assert dates["fm.md"] == mtime_date
+    assert dates["2024-06-01/2025-99-01-nested.md"] == "2024-06-01"
+
+    # Week buckets parse every stored date
+    VaultCanvasBuilder(index, granularity="week").build(str(tmp_path / "out.canvas"))
+
+
+def _load_canvas(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_canvas_is_valid_json(vault, index, tmp_path):
+    _write(vault, "chats/2025-01-22-dup.md", "- retry the job #automation\n- retry the job #automation\n")
+    index.index_vault(str(vault), FakePipeline())
+    output = tmp_path / "out" / "Vault.canvas"
+    stats = VaultCanvasBuilder(index, granularity="month").build(str(output))
+
+    canvas = _load_canvas(output)
+    ids = [node["id"] for node in canvas["nodes"]]
+    assert len(ids) == len(set(ids))
+    assert all(edge["fromNode"] in ids and edge["toNode"] in ids for edge in canvas["edges"])
+    assert stats["nodes"] == len(canvas["nodes"]) and stats["edges"] == len(canvas["edges"])
+    assert stats["bytes"] == output.stat().st_size
+    files = {node["file"] for node in canvas["nodes"] if node["type"] == "file"}
+    assert "chats/2025-01-22-dup.md" in files
+    assert not [name for name in os.listdir(output.parent) if name.endswith(".tmp")]
+
+
+def test_group_cache_reused_by_signature(vault, index, tmp_path):
+    pipeline = FakePipeline()
+    index.index_vault(str(vault), pipeline)
+    output = str(tmp_path / "Vault.canvas")
+    builder = VaultCanvasBuilder(index, granularity="month")
+
+    first = builder.build(output)
+    assert first["rendered"] == first["groups"] == 4 and first["reused"] == 0
+    before = _load_canvas(output)
+
+    second = builder.build(output)
+    assert second["rendered"] == 0 and second["reused"] == 4
+    assert _load_canvas(output) == before
+
+    # Only the January automation group depends on the edited note
+    _write(vault, "chats/2025-01-05-terraform.md", "# Terraform\n- use Terraform modules for provisioning #automation\n")
+    index.index_vault(str(vault), pipeline)
+    third = builder.build(output)
+    assert third["rendered"] == 1 and third["reused"] == 3